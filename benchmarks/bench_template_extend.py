@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+"""Benchmark extending a sample template with many new columns for all its
+existing samples (200 columns and 20,000 samples by default).
+
+The statements previously issued (one ALTER TABLE per column and one UPDATE
+per sample) are compared with the ones issued by the storage now (a single
+ALTER TABLE and a set-based UPDATE from a temporary table loaded with COPY).
+The time of the whole `SampleTemplate.extend` call is also reported.
+
+It must be run against a test environment using the table storage (see
+`qiita-env make --no-load-ontologies`). All the changes made to the database
+are rolled back.
+"""
+
+from __future__ import division
+from os import remove
+from os.path import exists
+from time import time
+
+import click
+import pandas as pd
+
+from qiita_core.util import is_test_environment
+import qiita_db as qdb
+
+from bench_template_load import _build_template, _create_study
+
+
+def _legacy_extend(st, md_new):
+    """Issues the statements used before to add the columns of `md_new`"""
+    trn = qdb.sql_connection.TRN
+    table = 'qiita.sample_%d' % st.id
+    for column in md_new.columns:
+        trn.add("ALTER TABLE %s ADD COLUMN %s varchar" % (table, column))
+    sql = "UPDATE {0} SET {1} WHERE sample_id=%s".format(
+        table, ', '.join('%s=%%s' % c for c in md_new.columns))
+    trn.add(sql, [list(row[1:]) + [row[0]] for row in md_new.itertuples()],
+            many=True)
+    trn.execute()
+
+
+def _bulk_extend(st, md_new):
+    """Issues the statements used now to add the columns of `md_new`"""
+    storage = st._storage()
+    columns = md_new.columns.tolist()
+    storage.add_columns(st.id, columns)
+    storage.update_values(st.id, columns,
+                          [list(row) for row in md_new.itertuples()])
+    qdb.sql_connection.TRN.execute()
+
+
+def _extend(st, md_new):
+    """Extends the template through the public API"""
+    md_new = md_new.copy()
+    md_new.index = [s_id.split('.', 1)[1] for s_id in md_new.index]
+    st.extend(md_new)
+
+
+def _run(md_template, md_new, func):
+    """Creates the template, adds the columns with `func` and rolls back"""
+    trn = qdb.sql_connection.TRN
+    with trn:
+        try:
+            st = qdb.metadata_template.sample_template.SampleTemplate.create(
+                md_template, _create_study())
+            md_new.index = ['%d.%s' % (st.id, s) for s in md_template.index]
+            round_trips = trn.stats.round_trips
+            start = time()
+            func(st, md_new)
+            elapsed = time() - start
+            round_trips = trn.stats.round_trips - round_trips
+            for _, fp in st.get_filepaths():
+                if exists(fp):
+                    remove(fp)
+        finally:
+            trn.rollback()
+    return round_trips, elapsed
+
+
+@click.command()
+@click.option('--samples', default=20000, show_default=True,
+              help='Number of samples in the template')
+@click.option('--columns', default=200, show_default=True,
+              help='Number of columns added to the template')
+def bench(samples, columns):
+    """Reports the time needed to add columns to a sample template"""
+    if not is_test_environment():
+        raise click.ClickException(
+            "This benchmark can only be executed in a test environment")
+    if not isinstance(qdb.metadata_template.storage.get_storage('sample_'),
+                      qdb.metadata_template.storage.TableStorage):
+        raise click.ClickException(
+            "This benchmark requires the table storage")
+
+    md_template = _build_template(samples, 0)
+    md_new = pd.DataFrame(
+        {'new_column_%d' % j: ['value_%d_%d' % (i, j) for i in range(samples)]
+         for j in range(columns)}, index=md_template.index)
+    click.echo("Adding %d columns to a sample template with %d samples"
+               % (columns, samples))
+    for label, func in (('before (ALTER per column, UPDATE per sample)',
+                         _legacy_extend),
+                        ('after (single ALTER, UPDATE from COPY)',
+                         _bulk_extend),
+                        ('SampleTemplate.extend', _extend)):
+        round_trips, elapsed = _run(md_template, md_new, func)
+        click.echo("%s: %d round trips, %.2f seconds"
+                   % (label, round_trips, elapsed))
+
+
+if __name__ == '__main__':
+    bench()
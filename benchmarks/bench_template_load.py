@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+"""Benchmark the number of round trips to the database needed to load a
+sample template, with and without the batched execution of the transaction.
+
+It must be run against a test environment (see `qiita-env make --no-load-
+ontologies`). All the changes made to the database are rolled back.
+"""
+
+from __future__ import division
+from os import remove
+from os.path import exists
+from time import time
+
+import click
+import pandas as pd
+
+from qiita_core.util import is_test_environment
+import qiita_db as qdb
+
+
+def _create_study():
+    info = {
+        "timeseries_type_id": '1',
+        "metadata_complete": 'true',
+        "mixs_compliant": 'true',
+        "number_samples_collected": 25,
+        "number_samples_promised": 28,
+        "study_alias": "BENCH",
+        "study_description": "Benchmark study",
+        "study_abstract": "Benchmark study",
+        "emp_person_id": qdb.study.StudyPerson(2),
+        "principal_investigator_id": qdb.study.StudyPerson(3),
+        "lab_person_id": qdb.study.StudyPerson(1)
+    }
+    return qdb.study.Study.create(
+        qdb.user.User('test@foo.bar'), "Benchmark study %s" % time(), [1],
+        info)
+
+
+def _build_template(n_samples, n_columns):
+    md = {'Sample%d' % i: {'physical_specimen_location': 'location1',
+                           'physical_specimen_remaining': 'true',
+                           'dna_extracted': 'true',
+                           'sample_type': 'type1',
+                           'collection_timestamp': '05/29/2014 12:24:15',
+                           'host_subject_id': 'NotIdentified',
+                           'description': 'Test Sample %d' % i,
+                           'latitude': '42.42',
+                           'longitude': '41.41',
+                           'taxon_id': '9606',
+                           'scientific_name': 'homo sapiens'}
+          for i in range(n_samples)}
+    for sample in md.values():
+        for j in range(n_columns):
+            sample['extra_column_%d' % j] = 'value_%d' % j
+    return pd.DataFrame.from_dict(md, orient='index', dtype=str)
+
+
+def _load_template(md_template, batch_size):
+    """Loads `md_template` in a new study and rolls back the changes"""
+    trn = qdb.sql_connection.TRN
+    with trn:
+        trn.batch_size = batch_size
+        try:
+            study = _create_study()
+            round_trips = trn.stats.round_trips
+            start = time()
+            st = qdb.metadata_template.sample_template.SampleTemplate.create(
+                md_template, study)
+            elapsed = time() - start
+            round_trips = trn.stats.round_trips - round_trips
+            for _, fp in st.get_filepaths():
+                if exists(fp):
+                    remove(fp)
+        finally:
+            del trn.batch_size
+            trn.rollback()
+    return round_trips, elapsed
+
+
+@click.command()
+@click.option('--samples', default=1000, show_default=True,
+              help='Number of samples in the template')
+@click.option('--columns', default=20, show_default=True,
+              help='Number of extra columns in the template')
+def bench(samples, columns):
+    """Reports the round trips needed to load a sample template"""
+    if not is_test_environment():
+        raise click.ClickException(
+            "This benchmark can only be executed in a test environment")
+
+    md_template = _build_template(samples, columns)
+    click.echo("Loading a sample template with %d samples and %d columns"
+               % (samples, columns + 11))
+    for label, batch_size in (
+            ('before (one round trip per query)', 1),
+            ('after (batched, batch_size=%d)'
+             % qdb.sql_connection.Transaction.batch_size,
+             qdb.sql_connection.Transaction.batch_size)):
+        round_trips, elapsed = _load_template(md_template, batch_size)
+        click.echo("%s: %d round trips, %.2f seconds"
+                   % (label, round_trips, elapsed))
+
+
+if __name__ == '__main__':
+    bench()
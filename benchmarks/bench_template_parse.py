@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+"""Benchmark the time and memory needed to parse a large template file with
+`load_template_to_dataframe`.
+
+The template file is generated by the benchmark (100,000 samples and 500
+columns by default, ~500MB). It doesn't need a database.
+"""
+
+from __future__ import division
+from os import close, remove
+from os.path import getsize
+from resource import getrusage, RUSAGE_SELF
+from sys import platform
+from tempfile import mkstemp
+from time import time
+
+import click
+
+import qiita_db as qdb
+
+
+def _write_template(fp, n_samples, n_columns):
+    """Writes a template with `n_samples` and `n_columns` extra columns
+
+    Some of the values have surrounding whitespace, the last column is empty
+    and there is an empty row, so all the cleaning steps are exercised.
+    """
+    with open(fp, 'w') as f:
+        headers = ['sample_name', 'Sample_Type', 'description'] + [
+            'extra_column_%d' % j for j in range(n_columns)] + ['empty']
+        f.write('%s\n' % '\t'.join(headers))
+        extra = '\t'.join('value_%d ' % j for j in range(n_columns))
+        for i in range(n_samples):
+            f.write('Sample%d\t type1\tTest Sample %d\t%s\t\n'
+                    % (i, i, extra))
+        f.write('%s\n' % ('\t' * (len(headers) - 1)))
+
+
+def _max_rss():
+    """Returns the peak resident memory of the process, in bytes"""
+    rss = getrusage(RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, OS X bytes
+    return rss if platform == 'darwin' else rss * 1024
+
+
+@click.command()
+@click.option('--samples', default=100000, show_default=True,
+              help='Number of samples in the template')
+@click.option('--columns', default=500, show_default=True,
+              help='Number of extra columns in the template')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Keep the generated template in this path')
+def bench(samples, columns, output):
+    """Reports the time and memory needed to parse a template file"""
+    if output is None:
+        fd, fp = mkstemp(suffix='.txt')
+        close(fd)
+    else:
+        fp = output
+
+    try:
+        _write_template(fp, samples, columns)
+        size = getsize(fp)
+        click.echo("Parsing a template with %d samples and %d columns "
+                   "(%.1f MB)" % (samples, columns + 3, size / 1024 ** 2))
+
+        rss = _max_rss()
+        start = time()
+        template = qdb.metadata_template.util.load_template_to_dataframe(fp)
+        elapsed = time() - start
+        click.echo("%.2f seconds, peak memory increase %.1f MB (%.2fx the "
+                   "file size), loaded %d samples and %d columns"
+                   % (elapsed, (_max_rss() - rss) / 1024 ** 2,
+                      (_max_rss() - rss) / size, template.shape[0],
+                      template.shape[1]))
+    finally:
+        if output is None:
+            remove(fp)
+
+
+if __name__ == '__main__':
+    bench()
@@ -56,6 +56,21 @@ class ConfigurationManager(object):
         The host where the database lives
     port : int
         The port used to connect to the postgres database in the previous host
+    pool_min_connections : int
+        The number of connections opened when the connection pool is created
+    pool_max_connections : int
+        The maximum number of connections in the connection pool. If 0, the
+        connection pool is disabled
+    slow_query_threshold : float
+        The time, in seconds, above which a query is recorded as slow. If 0,
+        slow queries are not recorded
+    log_slow_queries : bool
+        Whether the slow queries are stored in the qiita.logging table
+    replica_dsn : str or None
+        The connection string of the read replica used by the read only
+        transactions. If None, they use the main database
+    metadata_storage : {'tables', 'jsonb'}
+        The storage engine of the sample and prep metadata
     ipyc_demo : str
         The IPython demo cluster profile
     ipyc_demo_n : int
@@ -209,6 +224,34 @@ class ConfigurationManager(object):
         self.host = config.get('postgres', 'HOST')
         self.port = config.getint('postgres', 'PORT')
 
+        # The connection pool is optional, so old configuration files without
+        # these options keep working with the pool disabled
+        self.pool_min_connections = config.getint(
+            'postgres', 'POOL_MIN_CONNECTIONS', fallback=0)
+        self.pool_max_connections = config.getint(
+            'postgres', 'POOL_MAX_CONNECTIONS', fallback=0)
+        if self.pool_min_connections > self.pool_max_connections:
+            raise ValueError("POOL_MIN_CONNECTIONS (%d) can't be larger than "
+                             "POOL_MAX_CONNECTIONS (%d)"
+                             % (self.pool_min_connections,
+                                self.pool_max_connections))
+
+        # The slow query log is optional as well
+        self.slow_query_threshold = config.getfloat(
+            'postgres', 'SLOW_QUERY_THRESHOLD', fallback=0)
+        self.log_slow_queries = config.getboolean(
+            'postgres', 'LOG_SLOW_QUERIES', fallback=False)
+
+        # And so is the read replica
+        self.replica_dsn = config.get(
+            'postgres', 'REPLICA_DSN', fallback='') or None
+
+        self.metadata_storage = config.get(
+            'postgres', 'METADATA_STORAGE', fallback='') or 'tables'
+        if self.metadata_storage not in ('tables', 'jsonb'):
+            raise ValueError("METADATA_STORAGE (%s) should be 'tables' or "
+                             "'jsonb'" % self.metadata_storage)
+
     def _get_redis(self, config):
         """Get the configuration of the redis section"""
         sec_get = partial(config.get, 'redis')
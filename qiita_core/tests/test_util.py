@@ -59,6 +59,39 @@ class UtilTests(TestCase):
         f2 = function()
         self.assertNotEqual(f1, f2)
 
+    def test_execute_as_transaction_read_only(self):
+        """testing that GET handlers are executed in read only transactions"""
+        class Request(object):
+            def __init__(self, method):
+                self.method = method
+
+        class Handler(object):
+            def __init__(self, method):
+                self.request = Request(method)
+
+            @execute_as_transaction
+            def get(self):
+                return qdb.sql_connection.TRN.is_read_only
+
+            @execute_as_transaction
+            def post(self):
+                return qdb.sql_connection.TRN.is_read_only
+
+        class WriteHandler(Handler):
+            @execute_as_transaction(read_only=False)
+            def get(self):
+                return qdb.sql_connection.TRN.is_read_only
+
+        self.assertTrue(Handler('GET').get())
+        self.assertFalse(Handler('POST').post())
+        self.assertFalse(WriteHandler('GET').get())
+
+        @execute_as_transaction(read_only=True)
+        def function():
+            return qdb.sql_connection.TRN.is_read_only
+
+        self.assertTrue(function())
+
     def test_get_qiita_version(self):
         exp_version, exp_sha = get_qiita_version()
         # testing just the version
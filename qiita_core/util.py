@@ -7,7 +7,7 @@
 # -----------------------------------------------------------------------------
 from smtplib import SMTP, SMTP_SSL, SMTPException
 from future import standard_library
-from functools import wraps
+from functools import wraps, partial
 from os.path import dirname
 from git import Repo
 from git.exc import InvalidGitRepositoryError
@@ -112,12 +112,59 @@ def qiita_test_checker(test=False):
     return class_modifier
 
 
-def execute_as_transaction(func):
-    """Decorator to make a method execute inside a transaction"""
+def _is_get_handler(func, args):
+    """Checks if `func` is the GET method of a request handler
+
+    Parameters
+    ----------
+    func : function
+        The decorated function
+    args : tuple
+        The positional arguments with which `func` is called
+
+    Returns
+    -------
+    bool
+        Whether `func` is the `get` method of an object serving a GET request
+    """
+    if func.__name__ != 'get' or not args:
+        return False
+    request = getattr(args[0], 'request', None)
+    return getattr(request, 'method', None) == 'GET'
+
+
+def execute_as_transaction(func=None, read_only=None):
+    """Decorator to make a method execute inside a transaction
+
+    Parameters
+    ----------
+    func : function
+        The function to decorate
+    read_only : bool, optional
+        Whether the transaction is read only. If not provided, it is read only
+        if `func` is the `get` method of a request handler serving a GET
+        request
+
+    Examples
+    --------
+    The decorator can be used directly, or with the `read_only` parameter
+    for the GET handlers that modify the database
+
+    >>> @execute_as_transaction
+    ... def get_study_title(study_id):
+    ...     pass
+    >>> @execute_as_transaction(read_only=False)
+    ... def get(self):
+    ...     pass
+    """
+    if func is None:
+        return partial(execute_as_transaction, read_only=read_only)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         from qiita_db.sql_connection import TRN
-        with TRN:
+        ro = _is_get_handler(func, args) if read_only is None else read_only
+        with TRN.read_only() if ro else TRN:
             return func(*args, **kwargs)
     return wrapper
 
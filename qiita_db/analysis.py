@@ -232,6 +232,7 @@ class Analysis(qdb.base.QiitaStatusObject):
             qdb.sql_connection.TRN.add(sql, args)
 
             qdb.sql_connection.TRN.execute()
+            cls._invalidate_identity_map(_id)
 
     @classmethod
     def exists(cls, analysis_id):
@@ -1151,6 +1152,7 @@ class Collection(qdb.base.QiitaStatusObject):
                 qdb.sql_connection.TRN.add(sql.format(table), [id_])
 
             qdb.sql_connection.TRN.execute()
+            cls._invalidate_identity_map(id_)
 
     # --- Properties ---
     @property
@@ -47,6 +47,16 @@ class Artifact(qdb.base.QiitaObject):
     qiita_db.QiitaObject
     """
     _table = "artifact"
+    _row_sql = """SELECT artifact_id, name, generated_timestamp, command_id,
+                         command_parameters, submitted_to_vamps, visibility,
+                         artifact_type, data_type, can_be_submitted_to_ebi,
+                         can_be_submitted_to_vamps, study_id
+                  FROM qiita.artifact
+                    JOIN qiita.visibility USING (visibility_id)
+                    JOIN qiita.artifact_type USING (artifact_type_id)
+                    JOIN qiita.data_type USING (data_type_id)
+                    LEFT JOIN qiita.study_artifact USING (artifact_id)
+                  WHERE artifact_id = ANY(%s)"""
 
     @classmethod
     def iter_by_visibility(cls, visibility):
@@ -447,6 +457,7 @@ class Artifact(qdb.base.QiitaObject):
             # Delete the row in the artifact table
             sql = "DELETE FROM qiita.artifact WHERE artifact_id = %s"
             qdb.sql_connection.TRN.add(sql, [artifact_id])
+            cls._invalidate_identity_map(artifact_id)
 
     @property
     def name(self):
@@ -458,6 +469,9 @@ class Artifact(qdb.base.QiitaObject):
             The artifact name
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['name']
             sql = """SELECT name
                      FROM qiita.artifact
                      WHERE artifact_id = %s"""
@@ -487,6 +501,7 @@ class Artifact(qdb.base.QiitaObject):
                      WHERE artifact_id = %s"""
             qdb.sql_connection.TRN.add(sql, [value, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     @property
     def timestamp(self):
@@ -498,6 +513,9 @@ class Artifact(qdb.base.QiitaObject):
             The timestamp when the artifact was generated
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['generated_timestamp']
             sql = """SELECT generated_timestamp
                      FROM qiita.artifact
                      WHERE artifact_id = %s"""
@@ -515,12 +533,16 @@ class Artifact(qdb.base.QiitaObject):
             None otherwise.
         """
         with qdb.sql_connection.TRN:
-            sql = """SELECT command_id, command_parameters
-                     FROM qiita.artifact
-                     WHERE artifact_id = %s"""
-            qdb.sql_connection.TRN.add(sql, [self.id])
-            # Only one row will be returned
-            res = qdb.sql_connection.TRN.execute_fetchindex()[0]
+            res = self._prefetched_row()
+            if res is not None:
+                res = [res['command_id'], res['command_parameters']]
+            else:
+                sql = """SELECT command_id, command_parameters
+                         FROM qiita.artifact
+                         WHERE artifact_id = %s"""
+                qdb.sql_connection.TRN.add(sql, [self.id])
+                # Only one row will be returned
+                res = qdb.sql_connection.TRN.execute_fetchindex()[0]
             if res[0] is None:
                 return None
             return qdb.software.Parameters.load(
@@ -536,6 +558,9 @@ class Artifact(qdb.base.QiitaObject):
             The visibility of the artifact
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['visibility']
             sql = """SELECT visibility
                      FROM qiita.artifact
                         JOIN qiita.visibility USING (visibility_id)
@@ -564,6 +589,7 @@ class Artifact(qdb.base.QiitaObject):
             qdb.sql_connection.TRN.add(
                 sql, [qdb.util.convert_to_id(value, "visibility"), self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
             # In order to correctly propagate the visibility upstream, we need
             # to go one step at a time. By setting up the visibility of our
             # parents first, we accomplish that, since they will propagate
@@ -582,6 +608,9 @@ class Artifact(qdb.base.QiitaObject):
             The artifact type
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['artifact_type']
             sql = """SELECT artifact_type
                      FROM qiita.artifact
                         JOIN qiita.artifact_type USING (artifact_type_id)
@@ -599,6 +628,9 @@ class Artifact(qdb.base.QiitaObject):
             The artifact data type
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['data_type']
             sql = """SELECT data_type
                      FROM qiita.artifact
                         JOIN qiita.data_type USING (data_type_id)
@@ -616,6 +648,9 @@ class Artifact(qdb.base.QiitaObject):
             True if the artifact can be submitted to EBI. False otherwise.
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['can_be_submitted_to_ebi']
             sql = """SELECT can_be_submitted_to_ebi
                      FROM qiita.artifact_type
                         JOIN qiita.artifact USING (artifact_type_id)
@@ -719,6 +754,9 @@ class Artifact(qdb.base.QiitaObject):
             True if the artifact can be submitted to VAMPS. False otherwise.
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['can_be_submitted_to_vamps']
             sql = """SELECT can_be_submitted_to_vamps
                      FROM qiita.artifact_type
                         JOIN qiita.artifact USING (artifact_type_id)
@@ -744,6 +782,9 @@ class Artifact(qdb.base.QiitaObject):
             if not self.can_be_submitted_to_vamps:
                 raise qdb.exceptions.QiitaDBOperationNotPermittedError(
                     "Artifact %s cannot be submitted to VAMPS" % self.id)
+            row = self._prefetched_row()
+            if row is not None:
+                return row['submitted_to_vamps']
             sql = """SELECT submitted_to_vamps
                      FROM qiita.artifact
                      WHERE artifact_id = %s"""
@@ -773,6 +814,7 @@ class Artifact(qdb.base.QiitaObject):
                      WHERE artifact_id = %s"""
             qdb.sql_connection.TRN.add(sql, [value, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     @property
     def filepaths(self):
@@ -861,8 +903,8 @@ class Artifact(qdb.base.QiitaObject):
                      FROM qiita.parent_artifact
                      WHERE artifact_id = %s"""
             qdb.sql_connection.TRN.add(sql, [self.id])
-            return [Artifact(p_id)
-                    for p_id in qdb.sql_connection.TRN.execute_fetchflatten()]
+            return Artifact.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten())
 
     def _create_lineage_graph_from_edge_list(self, edge_list):
         """Generates an artifact graph from the given `edge_list`
@@ -881,8 +923,8 @@ class Artifact(qdb.base.QiitaObject):
         # In case the edge list is empty, only 'self' is present in the graph
         if edge_list:
             # By creating all the artifacts here we are saving DB calls
-            nodes = {a_id: Artifact(a_id)
-                     for a_id in set(chain.from_iterable(edge_list))}
+            a_ids = set(chain.from_iterable(edge_list))
+            nodes = dict(zip(a_ids, Artifact.from_ids(a_ids)))
 
             for parent, child in edge_list:
                 lineage.add_edge(nodes[parent], nodes[child])
@@ -937,8 +979,8 @@ class Artifact(qdb.base.QiitaObject):
                      FROM qiita.parent_artifact
                      WHERE parent_id = %s"""
             qdb.sql_connection.TRN.add(sql, [self.id])
-            return [Artifact(c_id)
-                    for c_id in qdb.sql_connection.TRN.execute_fetchflatten()]
+            return Artifact.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten())
 
     @property
     def youngest_artifact(self):
@@ -993,6 +1035,9 @@ class Artifact(qdb.base.QiitaObject):
             The study that owns the artifact
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return qdb.study.Study(row['study_id'])
             sql = """SELECT study_id
                      FROM qiita.study_artifact
                      WHERE artifact_id = %s"""
@@ -1032,5 +1077,5 @@ class Artifact(qdb.base.QiitaObject):
                 sql_args.append(status)
 
             qdb.sql_connection.TRN.add(sql, sql_args)
-            return [qdb.processing_job.ProcessingJob(jid)
-                    for jid in qdb.sql_connection.TRN.execute_fetchflatten()]
+            return qdb.processing_job.ProcessingJob.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten())
@@ -15,6 +15,14 @@ Classes
 
     QiitaObject
     QiitaStatusObject
+
+Methods
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    clear_identity_map
 """
 
 # -----------------------------------------------------------------------------
@@ -26,12 +34,54 @@ Classes
 # -----------------------------------------------------------------------------
 
 from __future__ import division
+from time import time
 
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
 from qiita_core.qiita_settings import qiita_config
 import qiita_db as qdb
 
 
+# Identity map of the process. It holds the (class, id, portal) keys of the
+# objects whose existence and portal visibility have been validated in a
+# committed transaction, together with the time of the validation
+_identity_map = {}
+# Size of the identity map above which the expired keys are removed
+_IDENTITY_MAP_PRUNE_SIZE = 10000
+# Key of the transaction cache holding the objects validated in it
+_TRN_CACHE_KEY = 'qiita_objects'
+# Key of the transaction cache holding the rows prefetched in it
+_ROW_CACHE_KEY = 'qiita_rows'
+
+
+def _add_to_identity_map(keys):
+    """Adds the validated `keys` to the identity map of the process
+
+    Parameters
+    ----------
+    keys : iterable of (type, object, str)
+        The (class, id, portal) keys of the validated objects
+    """
+    now = time()
+    if len(_identity_map) > _IDENTITY_MAP_PRUNE_SIZE:
+        for key, validated in list(_identity_map.items()):
+            if now - validated >= key[0]._identity_map_ttl:
+                _identity_map.pop(key, None)
+    _identity_map.update(dict.fromkeys(keys, now))
+
+
+def clear_identity_map():
+    """Removes all the objects from the identity map of the process
+
+    Notes
+    -----
+    This should be called if the database is modified outside of the
+    objects of this module (e.g. when the test database is rebuilt)
+    """
+    _identity_map.clear()
+    if qdb.sql_connection.TRN._contexts_entered:
+        qdb.sql_connection.TRN.cache.pop(_TRN_CACHE_KEY, None)
+
+
 class QiitaObject(object):
     r"""Base class for any qiita_db object
 
@@ -62,6 +112,13 @@ class QiitaObject(object):
 
     _table = None
     _portal_table = None
+    # Number of seconds during which an object validated in a committed
+    # transaction is not validated again by the other transactions
+    _identity_map_ttl = 10
+    # SQL query retrieving the rows, including the commonly used lookup
+    # values, of the objects whose ids are in the list passed as its only
+    # argument. Only the subclasses defining it support `prefetch`
+    _row_sql = None
 
     @classmethod
     def create(cls):
@@ -159,18 +216,24 @@ class QiitaObject(object):
             qdb.sql_connection.TRN.add(sql, [id_, qiita_config.portal])
             return qdb.sql_connection.TRN.execute_fetchlast()
 
-    def __init__(self, id_):
-        r"""Initializes the object
+    @classmethod
+    def _normalize_id(cls, id_):
+        r"""Returns the identifier of an object as stored in the database
 
         Parameters
         ----------
         id_: int, long, str, or unicode
             the object identifier
 
+        Returns
+        -------
+        int, str or unicode
+            The identifier, with the numerical ones as int
+
         Raises
         ------
-        QiitaDBUnknownIDError
-            If `id_` does not correspond to any object
+        TypeError
+            If `id_` is not a numerical or text type
         """
         # Most IDs in the database are numerical, but some (e.g., IDs used for
         # the User object) are strings. Moreover, some integer IDs are passed
@@ -179,24 +242,298 @@ class QiitaObject(object):
         if not isinstance(id_, (int, long, str, unicode)):
             raise TypeError("id_ must be a numerical or text type (not %s) "
                             "when instantiating "
-                            "%s" % (id_.__class__.__name__,
-                                    self.__class__.__name__))
+                            "%s" % (id_.__class__.__name__, cls.__name__))
 
         if isinstance(id_, (str, unicode)):
             if id_.isdigit():
                 id_ = int(id_)
         elif isinstance(id_, long):
             id_ = int(id_)
+        return id_
+
+    @classmethod
+    def _check_ids(cls, ids):
+        r"""Returns which of the provided IDs actually exist on the database
+
+        Parameters
+        ----------
+        ids : list of object
+            The IDs to test
+
+        Returns
+        -------
+        set of object
+            The IDs in `ids` present on the database
+
+        Notes
+        -----
+        Subclasses overwriting `_check_id` should overwrite this function
+        accordingly.
+        """
+        with qdb.sql_connection.TRN:
+            sql = """SELECT {0}_id
+                     FROM qiita.{0}
+                     WHERE {0}_id = ANY(%s)""".format(cls._table)
+            qdb.sql_connection.TRN.add(sql, [ids])
+            return set(qdb.sql_connection.TRN.execute_fetchflatten())
+
+    @classmethod
+    def _check_portal_ids(cls, ids):
+        """Returns which of the provided IDs are accessible in current portal
+
+        Parameters
+        ----------
+        ids : list of object
+            The IDs to test
+
+        Returns
+        -------
+        set of object
+            The IDs in `ids` accessible in the current portal
+        """
+        if cls._portal_table is None:
+            # assume not portal limited object
+            return set(ids)
+
+        with qdb.sql_connection.TRN:
+            sql = """SELECT {1}_id
+                     FROM qiita.{0}
+                        JOIN qiita.portal_type USING (portal_type_id)
+                     WHERE {1}_id = ANY(%s) AND portal = %s
+                  """.format(cls._portal_table, cls._table)
+            qdb.sql_connection.TRN.add(sql, [ids, qiita_config.portal])
+            return set(qdb.sql_connection.TRN.execute_fetchflatten())
+
+    @classmethod
+    def from_ids(cls, ids, prefetch=False):
+        r"""Instantiates the objects with the given IDs
+
+        Parameters
+        ----------
+        ids : iterable of object
+            The IDs of the objects to instantiate
+        prefetch : bool, optional
+            If true, the rows of the objects are also loaded in one query.
+            See `prefetch`. Default: false
+
+        Returns
+        -------
+        list of QiitaObject
+            The objects, in the same order as `ids`
+
+        Raises
+        ------
+        QiitaDBUnknownIDError
+            If any of the IDs does not exist on the database
+        QiitaDBError
+            If any of the objects is not accessible in the current portal
+
+        Notes
+        -----
+        The existence and the portal visibility of all the objects are checked
+        with a single query each, instead of two queries per object
+        """
+        cls._check_subclass()
+        # The ids are normalized as in the constructor, so they are validated
+        # and reported the same way
+        ids = [cls._normalize_id(id_) for id_ in ids]
+
+        with qdb.sql_connection.TRN:
+            to_check = {id_ for id_ in ids if not cls._is_validated(id_)}
+            if to_check:
+                existing = cls._check_ids(list(to_check))
+                accessible = cls._check_portal_ids(list(to_check))
+                # Keep the order of ids so the error is the same as the one
+                # raised when instantiating the objects one by one
+                for id_ in (i for i in ids if i in to_check):
+                    if id_ not in existing:
+                        raise qdb.exceptions.QiitaDBUnknownIDError(
+                            id_, cls._table)
+                    if id_ not in accessible:
+                        raise qdb.exceptions.QiitaDBError(
+                            "%s with id %d inaccessible in current portal: %s"
+                            % (cls.__name__, id_, qiita_config.portal))
+                for id_ in to_check:
+                    cls._set_validated(id_)
+
+            if prefetch and ids:
+                cls._prefetch_rows(set(ids))
+
+            # All the objects are validated, so they are instantiated without
+            # querying the database
+            return [cls(id_) for id_ in ids]
+
+    @classmethod
+    def _transaction_identity_map(cls):
+        """Returns the keys of the objects validated in the current transaction
+
+        Returns
+        -------
+        set of (type, object, str)
+            The (class, id, portal) keys of the objects validated in the
+            current transaction. They are added to the identity map of the
+            process once the transaction is committed. It is empty, and not
+            kept, outside of a transaction context
+        """
+        if qdb.sql_connection.TRN._contexts_entered == 0:
+            return set()
+        cache = qdb.sql_connection.TRN.cache
+        if _TRN_CACHE_KEY not in cache:
+            cache[_TRN_CACHE_KEY] = set()
+            qdb.sql_connection.TRN.add_post_commit_func(
+                _add_to_identity_map, cache[_TRN_CACHE_KEY])
+        return cache[_TRN_CACHE_KEY]
+
+    @classmethod
+    def _is_validated(cls, id_):
+        """Checks if the object `id_` has already been validated
+
+        Parameters
+        ----------
+        id_ : object
+            The object identifier
+
+        Returns
+        -------
+        bool
+            Whether the object has been validated in the current transaction
+            or in a committed transaction less than `_identity_map_ttl`
+            seconds ago
+        """
+        key = (cls, id_, qiita_config.portal)
+        if key in cls._transaction_identity_map():
+            return True
+        validated = _identity_map.get(key)
+        return (validated is not None and
+                time() - validated < cls._identity_map_ttl)
+
+    @classmethod
+    def _set_validated(cls, id_):
+        """Adds the object `id_` to the identity map of the transaction
+
+        Parameters
+        ----------
+        id_ : object
+            The object identifier
+        """
+        cls._transaction_identity_map().add((cls, id_, qiita_config.portal))
+
+    @classmethod
+    def _invalidate_identity_map(cls, id_):
+        """Removes the object `id_` from the identity maps
+
+        Parameters
+        ----------
+        id_ : object
+            The object identifier
+
+        Notes
+        -----
+        It should be called by any method that removes objects from the
+        database (e.g. `delete`)
+        """
+        def matches(key):
+            return issubclass(key[0], cls) and str(key[1]) == str(id_)
+
+        for key in [k for k in _identity_map if matches(k)]:
+            _identity_map.pop(key, None)
+        with qdb.sql_connection.TRN:
+            validated = cls._transaction_identity_map()
+            validated.difference_update([k for k in validated if matches(k)])
+            rows = qdb.sql_connection.TRN.cache.get(_ROW_CACHE_KEY, {})
+            for key in [k for k in rows if matches(k)]:
+                del rows[key]
+
+    @classmethod
+    def _prefetch_rows(cls, ids):
+        """Loads the rows of the objects `ids` in the transaction cache
+
+        Parameters
+        ----------
+        ids : iterable of object
+            The object identifiers
+
+        Raises
+        ------
+        IncompetentQiitaDeveloperError
+            If the class does not support prefetching
+        """
+        if cls._row_sql is None:
+            raise IncompetentQiitaDeveloperError(
+                "%s does not support prefetching" % cls.__name__)
+
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add(cls._row_sql, [list(ids)])
+            rows = qdb.sql_connection.TRN.cache.setdefault(_ROW_CACHE_KEY, {})
+            id_column = '%s_id' % cls._table
+            for row in qdb.sql_connection.TRN.execute_fetchindex():
+                rows[(cls, row[id_column])] = dict(row)
+
+    def prefetch(self):
+        """Loads the row of the object in one query
+
+        Notes
+        -----
+        The row is kept in the cache of the current transaction, and the
+        properties of the object read their values from it instead of
+        querying the database. The row is discarded when the transaction
+        finishes or when the object is modified, so this has no effect if
+        not called inside a transaction.
+        """
+        self._prefetch_rows([self.id])
+
+    def _prefetched_row(self):
+        """Returns the row of the object loaded by `prefetch`
+
+        Returns
+        -------
+        dict of {str: object} or None
+            The row of the object keyed by column name, None if the row has
+            not been prefetched in the current transaction
+        """
+        return qdb.sql_connection.TRN.cache.get(_ROW_CACHE_KEY, {}).get(
+            (self.__class__, self._id))
+
+    def _invalidate_prefetched_row(self):
+        """Removes the row of the object from the transaction cache
+
+        Notes
+        -----
+        It should be called by any method that modifies the row of the object
+        """
+        qdb.sql_connection.TRN.cache.get(_ROW_CACHE_KEY, {}).pop(
+            (self.__class__, self._id), None)
+
+    def __init__(self, id_):
+        r"""Initializes the object
+
+        Parameters
+        ----------
+        id_: int, long, str, or unicode
+            the object identifier
+
+        Raises
+        ------
+        QiitaDBUnknownIDError
+            If `id_` does not correspond to any object
+        """
+        id_ = self._normalize_id(id_)
 
         with qdb.sql_connection.TRN:
             self._check_subclass()
-            if not self._check_id(id_):
-                raise qdb.exceptions.QiitaDBUnknownIDError(id_, self._table)
+            # Objects already validated are not checked again (see
+            # _is_validated)
+            if not self._is_validated(id_):
+                if not self._check_id(id_):
+                    raise qdb.exceptions.QiitaDBUnknownIDError(
+                        id_, self._table)
+
+                if not self._check_portal(id_):
+                    raise qdb.exceptions.QiitaDBError(
+                        "%s with id %d inaccessible in current portal: %s"
+                        % (self.__class__.__name__, id_, qiita_config.portal))
 
-            if not self._check_portal(id_):
-                raise qdb.exceptions.QiitaDBError(
-                    "%s with id %d inaccessible in current portal: %s"
-                    % (self.__class__.__name__, id_, qiita_config.portal))
+                self._set_validated(id_)
 
         self._id = id_
 
@@ -307,13 +644,7 @@ class QiitaStatusObject(QiitaObject):
         """
         with qdb.sql_connection.TRN:
             # Get all available statuses
-            sql = "SELECT DISTINCT status FROM qiita.{0}_status".format(
-                self._table)
-            qdb.sql_connection.TRN.add(sql)
-            # We need to access to the results of the last SQL query,
-            # hence indexing using -1
-            avail_status = [
-                x[0] for x in qdb.sql_connection.TRN.execute_fetchindex()]
+            avail_status = qdb.util.get_status_values(self._table)
 
             # Check that all the provided status are valid status
             if set(status).difference(avail_status):
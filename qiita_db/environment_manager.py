@@ -80,6 +80,13 @@ def _populate_test_db():
         with open(POPULATE_FP, 'U') as f:
             qdb.sql_connection.TRN.add(f.read())
         qdb.sql_connection.TRN.execute()
+        _index_test_metadata()
+
+
+def _index_test_metadata():
+    """Builds the column catalog and statistics of the demo templates"""
+    qdb.metadata_template.column_catalog.rebuild()
+    qdb.metadata_template.column_stats.rebuild()
 
 
 def _add_ontology_data():
@@ -321,6 +328,10 @@ def drop_and_rebuild_tst_database():
             qdb.sql_connection.TRN.add(f.read())
 
         qdb.sql_connection.TRN.execute()
+        _index_test_metadata()
+        # The objects validated against the old database are no longer valid
+        qdb.base.clear_identity_map()
+        qdb.util.clear_lookup_cache()
 
 
 def reset_test_database(wrapped_fn):
@@ -399,6 +410,8 @@ def patch(patches_dir=PATCHES_DIR, verbose=False):
                     patch_update_sql, [sql_patch_filename])
 
             qdb.sql_connection.TRN.execute()
+            # The patch may have modified the controlled vocabularies
+            qdb.util.clear_lookup_cache()
 
             if exists(py_patch_fp):
                 if verbose:
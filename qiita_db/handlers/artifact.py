@@ -79,6 +79,7 @@ class ArtifactHandler(OauthBaseHandler):
         """
         with qdb.sql_connection.TRN:
             artifact = _get_artifact(artifact_id)
+            artifact.prefetch()
             response = {
                 'name': artifact.name,
                 'timestamp': str(artifact.timestamp),
@@ -25,8 +25,6 @@ Methods
 # -----------------------------------------------------------------------------
 from __future__ import division
 
-from itertools import chain
-
 from qiita_core.qiita_settings import qiita_config
 import qiita_db as qdb
 
@@ -78,7 +76,8 @@ def get_accessible_filepath_ids(user):
             # admins have access all files
             qdb.sql_connection.TRN.add(
                 "SELECT filepath_id FROM qiita.filepath")
-            return set(qdb.sql_connection.TRN.execute_fetchflatten())
+            return {fpid for fpid, in
+                    qdb.sql_connection.TRN.execute_fetch_iter()}
 
         # First, the studies
         # There are private and shared studies
@@ -135,25 +134,8 @@ def get_lat_longs():
     portal_table_ids = [
         s.id for s in qdb.portal.Portal(qiita_config.portal).get_studies()]
 
-    with qdb.sql_connection.TRN:
-        sql = """SELECT DISTINCT table_name
-                 FROM information_schema.columns
-                 WHERE table_name SIMILAR TO 'sample_[0-9]+'
-                    AND table_schema = 'qiita'
-                    AND column_name IN ('latitude', 'longitude')
-                    AND SPLIT_PART(table_name, '_', 2)::int IN %s;"""
-        qdb.sql_connection.TRN.add(sql, [tuple(portal_table_ids)])
-
-        sql = """SELECT CAST(latitude AS FLOAT), CAST(longitude AS FLOAT)
-                 FROM qiita.{0}
-                 WHERE isnumeric(latitude) AND isnumeric(latitude)"""
-        idx = qdb.sql_connection.TRN.index
-
-        portal_tables = qdb.sql_connection.TRN.execute_fetchflatten()
-
-        ebi_null = tuple(qdb.metadata_template.constants.EBI_NULL_VALUES)
-        for table in portal_tables:
-            qdb.sql_connection.TRN.add(sql.format(table), [ebi_null, ebi_null])
-
-        return list(
-            chain.from_iterable(qdb.sql_connection.TRN.execute()[idx:]))
+    if not portal_table_ids:
+        return []
+
+    return qdb.metadata_template.storage.get_storage('sample_').lat_longs(
+        portal_table_ids)
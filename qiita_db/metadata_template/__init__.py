@@ -8,7 +8,12 @@
 
 import constants
 import util
+import storage
+import changeset
+import column_stats
+import column_catalog
 import sample_template
 import prep_template
 
-__all__ = ["sample_template", "prep_template", "util", "constants"]
+__all__ = ["sample_template", "prep_template", "util", "constants",
+           "storage", "changeset", "column_stats", "column_catalog"]
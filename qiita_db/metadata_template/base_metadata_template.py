@@ -36,14 +36,17 @@ Methods
 # -----------------------------------------------------------------------------
 
 from __future__ import division
-from future.utils import viewitems
-from future.builtins import zip
+from future.utils import viewitems, viewvalues
 from itertools import chain
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
 from copy import deepcopy
-from datetime import datetime
+from multiprocessing import Pool
+from os.path import exists, join
+from zlib import crc32
 
-import pandas as pd
 import numpy as np
+import pandas as pd
 from skbio.util import find_duplicates
 import warnings
 
@@ -51,6 +54,110 @@ from qiita_core.exceptions import IncompetentQiitaDeveloperError
 import qiita_db as qdb
 
 
+# Key of the transaction cache holding the sample ids of the templates
+_SAMPLE_IDS_CACHE_KEY = 'qiita_template_sample_ids'
+
+# Key of the transaction cache holding the metadata categories of the templates
+_CATEGORIES_CACHE_KEY = 'qiita_template_categories'
+
+# Key of the transaction cache holding the metadata of the templates
+_DATAFRAME_CACHE_KEY = 'qiita_template_dataframes'
+
+# Maximum number of wrong values of a column listed by validate
+_MAX_WRONG_VALUES = 10
+
+# Key of the transaction cache holding the templates whose files are generated
+# when the transaction is committed
+_DEFERRED_FILES_CACHE_KEY = 'qiita_template_deferred_files'
+
+
+def _serialize_dataframe(df, index_label):
+    """Serializes `df` in the tab-delimited format of the template files
+
+    Parameters
+    ----------
+    df : pandas DataFrame
+        The metadata to serialize
+    index_label : str
+        The header of the sample id column
+
+    Returns
+    -------
+    str
+        The contents of the file, encoded in UTF-8
+    """
+    content = df.to_csv(None, index_label=index_label, na_rep='', sep='\t',
+                        encoding='utf-8')
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    return content
+
+
+def _generate_deferred_files(templates):
+    """Generates the files of `templates` in their own transaction
+
+    Parameters
+    ----------
+    templates : OrderedDict of {(type, int): MetadataTemplate}
+        The templates whose files are generated
+
+    Notes
+    -----
+    This is executed once the transaction that deferred the generation has
+    been committed, so an error is logged instead of raised: the changes of
+    the templates are already stored and only their files are missing
+    """
+    if not templates:
+        return
+    with qdb.sql_connection.TRN:
+        try:
+            for template in viewvalues(templates):
+                if template.exists(template.id):
+                    template.generate_files()
+        except Exception as e:
+            # The queries of the failed generation must not be executed in
+            # the next transaction
+            qdb.sql_connection.TRN.rollback()
+            qdb.logger.LogEntry.create(
+                'Runtime', 'Error generating the template files: %s' % e,
+                info={template.__class__.__name__: template.id})
+        # The changes need to be committed here, as the transaction that
+        # deferred the generation has already been committed
+        qdb.sql_connection.TRN.commit()
+
+
+@contextmanager
+def deferred_file_generation():
+    """Coalesces the file generation of the templates modified in the block
+
+    Inside the block, `generate_files` doesn't write any file. Instead, the
+    files of each modified template are generated once, after the transaction
+    is committed. If the transaction is rolled back, no file is generated.
+
+    Notes
+    -----
+    If the transaction is committed inside the block, the templates modified
+    after the commit generate their files right away. The same happens once
+    the block is exited, even if the transaction is still open.
+    """
+    with qdb.sql_connection.TRN:
+        cache = qdb.sql_connection.TRN.cache
+        if _DEFERRED_FILES_CACHE_KEY in cache:
+            # Nested block, the outermost one generates the files
+            yield
+            return
+        templates = OrderedDict()
+        cache[_DEFERRED_FILES_CACHE_KEY] = templates
+        qdb.sql_connection.TRN.add_post_commit_func(
+            _generate_deferred_files, templates)
+        try:
+            yield
+        finally:
+            # The cache is a new dictionary if the transaction has been
+            # committed or rolled back inside the block
+            qdb.sql_connection.TRN.cache.pop(_DEFERRED_FILES_CACHE_KEY, None)
+
+
 class BaseSample(qdb.base.QiitaObject):
     r"""Sample object that accesses the db to get the information of a sample
     belonging to a PrepTemplate or a SampleTemplate.
@@ -76,6 +183,7 @@ class BaseSample(qdb.base.QiitaObject):
     values
     items
     get
+    prefetch
 
     See Also
     --------
@@ -132,6 +240,7 @@ class BaseSample(qdb.base.QiitaObject):
         self._md_template = md_template
         self._dynamic_table = "%s%d" % (self._table_prefix,
                                         self._md_template.id)
+        self._storage = md_template._storage()
 
     def __hash__(self):
         r"""Defines the hash function so samples are hashable"""
@@ -179,13 +288,13 @@ class BaseSample(qdb.base.QiitaObject):
         -------
         set of str
             The set of all available metadata categories
+
+        Notes
+        -----
+        The categories are cached by the metadata template in the current
+        transaction, so all its samples share them
         """
-        # Get all the columns
-        cols = qdb.util.get_table_cols(self._dynamic_table)
-        # Remove the sample_id column as this column is used internally for
-        # data storage and it doesn't actually belong to the metadata
-        cols.remove('sample_id')
-        return set(cols)
+        return self._md_template._get_category_set()
 
     def _to_dict(self):
         r"""Returns the categories and their values in a dictionary
@@ -195,16 +304,47 @@ class BaseSample(qdb.base.QiitaObject):
         dict of {str: str}
             A dictionary of the form {category: value}
         """
-        with qdb.sql_connection.TRN:
-            sql = "SELECT * FROM qiita.{0} WHERE sample_id=%s".format(
-                self._dynamic_table)
-            qdb.sql_connection.TRN.add(sql, [self._id])
-            d = dict(qdb.sql_connection.TRN.execute_fetchindex()[0])
+        row = self._prefetched_row()
+        if row is not None:
+            return dict(row)
+        return self._storage.get_sample(self._md_template.id, self._id)
+
+    def _row_key(self):
+        r"""Returns the key of the sample in the transaction row cache"""
+        return (self.__class__, self._md_template.id, self._id)
+
+    def prefetch(self):
+        """Loads all the metadata values of the sample in one query
+
+        Notes
+        -----
+        The values are kept in the cache of the current transaction, and the
+        item accesses of the sample are served from it instead of querying
+        the database. They are discarded when the transaction finishes or
+        when the sample or its template are modified, so this has no effect
+        if not called inside a transaction.
+        """
+        rows = qdb.sql_connection.TRN.cache.setdefault(
+            qdb.base._ROW_CACHE_KEY, {})
+        rows[self._row_key()] = self._storage.get_sample(
+            self._md_template.id, self._id)
 
-            # Remove the sample_id, is not part of the metadata
-            del d['sample_id']
+    def _prefetched_row(self):
+        """Returns the values of the sample loaded by `prefetch`
 
-            return d
+        Returns
+        -------
+        dict of {str: str} or None
+            The metadata values keyed by category, None if the sample has not
+            been prefetched in the current transaction
+        """
+        return qdb.sql_connection.TRN.cache.get(
+            qdb.base._ROW_CACHE_KEY, {}).get(self._row_key())
+
+    def _invalidate_prefetched_row(self):
+        """Removes the values of the sample from the transaction cache"""
+        qdb.sql_connection.TRN.cache.get(qdb.base._ROW_CACHE_KEY, {}).pop(
+            self._row_key(), None)
 
     def __len__(self):
         r"""Returns the number of metadata categories
@@ -247,10 +387,12 @@ class BaseSample(qdb.base.QiitaObject):
                     "Metadata category %s does not exists for sample %s"
                     " in template %d" % (key, self._id, self._md_template.id))
 
-            sql = """SELECT {0} FROM qiita.{1}
-                     WHERE sample_id=%s""".format(key, self._dynamic_table)
-            qdb.sql_connection.TRN.add(sql, [self._id])
-            return qdb.sql_connection.TRN.execute_fetchlast()
+            row = self._prefetched_row()
+            if row is not None:
+                return row.get(key)
+
+            return self._storage.get_value(self._md_template.id, self._id,
+                                           key)
 
     def setitem(self, column, value):
         """Sets `value` as value for the given `column`
@@ -275,10 +417,20 @@ class BaseSample(qdb.base.QiitaObject):
                     "Column %s does not exist in %s" %
                     (column, self._dynamic_table))
 
-            sql = """UPDATE qiita.{0}
-                     SET {1}=%s
-                     WHERE sample_id=%s""".format(self._dynamic_table, column)
-            qdb.sql_connection.TRN.add(sql, [value, self._id])
+            stored = qdb.metadata_template.storage._json_value(value)
+            delta = Counter({(column, stored): 1})
+            delta.subtract({(column, self[column]): 1})
+
+            self._storage.update_values(self._md_template.id, [column],
+                                        [[self._id, value]])
+            self._md_template._update_column_stats(delta)
+            qdb.metadata_template.column_catalog.widen_types(
+                self._md_template._template_type(), self._md_template.id,
+                {column: qdb.metadata_template.util.infer_column_type(
+                    [value])})
+            # Also discards the dataframe of the template cached in the
+            # transaction, which holds the old value
+            self._md_template._invalidate_prefetched_samples()
 
     def __setitem__(self, column, value):
         r"""Sets the metadata value for the category `column`
@@ -417,6 +569,7 @@ class MetadataTemplate(qdb.base.QiitaObject):
     values
     items
     get
+    iter_rows
     to_file
     add_filepath
     update
@@ -443,6 +596,16 @@ class MetadataTemplate(qdb.base.QiitaObject):
             qdb.sql_connection.TRN.add(sql, [id_])
             return qdb.sql_connection.TRN.execute_fetchlast()
 
+    @classmethod
+    def _check_ids(cls, ids):
+        r"""Returns which of the MetadataTemplate ids exist on the database"""
+        with qdb.sql_connection.TRN:
+            sql = """SELECT DISTINCT {1}
+                     FROM qiita.{0}
+                     WHERE {1} = ANY(%s)""".format(cls._table, cls._id_column)
+            qdb.sql_connection.TRN.add(sql, [ids])
+            return set(qdb.sql_connection.TRN.execute_fetchflatten())
+
     @classmethod
     def _table_name(cls, obj_id):
         r"""Returns the dynamic table name
@@ -467,6 +630,93 @@ class MetadataTemplate(qdb.base.QiitaObject):
                 "_table_prefix should be defined in the subclasses")
         return "%s%d" % (cls._table_prefix, obj_id)
 
+    @classmethod
+    def _storage(cls):
+        r"""Returns the storage engine holding the metadata of the templates
+
+        Returns
+        -------
+        MetadataStorage
+            The storage engine selected in the configuration file
+        """
+        return qdb.metadata_template.storage.get_storage(cls._table_prefix)
+
+    @classmethod
+    def _template_type(cls):
+        r"""Returns the type of the templates, i.e. "sample" or "prep"
+
+        Returns
+        -------
+        str
+            The type of the templates
+        """
+        cls._check_subclass()
+        return cls._table_prefix.rstrip('_')
+
+    def _get_categories(self):
+        r"""Returns the metadata categories of the template
+
+        Returns
+        -------
+        tuple of str
+            The metadata categories, in storage order
+
+        Notes
+        -----
+        The categories are kept in the cache of the current transaction, so
+        they are retrieved only once per transaction and shared by all the
+        samples of the template. The methods adding or removing categories
+        call `_invalidate_categories`
+        """
+        return self._cached_categories()[0]
+
+    def _get_category_set(self):
+        r"""Returns the metadata categories of the template as a set
+
+        Returns
+        -------
+        frozenset of str
+            The metadata categories
+        """
+        return self._cached_categories()[1]
+
+    def _cached_categories(self):
+        r"""Returns the categories of the template from the transaction cache
+
+        Returns
+        -------
+        (tuple of str, frozenset of str)
+            The metadata categories, in storage order and as a set
+        """
+        with qdb.sql_connection.TRN:
+            cache = qdb.sql_connection.TRN.cache.setdefault(
+                _CATEGORIES_CACHE_KEY, {})
+            key = (self.__class__, self._id)
+            if key not in cache:
+                categories = tuple(self._storage().categories(self._id))
+                cache[key] = (categories, frozenset(categories))
+            return cache[key]
+
+    def _invalidate_categories(self):
+        r"""Discards the cached categories and the prefetched samples"""
+        qdb.sql_connection.TRN.cache.get(_CATEGORIES_CACHE_KEY, {}).pop(
+            (self.__class__, self._id), None)
+        self._invalidate_prefetched_samples()
+
+    def _invalidate_prefetched_samples(self):
+        r"""Removes the samples of the template from the transaction cache
+
+        Notes
+        -----
+        It should be called by any method that modifies the metadata values
+        """
+        rows = qdb.sql_connection.TRN.cache.get(qdb.base._ROW_CACHE_KEY, {})
+        for key in [k for k in rows
+                    if k[0] is self._sample_cls and k[1] == self._id]:
+            del rows[key]
+        qdb.sql_connection.TRN.cache.get(_DATAFRAME_CACHE_KEY, {}).pop(
+            (self.__class__, self._id), None)
+
     @classmethod
     def _clean_validate_template(cls, md_template, study_id,
                                  current_columns=None):
@@ -560,30 +810,23 @@ class MetadataTemplate(qdb.base.QiitaObject):
             headers = sorted(md_template.keys().tolist())
 
             # Insert values on template_sample table
-            values = [[obj_id, s_id] for s_id in sample_ids]
-            sql = """INSERT INTO qiita.{0} ({1}, sample_id)
-                     VALUES (%s, %s)""".format(cls._table, cls._id_column)
-            qdb.sql_connection.TRN.add(sql, values, many=True)
-
-            # Create table with custom columns
-            table_name = cls._table_name(obj_id)
-            column_datatype = ["%s varchar" % col for col in headers]
-            sql = """CREATE TABLE qiita.{0} (
-                        sample_id varchar NOT NULL, {1},
-                        CONSTRAINT fk_{0} FOREIGN KEY (sample_id)
-                            REFERENCES qiita.study_sample (sample_id)
-                            ON UPDATE CASCADE
-                     )""".format(table_name, ', '.join(column_datatype))
-            qdb.sql_connection.TRN.add(sql)
-
-            values = [list(md_template[h]) for h in headers]
-            values.insert(0, sample_ids)
-            values = [list(v) for v in zip(*values)]
-            sql = """INSERT INTO qiita.{0} (sample_id, {1})
-                     VALUES (%s, {2})""".format(
-                table_name, ", ".join(headers),
-                ', '.join(["%s"] * len(headers)))
-            qdb.sql_connection.TRN.add(sql, values, many=True)
+            qdb.sql_connection.TRN.copy_from(
+                "qiita.%s" % cls._table, [cls._id_column, 'sample_id'],
+                ([obj_id, s_id] for s_id in sample_ids))
+
+            # Store the metadata values, streaming them straight from the
+            # DataFrame. The first value of each tuple is the index, i.e. the
+            # sample id
+            cls._storage().create(obj_id, headers,
+                                  md_template[headers].itertuples())
+            qdb.metadata_template.column_stats.set_stats(
+                cls._template_type(), obj_id,
+                qdb.metadata_template.column_stats.count_values(
+                    md_template[headers]))
+            qdb.metadata_template.column_catalog.add_columns(
+                cls._template_type(), obj_id,
+                qdb.metadata_template.column_catalog.infer_types(
+                    md_template[headers]))
 
             # Execute all the steps
             qdb.sql_connection.TRN.execute()
@@ -597,43 +840,48 @@ class MetadataTemplate(qdb.base.QiitaObject):
         list
             Alphabetical list of all metadata headers available
         """
-        with qdb.sql_connection.TRN:
-            sql = """SELECT DISTINCT column_name
-                        FROM information_schema.columns
-                        WHERE table_name LIKE '{0}%' AND
-                              table_name != 'sample_template_filepath' AND
-                              table_name != 'prep_template_filepath' AND
-                              table_name != 'prep_template_sample' AND
-                              table_name != 'prep_template_processing_job' AND
-                              table_name != 'prep_template'
-                        ORDER BY column_name""".format(cls._table_prefix)
-            qdb.sql_connection.TRN.add(sql)
-            return qdb.sql_connection.TRN.execute_fetchflatten()
-
-    def _common_delete_sample_steps(self, sample_name):
-        r"""Executes the common delete sample steps
+        return cls._storage().metadata_headers()
+
+    def _common_delete_samples_steps(self, sample_names):
+        r"""Executes the common delete samples steps
 
         Parameters
         ----------
-        sample_name : str
-            The sample name to be erased
+        sample_names : list of str
+            The sample names to be erased
 
         Raises
         ------
         QiitaDBUnknownIDError
-            If the `sample_name` doesn't exist
+            If any of the `sample_names` doesn't exist
+
+        Notes
+        -----
+        All the samples are removed in a single transaction, with one set-based
+        DELETE per table, and the files are regenerated only once
         """
-        if sample_name not in self.keys():
-            raise qdb.exceptions.QiitaDBUnknownIDError(sample_name, self._id)
+        sample_names = list(sample_names)
+        missing = set(sample_names).difference(self.keys())
+        if missing:
+            raise qdb.exceptions.QiitaDBUnknownIDError(
+                ', '.join(sorted(missing)), self._id)
+        if not sample_names:
+            return
 
         with qdb.sql_connection.TRN:
-            sql = 'DELETE FROM qiita.{0} WHERE sample_id=%s'.format(
-                self._table_name(self._id))
-            qdb.sql_connection.TRN.add(sql, [sample_name])
+            removed = qdb.metadata_template.column_stats.count_values(
+                self.to_dataframe(samples=sample_names))
+            self._update_column_stats(
+                {key: -n for key, n in viewitems(removed)})
+
+            self._storage().delete_samples(self._id, sample_names)
+            self._invalidate_categories()
+            self._invalidate_sample_ids(self._id)
 
-            sql = "DELETE FROM qiita.{0} WHERE sample_id=%s AND {1}=%s".format(
+            sql = """DELETE FROM qiita.{0}
+                     WHERE sample_id = ANY(%s) AND {1} = %s""".format(
                 self._table, self._id_column)
-            qdb.sql_connection.TRN.add(sql, [sample_name, self.id])
+            qdb.sql_connection.TRN.add(sql, [sample_names, self.id])
 
             qdb.sql_connection.TRN.execute()
 
@@ -661,10 +909,13 @@ class MetadataTemplate(qdb.base.QiitaObject):
             raise qdb.exceptions.QiitaDBOperationNotPermittedError(
                 '%s cannot be deleted' % column_name)
         with qdb.sql_connection.TRN:
-            sql = 'ALTER TABLE qiita.%s%d DROP COLUMN %s' % (
-                self._table_prefix, self._id, column_name)
-            qdb.sql_connection.TRN.add(sql)
+            self._storage().drop_column(self._id, column_name)
+            qdb.metadata_template.column_stats.drop_stats(
+                self._template_type(), self._id, [column_name])
+            qdb.metadata_template.column_catalog.drop_columns(
+                self._template_type(), self._id, [column_name])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_categories()
 
             self.generate_files()
 
@@ -739,7 +990,10 @@ class MetadataTemplate(qdb.base.QiitaObject):
             if not is_extendable:
                 raise qdb.exceptions.QiitaDBError(error_msg)
 
-            table_name = self._table_name(self._id)
+            storage = self._storage()
+            column_stats = qdb.metadata_template.column_stats
+            column_catalog = qdb.metadata_template.column_catalog
+            delta = Counter()
             if new_cols:
                 warnings.warn(
                     "The following columns have been added to the existing"
@@ -749,30 +1003,27 @@ class MetadataTemplate(qdb.base.QiitaObject):
                 # code). Sorting the new columns to enforce an order
                 new_cols = sorted(new_cols)
 
-                sql_alter = """ALTER TABLE qiita.{0} ADD COLUMN {1} {2}"""
-                for category in new_cols:
-                    qdb.sql_connection.TRN.add(
-                        sql_alter.format(table_name, category, 'varchar'))
+                storage.add_columns(self._id, new_cols)
+                column_catalog.add_columns(
+                    self._template_type(), self._id,
+                    column_catalog.infer_types(md_template[new_cols]))
+                self._invalidate_categories()
 
                 if existing_samples:
                     # The values for the new columns are the only ones that get
                     # added to the database. None of the existing values will
-                    # be modified (see update for that functionality)
-                    md_filtered = md_template[new_cols].loc[existing_samples]
-                    values = [list(md_filtered[h]) for h in md_filtered]
-                    values.append(existing_samples)
-                    values = [list(v) for v in zip(*values)]
-                    # psycopg2 requires a list of iterable, in which each
-                    # iterable is a set of values to use in the string
-                    # formatting of the query. We have all the values in
-                    # different lists (but in the same order) so use zip to
-                    # create the list of iterable that psycopg2 requires.
-                    set_str = ["{0} = %s".format(col) for col in new_cols]
-                    sql = """UPDATE qiita.{0}
-                             SET {1}
-                             WHERE sample_id=%s""".format(table_name,
-                                                          ",".join(set_str))
-                    qdb.sql_connection.TRN.add(sql, values, many=True)
+                    # be modified (see update for that functionality). All the
+                    # columns are set with a single set-based update, so the
+                    # rows are rewritten only once
+                    md_filtered = md_template.loc[sorted(existing_samples),
+                                                  new_cols]
+                    storage.update_values(
+                        self._id, new_cols,
+                        [list(row) for row in md_filtered.itertuples()])
+                    delta.update(column_stats.count_values(md_filtered))
+                # The samples not present in md_template have no value
+                n_missing = len(curr_samples) - len(existing_samples)
+                delta.update({(col, None): n_missing for col in new_cols})
 
             if new_samples:
                 warnings.warn(
@@ -782,23 +1033,28 @@ class MetadataTemplate(qdb.base.QiitaObject):
                 new_samples = sorted(new_samples)
                 # At this point we only want the information
                 # from the new samples
-                md_filtered = md_template.loc[new_samples]
+                md_filtered = md_template.loc[new_samples, headers]
                 # Insert new_samples in the study table
-                values = [[self._id, s_id] for s_id in new_samples]
-                sql = """INSERT INTO qiita.{0} ({1}, sample_id)
-                         VALUES (%s, %s)""".format(self._table,
-                                                   self._id_column)
-                qdb.sql_connection.TRN.add(sql, values, many=True)
+                qdb.sql_connection.TRN.copy_from(
+                    "qiita.%s" % self._table, [self._id_column, 'sample_id'],
+                    ([self._id, s_id] for s_id in new_samples))
+                self._invalidate_sample_ids(self._id)
 
                 # Insert values on custom table
-                values = [list(md_filtered[h]) for h in md_filtered]
-                values.insert(0, new_samples)
-                values = [list(v) for v in zip(*values)]
-                sql = """INSERT INTO qiita.{0} (sample_id, {1})
-                         VALUES (%s, {2})""".format(
-                    table_name, ", ".join(headers),
-                    ', '.join(["%s"] * len(headers)))
-                qdb.sql_connection.TRN.add(sql, values, many=True)
+                storage.insert_samples(self._id, headers,
+                                       md_filtered.itertuples())
+                self._invalidate_prefetched_samples()
+                delta.update(column_stats.count_values(md_filtered))
+                column_catalog.widen_types(
+                    self._template_type(), self._id,
+                    column_catalog.infer_types(md_filtered))
+                # The new samples have no value for the columns missing in
+                # md_template
+                delta.update({(col, None): len(new_samples)
+                              for col in self._get_category_set().difference(
+                                  headers)})
+
+            self._update_column_stats(delta)
 
             # Execute all the steps
             qdb.sql_connection.TRN.execute()
@@ -818,21 +1074,47 @@ class MetadataTemplate(qdb.base.QiitaObject):
             True if already exists. False otherwise.
         """
         cls._check_subclass()
-        return qdb.util.exists_table(cls._table_name(obj_id))
+        return cls._storage().exists(obj_id)
 
     def _get_sample_ids(self):
         r"""Returns all the available samples for the metadata template
 
         Returns
         -------
-        set of str
+        frozenset of str
             The set of all available sample ids
+
+        Notes
+        -----
+        The sample ids are kept in the cache of the current transaction, so
+        they are retrieved only once per transaction. The methods adding or
+        removing samples call `_invalidate_sample_ids`
         """
         with qdb.sql_connection.TRN:
-            sql = "SELECT sample_id FROM qiita.{0} WHERE {1}=%s".format(
-                self._table, self._id_column)
-            qdb.sql_connection.TRN.add(sql, [self._id])
-            return set(qdb.sql_connection.TRN.execute_fetchflatten())
+            cache = qdb.sql_connection.TRN.cache.setdefault(
+                _SAMPLE_IDS_CACHE_KEY, {})
+            key = (self.__class__, self._id)
+            if key not in cache:
+                sql = "SELECT sample_id FROM qiita.{0} WHERE {1}=%s".format(
+                    self._table, self._id_column)
+                qdb.sql_connection.TRN.add(sql, [self._id])
+                cache[key] = frozenset(
+                    qdb.sql_connection.TRN.execute_fetchflatten())
+            return cache[key]
+
+    @classmethod
+    def _invalidate_sample_ids(cls, obj_id):
+        r"""Removes the sample ids of a template from the transaction cache
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        """
+        qdb.sql_connection.TRN.cache.get(_SAMPLE_IDS_CACHE_KEY, {}).pop(
+            (cls, obj_id), None)
+        qdb.sql_connection.TRN.cache.get(_DATAFRAME_CACHE_KEY, {}).pop(
+            (cls, obj_id), None)
 
     def __len__(self):
         r"""Returns the number of samples in the metadata template
@@ -1024,6 +1306,31 @@ class MetadataTemplate(qdb.base.QiitaObject):
         raise qdb.exceptions.QiitaDBNotImplementedError(
             "generate_files should be implemented in the subclass!")
 
+    def _serialize(self, samples=None):
+        """Serializes the template in tab-delimited format
+
+        Parameters
+        ----------
+        samples : set, optional
+            If supplied, only the specified samples are serialized
+
+        Returns
+        -------
+        str
+            The contents of the template file, encoded in UTF-8
+        """
+        with qdb.sql_connection.TRN:
+            if samples is None:
+                df = self._get_dataframe()
+            else:
+                df = self.to_dataframe(samples=samples)
+
+            # Sorting the dataframe so multiple serializations of the metadata
+            # template are consistent. The cached dataframe is not modified
+            df = df.sort_index(axis=0).sort_index(axis=1)
+
+            return _serialize_dataframe(df, 'sample_name')
+
     def to_file(self, fp, samples=None):
         r"""Writes the MetadataTemplate to the file `fp` in tab-delimited
         format
@@ -1036,46 +1343,256 @@ class MetadataTemplate(qdb.base.QiitaObject):
             If supplied, only the specified samples will be written to the
             file
         """
+        content = self._serialize(samples)
+        # Store the template in a file
+        with open(fp, 'wb') as f:
+            f.write(content)
+
+    def _write_file(self, content, filename, fp_type):
+        """Stores `content` as a new file of the template
+
+        Parameters
+        ----------
+        content : str
+            The contents of the file
+        filename : str
+            The name of the file, inside the templates mountpoint
+        fp_type : str
+            The filepath type of the file
+
+        Returns
+        -------
+        str
+            The path of the file holding `content`
+
+        Notes
+        -----
+        If the latest file of type `fp_type` of the template already holds
+        `content`, neither a file nor a filepath are added and the path of the
+        latest file is returned.
+        """
         with qdb.sql_connection.TRN:
-            df = self.to_dataframe()
-            if samples is not None:
-                df = df.loc[samples]
+            latest = qdb.util.retrieve_filepaths(
+                self._filepath_table, self._id_column, self._id,
+                sort='descending', fp_type=fp_type)
+            if latest and self._file_matches(latest[0][0], latest[0][1],
+                                             content):
+                return latest[0][1]
+
+            _id, fp = qdb.util.get_mountpoint('templates')[0]
+            fp = join(fp, filename)
+            with open(fp, 'wb') as f:
+                f.write(content)
+            self.add_filepath(
+                fp, fp_id=qdb.util.convert_to_id(fp_type, "filepath_type"))
+            return fp
+
+    @staticmethod
+    def _file_matches(fp_id, fp, content):
+        """Whether the file `fp` with id `fp_id` holds `content`
+
+        The checksum stored in the database is compared first, so the file is
+        only read if it is very likely to match
+        """
+        with qdb.sql_connection.TRN:
+            sql = "SELECT checksum FROM qiita.filepath WHERE filepath_id = %s"
+            qdb.sql_connection.TRN.add(sql, [fp_id])
+            checksum = qdb.sql_connection.TRN.execute_fetchlast()
+        if str(checksum) != str(crc32(content) & 0xffffffff) or not exists(fp):
+            return False
+        with open(fp, 'rb') as f:
+            return f.read() == content
 
-            # Sorting the dataframe so multiple serializations of the metadata
-            # template are consistent.
-            df.sort_index(axis=0, inplace=True)
-            df.sort_index(axis=1, inplace=True)
+    def _defer_generate_files(self):
+        """Defers the generation of the files if requested by the transaction
+
+        Returns
+        -------
+        bool
+            Whether the generation of the files has been deferred until the
+            transaction is committed
+
+        See Also
+        --------
+        deferred_file_generation
+        """
+        templates = qdb.sql_connection.TRN.cache.get(
+            _DEFERRED_FILES_CACHE_KEY)
+        if templates is None:
+            return False
+        templates[(self.__class__, self._id)] = self
+        return True
+
+    def iter_rows(self, columns=None, samples=None, chunk_size=2000):
+        """Lazily yields the metadata of the samples in the template
+
+        Parameters
+        ----------
+        columns : iterable of str, optional
+            The metadata categories to retrieve. Default: all of them
+        samples : iterable of str, optional
+            The samples to retrieve. Default: all of them
+        chunk_size : int, optional
+            The number of rows transferred from the database at a time.
+            Default: 2000
+
+        Returns
+        -------
+        generator of (str, dict of {str: str})
+            The sample ids and their metadata, as plain dictionaries keyed by
+            category
+
+        Raises
+        ------
+        RuntimeError
+            If invoked outside a transaction context
+        QiitaDBColumnError
+            If any of `columns` is not part of the template
+
+        Notes
+        -----
+        Unlike `items`, which returns Sample objects querying the database on
+        each access, all the rows are retrieved with a single streaming query.
+        As with `Transaction.execute_fetch_iter`, the rows are only available
+        while inside the transaction context in which this is invoked.
+        """
+        if qdb.sql_connection.TRN._contexts_entered == 0:
+            raise RuntimeError(
+                "Operation not permitted. The rows of a template can only be "
+                "iterated within the transaction context manager.")
+        # The columns are checked right away. The generator doesn't enter the
+        # transaction context, so a generator that is not fully consumed
+        # doesn't leave it open
+        columns = self._check_columns(columns)
+        return self._storage().iter_rows(self._id, columns, samples,
+                                         chunk_size)
+
+    def _check_columns(self, columns):
+        """Checks that all the `columns` are part of the template
+
+        Parameters
+        ----------
+        columns : iterable of str or None
+            The metadata categories to check
+
+        Returns
+        -------
+        list of str or None
+            `columns` as a list, or None if `columns` is None
 
-            # Store the template in a file
-            df.to_csv(fp, index_label='sample_name', na_rep="", sep='\t',
-                      encoding='utf-8')
+        Raises
+        ------
+        QiitaDBColumnError
+            If any of `columns` is not part of the template
+        """
+        if columns is None:
+            return None
+        columns = list(columns)
+        missing = set(columns).difference(self._get_category_set())
+        if missing:
+            raise qdb.exceptions.QiitaDBColumnError(
+                "Non-database keys found: %s" % missing)
+        return columns
 
-    def to_dataframe(self):
+    def to_dataframe(self, columns=None, samples=None, categorical=False):
         """Returns the metadata template as a dataframe
 
+        Parameters
+        ----------
+        columns : iterable of str, optional
+            The metadata categories to retrieve. Default: all of them
+        samples : iterable of str, optional
+            The samples to retrieve. Default: all of them
+        categorical : bool, optional
+            If true, the columns have the category dtype, which reduces the
+            memory used by templates with many repeated values. Default: false
+
+        Returns
+        -------
+        pandas DataFrame
+            The metadata in the template, indexed on sample id
+
+        Raises
+        ------
+        QiitaDBColumnError
+            If any of `columns` is not part of the template
+
+        Notes
+        -----
+        Only the requested columns and samples are transferred from the
+        database, which streams them with COPY TO STDOUT.
+        """
+        with qdb.sql_connection.TRN:
+            columns = self._check_columns(columns)
+            return self._storage().to_dataframe(
+                self._id, columns=columns, samples=samples,
+                categorical=categorical)
+
+    def _get_dataframe(self):
+        """Returns all the metadata of the template as a dataframe
+
         Returns
         -------
         pandas DataFrame
-            The metadata in the template,indexed on sample id
+            The metadata in the template, indexed on sample id. It is shared
+            with the rest of the transaction, so it must not be modified
+
+        Notes
+        -----
+        The dataframe is kept in the cache of the current transaction, so the
+        metadata is retrieved only once per transaction, e.g. when generating
+        the QIIME mapping files of all the prep templates of a study. The
+        methods modifying the metadata call `_invalidate_prefetched_samples`,
+        which discards it
+        """
+        with qdb.sql_connection.TRN:
+            cache = qdb.sql_connection.TRN.cache.setdefault(
+                _DATAFRAME_CACHE_KEY, {})
+            key = (self.__class__, self._id)
+            if key not in cache:
+                cache[key] = self.to_dataframe()
+            return cache[key]
+
+    def column_stats(self):
+        """Returns the number of samples holding each value of each column
+
+        Returns
+        -------
+        dict of {str: dict of {str or None: int}}
+            The number of samples holding each value, keyed by column. The
+            number of samples without value is keyed by None
+
+        Notes
+        -----
+        The statistics are stored in the database and kept up to date by the
+        methods modifying the template, so the metadata is not read. This
+        method never writes to the database: if the statistics of the
+        template are not stored, they are computed from its metadata
         """
+        column_stats = qdb.metadata_template.column_stats
         with qdb.sql_connection.TRN:
-            # Retrieve all the information from the database
-            sql = "SELECT * FROM qiita.{0}".format(self._table_name(self._id))
-            qdb.sql_connection.TRN.add(sql)
-            meta = qdb.sql_connection.TRN.execute_fetchindex()
+            stats = column_stats.get_stats(self._template_type(), self._id)
+            if not stats and self._get_categories():
+                counts = column_stats.count_values(self._get_dataframe())
+                for (column, value), n in viewitems(counts):
+                    stats.setdefault(column, {})[value] = n
+            return stats
 
-            # When we create the dataframe, we are providing a matrix (list of
-            # lists) with all the data, so we need to make sure that all the
-            # rows contain the columns in the same order
-            cols = sorted(meta[0].keys())
-            meta_matrix = [[r[c] for c in cols] for r in meta]
-            df = pd.DataFrame(meta_matrix, columns=cols, dtype=str)
+    def _update_column_stats(self, delta):
+        """Applies `delta` to the statistics of the columns of the template
 
-            # Make sure that we are changing np.NaN by Nones
-            df.where((pd.notnull(df)), None)
-            df.set_index('sample_id', inplace=True, drop=True)
+        Parameters
+        ----------
+        delta : dict of {(str, str or None): int}
+            The variation of the number of samples holding each value of each
+            column
 
-            return df
+        See Also
+        --------
+        qiita_db.metadata_template.column_stats.update_stats
+        """
+        qdb.metadata_template.column_stats.update_stats(
+            self._template_type(), self._id, delta)
 
     def add_filepath(self, filepath, fp_id=None):
         r"""Populates the DB tables for storing the filepath and connects the
@@ -1114,10 +1631,7 @@ class MetadataTemplate(qdb.base.QiitaObject):
             The static and dynamic category fields
 
         """
-        cols = qdb.util.get_table_cols(self._table_name(self._id))
-        cols.remove("sample_id")
-
-        return cols
+        return list(self._get_categories())
 
     def extend(self, md_template):
         """Adds the given template to the current one
@@ -1134,91 +1648,92 @@ class MetadataTemplate(qdb.base.QiitaObject):
             self.validate(self.columns_restrictions)
             self.generate_files()
 
-    def update(self, md_template):
-        r"""Update values in the template
+    def changeset(self, md_template):
+        r"""Computes the values that `md_template` modifies in the template
 
         Parameters
         ----------
         md_template : DataFrame
             The metadata template file contents indexed by samples ids
 
+        Returns
+        -------
+        TemplateChangeset
+            The modified values, which can be previewed before calling update
+
         Raises
         ------
         QiitaDBError
             If md_template and db do not have the same sample ids
             If md_template and db do not have the same column headers
-            If self.can_be_updated is not True
-        QiitaDBWarning
-            If there are no differences between the contents of the DB and the
-            passed md_template
         """
         with qdb.sql_connection.TRN:
             # Clean and validate the metadata template given
             new_map = self._clean_validate_template(
                 md_template, self.study_id, current_columns=self.categories())
-            # Retrieving current metadata
-            current_map = self.to_dataframe()
 
             # simple validations of sample ids and column names
-            samples_diff = set(new_map.index).difference(current_map.index)
+            samples_diff = set(new_map.index).difference(
+                self._get_sample_ids())
             if samples_diff:
                 raise qdb.exceptions.QiitaDBError(
                     'The new template differs from what is stored '
                     'in database by these samples names: %s'
                     % ', '.join(samples_diff))
 
-            if not set(current_map.columns).issuperset(new_map.columns):
-                columns_diff = set(new_map.columns).difference(
-                    current_map.columns)
+            columns_diff = set(new_map.columns).difference(
+                self._get_category_set())
+            if columns_diff:
                 raise qdb.exceptions.QiitaDBError(
                     'Some of the columns in your template are not present in '
                     'the system. Use "extend" if you want to add more columns '
                     'to the template. Missing columns: %s'
                     % ', '.join(columns_diff))
 
-            # In order to speed up some computation, let's compare only the
-            # common columns and rows. current_map.columns and
-            # current_map.index are supersets of new_map.columns and
-            # new_map.index, respectivelly, so this will not fail
-            current_map = current_map[new_map.columns].loc[new_map.index]
-
-            # Get the values that we need to change
-            # diff_map is a DataFrame that hold boolean values. If a cell is
-            # True, means that the new_map is different from the current_map
-            # while False means that the cell has the same value
-            diff_map = current_map != new_map
-            # ne_stacked holds a MultiIndexed DataFrame in which the first
-            # level of indexing is the sample_name and the second one is the
-            # columns. We only have 1 column, which holds if that
-            # (sample, column) pair has been modified or not (i.e. cell)
-            ne_stacked = diff_map.stack()
-            # by using ne_stacked to index himself, we get only the columns
-            # that did change (see boolean indexing in pandas docs)
-            changed = ne_stacked[ne_stacked]
-            if changed.empty:
+            # In order to speed up some computation, let's retrieve and
+            # compare only the common columns and rows. They are subsets of
+            # the template, so this will not fail
+            current_map = self.to_dataframe(columns=new_map.columns,
+                                            samples=new_map.index)
+
+            return qdb.metadata_template.changeset.TemplateChangeset(
+                current_map, new_map)
+
+    def update(self, md_template, chunk_size=10000):
+        r"""Update values in the template
+
+        Parameters
+        ----------
+        md_template : DataFrame
+            The metadata template file contents indexed by samples ids
+        chunk_size : int, optional
+            The maximum number of samples updated by each statement.
+            Default: 10000
+
+        Raises
+        ------
+        QiitaDBError
+            If md_template and db do not have the same sample ids
+            If md_template and db do not have the same column headers
+            If self.can_be_updated is not True
+        QiitaDBWarning
+            If there are no differences between the contents of the DB and the
+            passed md_template
+
+        See Also
+        --------
+        changeset
+        """
+        with qdb.sql_connection.TRN:
+            changeset = self.changeset(md_template)
+            if changeset.empty:
                 warnings.warn(
                     "There are no differences between the data stored in the "
                     "DB and the new data provided",
                     qdb.exceptions.QiitaDBWarning)
                 return
 
-            changed.index.names = ['sample_name', 'column']
-            # the combination of np.where and boolean indexing produces
-            # a numpy array with only the values that actually changed
-            # between the current_map and new_map
-            changed_to = new_map.values[np.where(diff_map)]
-
-            # to_update is a MultiIndexed DataFrame, in which the index 0 is
-            # the samples and the index 1 is the columns, we define these
-            # variables here so we don't put magic numbers across the code
-            sample_idx = 0
-            col_idx = 1
-            to_update = pd.DataFrame({'to': changed_to}, index=changed.index)
-
-            # Get the columns that we need to change
-            indices = list(set(to_update.index.labels[col_idx]))
-            cols_to_update = to_update.index.levels[col_idx][indices]
-
+            cols_to_update = changeset.columns
             if not self.can_be_updated(columns=set(cols_to_update)):
                 raise qdb.exceptions.QiitaDBError(
                     'The new template is modifying fields that cannot be '
@@ -1226,33 +1741,20 @@ class MetadataTemplate(qdb.base.QiitaObject):
                     'deleting the processed data. You are trying to modify: %s'
                     % ', '.join(cols_to_update))
 
-            # Get the samples that we need to change
-            indices = list(set(to_update.index.labels[sample_idx]))
-            samples_to_update = to_update.index.levels[sample_idx][indices]
-
-            sql_eq_cols = ', '.join(
-                ["{0} = c.{0}".format(col) for col in cols_to_update])
-            # We add 1 because we need to add the sample name
-            single_value = "(%s)" % ', '.join(
-                ["%s"] * (len(cols_to_update) + 1))
-            sql_values = ', '.join([single_value] * len(samples_to_update))
-            sql_cols = ', '.join(cols_to_update)
-
-            sql = """UPDATE qiita.{0} AS t SET
-                        {1}
-                     FROM (VALUES {2})
-                        AS c(sample_id, {3})
-                     WHERE c.sample_id = t.sample_id
-                    """.format(self._table_name(self._id), sql_eq_cols,
-                               sql_values, sql_cols)
-            sql_args = []
-            for sample in samples_to_update:
-                sample_vals = [new_map[col][sample] for col in cols_to_update]
-                sample_vals.insert(0, sample)
-                sql_args.extend(sample_vals)
-
-            qdb.sql_connection.TRN.add(sql, sql_args)
+            storage = self._storage()
+            for rows in changeset.iter_rows(chunk_size):
+                storage.update_values(self._id, cols_to_update, rows)
+                qdb.sql_connection.TRN.execute()
+            changes = changeset.changes
+            self._update_column_stats(
+                qdb.metadata_template.column_stats.count_changes(changes))
+            qdb.metadata_template.column_catalog.widen_types(
+                self._template_type(), self._id,
+                {column: qdb.metadata_template.util.infer_column_type(values)
+                 for column, values in changes['new'].groupby(
+                     level='column')})
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_samples()
 
             self.validate(self.columns_restrictions)
             self.generate_files()
@@ -1272,22 +1774,56 @@ class MetadataTemplate(qdb.base.QiitaObject):
         QiitaDBUnknownIDError
             If a sample_id is included in values that is not in the template
         QiitaDBColumnError
-            If the column does not exist in the table. This is implicit, and
-            can be thrown by the contained Samples.
+            If the column does not exist in the table
+
+        Notes
+        -----
+        All the values are written with a single set-based update
         """
         with qdb.sql_connection.TRN:
-            if not set(self.keys()).issuperset(samples_and_values):
-                missing = set(self.keys()) - set(samples_and_values)
-                table_name = self._table_name(self._id)
+            table_name = self._table_name(self._id)
+            missing = set(samples_and_values).difference(
+                self._get_sample_ids())
+            if missing:
                 raise qdb.exceptions.QiitaDBUnknownIDError(missing, table_name)
 
-            for k, v in viewitems(samples_and_values):
-                sample = self[k]
-                if isinstance(v, np.generic):
-                    v = np.asscalar(v)
-                sample.setitem(category, v)
+            if category not in self._get_category_set():
+                raise qdb.exceptions.QiitaDBColumnError(
+                    "Column %s does not exist in %s" % (category, table_name))
+
+            if not samples_and_values:
+                return
 
+            sample_ids = list(samples_and_values)
+            values = [samples_and_values[s_id] for s_id in sample_ids]
+            # Numpy scalars can't be adapted by psycopg2. If all the values
+            # are numpy scalars of the same type, they are converted in a
+            # single call. Otherwise they are converted one by one, as an
+            # array would cast them to a common type (e.g. 1 to 1.0)
+            value_types = set(type(v) for v in values)
+            if (len(value_types) == 1 and
+                    issubclass(value_types.pop(), np.generic)):
+                values = np.asarray(values).tolist()
+            else:
+                values = [np.asscalar(v) if isinstance(v, np.generic) else v
+                          for v in values]
+
+            column_stats = qdb.metadata_template.column_stats
+            delta = column_stats.count_values(pd.DataFrame(
+                {category: values}, index=sample_ids, dtype=object))
+            delta.subtract(column_stats.count_values(
+                self.to_dataframe(columns=[category], samples=sample_ids)))
+
+            self._storage().update_values(
+                self._id, [category],
+                [[s_id, v] for s_id, v in zip(sample_ids, values)])
+            self._update_column_stats(delta)
+            qdb.metadata_template.column_catalog.widen_types(
+                self._template_type(), self._id,
+                {category: qdb.metadata_template.util.infer_column_type(
+                    values)})
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_samples()
 
     def get_category(self, category):
         """Returns the values of all samples for the given category
@@ -1307,12 +1843,7 @@ class MetadataTemplate(qdb.base.QiitaObject):
         QiitaDBColumnError
             If category is not part of the template
         """
-        with qdb.sql_connection.TRN:
-            qdb.util.check_table_cols([category], self._table_name(self._id))
-            sql = 'SELECT sample_id, {0} FROM qiita.{1}'.format(
-                category, self._table_name(self._id))
-            qdb.sql_connection.TRN.add(sql)
-            return dict(qdb.sql_connection.TRN.execute_fetchindex())
+        return self._storage().get_category(self._id, category)
 
     def check_restrictions(self, restrictions):
         """Checks if the template fulfills the restrictions
@@ -1413,22 +1944,32 @@ class MetadataTemplate(qdb.base.QiitaObject):
                 warnings.warn("No new accession numbers to update",
                               qdb.exceptions.QiitaDBWarning)
 
-    def validate(self, restriction_dict):
+    def validate(self, restriction_dict, processes=1):
         """ Validate the values in the restricted fields in info files
 
         Parameters
         ----------
         restriction_dict : dict of {str: Restriction}
             A dictionary with the restrictions that apply to the metadata
+        processes : int, optional
+            The number of worker processes in which the columns are
+            validated. Default: 1, validate them in the current process
 
         Raises
         ------
         QiitaDBWarning
             If the values aren't castable
+
+        Notes
+        -----
+        The warning summarizes the wrong values of each column, listing at
+        most _MAX_WRONG_VALUES of them
         """
         warning_msg = []
         columns = self.categories()
-        wrong_msg = 'Sample "%s", column "%s", wrong value "%s"'
+
+        # Check the columns of the restrictions present in the template
+        to_check = []
         for label, restriction in viewitems(restriction_dict):
             missing = set(restriction.columns).difference(columns)
             if missing:
@@ -1436,39 +1977,39 @@ class MetadataTemplate(qdb.base.QiitaObject):
                     "%s: %s" % (restriction.error_msg,
                                 ', '.join(sorted(missing))))
             else:
-                valid_null = qdb.metadata_template.constants.EBI_NULL_VALUES
-                for column, datatype in viewitems(restriction.columns):
-                    for sample, val in viewitems(self.get_category(column)):
-                        # ignore if valid null value
-                        if val in valid_null:
-                            continue
-                        # test values
-                        if datatype == datetime:
-                            val = str(val)
-                            formats = [
-                                # 4 digits year
-                                '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M',
-                                '%m/%d/%Y %H', '%m/%d/%Y', '%m/%Y', '%Y',
-                                # 2 digits year
-                                '%m/%d/%y %H:%M:%S', '%m/%d/%y %H:%M',
-                                '%m/%d/%y %H', '%m/%d/%y', '%m/%y', '%y'
-                                ]
-                            date = None
-                            for fmt in formats:
-                                try:
-                                    date = datetime.strptime(val, fmt)
-                                    break
-                                except ValueError:
-                                    pass
-                            if date is None:
-                                warning_msg.append(
-                                    wrong_msg % (sample, column, val))
-                        else:
-                            try:
-                                datatype(val)
-                            except (ValueError, TypeError):
-                                warning_msg.append(
-                                    wrong_msg % (sample, column, val))
+                to_check.extend(viewitems(restriction.columns))
+        to_check = sorted(set(to_check))
+
+        if to_check:
+            # Retrieve the values of all the restricted columns present in
+            # the template in a single query
+            values = self.to_dataframe(
+                columns=sorted({col for col, _ in to_check}))
+            tasks = [(values[col], datatype) for col, datatype in to_check]
+            get_invalid = qdb.metadata_template.util._get_invalid_values
+            if processes > 1 and len(tasks) > 1:
+                pool = Pool(min(processes, len(tasks)))
+                try:
+                    results = pool.map(get_invalid, tasks)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                results = [get_invalid(t) for t in tasks]
+
+            for (column, _), wrong in zip(to_check, results):
+                if wrong.empty:
+                    continue
+                wrong = wrong.sort_index()
+                examples = ', '.join(
+                    '"%s" (sample %s)' % (val, sample) for sample, val in
+                    zip(wrong.index[:_MAX_WRONG_VALUES],
+                        wrong.values[:_MAX_WRONG_VALUES]))
+                if len(wrong) > _MAX_WRONG_VALUES:
+                    examples += ' and %d more' % (
+                        len(wrong) - _MAX_WRONG_VALUES)
+                warning_msg.append('Column "%s", %d wrong values: %s'
+                                   % (column, len(wrong), examples))
 
         if warning_msg:
             warnings.warn(
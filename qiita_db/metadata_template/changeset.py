@@ -0,0 +1,134 @@
+r"""
+Metadata changesets (:mod: `qiita_db.metadata_template.changeset`)
+==================================================================
+
+..currentmodule:: qiita_db.metadata_template.changeset
+
+This module provides the TemplateChangeset class, which holds the values that
+an update modifies in a metadata template. A changeset can be previewed before
+it is applied with `MetadataTemplate.update`.
+
+Classes
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    TemplateChangeset
+"""
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from __future__ import division
+
+import pandas as pd
+import numpy as np
+
+
+class TemplateChangeset(object):
+    r"""The cells of a metadata template modified by an update
+
+    Parameters
+    ----------
+    current : pandas DataFrame
+        The metadata stored in the database, indexed by sample id. It must
+        hold, at least, the samples and columns of `new`
+    new : pandas DataFrame
+        The new metadata, indexed by sample id
+
+    Attributes
+    ----------
+    samples
+    columns
+    changes
+    empty
+
+    Notes
+    -----
+    The differences are computed cell by cell in a single vectorized
+    comparison. Two missing values (None or NaN) are considered equal.
+    """
+    def __init__(self, current, new):
+        current = current.loc[new.index, new.columns]
+        old_values = current.values
+        new_values = new.values
+        both_null = pd.isnull(current).values & pd.isnull(new).values
+        changed = (old_values != new_values) & ~both_null
+
+        row_idx, col_idx = np.nonzero(changed)
+        self._samples = new.index[np.unique(row_idx)].tolist()
+        self._columns = new.columns[np.unique(col_idx)].tolist()
+        self._changes = pd.DataFrame(
+            {'old': old_values[changed], 'new': new_values[changed]},
+            index=pd.MultiIndex.from_arrays(
+                [new.index.values[row_idx], new.columns.values[col_idx]],
+                names=['sample_name', 'column']),
+            columns=['old', 'new'])
+        # Unchanged cells of the changed samples and columns hold the current
+        # value, so these rows can be written as a whole
+        self._new = new.loc[self._samples, self._columns]
+
+    def __len__(self):
+        """Returns the number of modified cells"""
+        return len(self._changes)
+
+    @property
+    def empty(self):
+        """Whether the changeset does not modify any value"""
+        return len(self) == 0
+
+    @property
+    def samples(self):
+        """The samples with at least one modified value
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._samples)
+
+    @property
+    def columns(self):
+        """The metadata categories with at least one modified value
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._columns)
+
+    @property
+    def changes(self):
+        """The modified cells
+
+        Returns
+        -------
+        pandas DataFrame
+            The old and new values of the modified cells, indexed by
+            (sample_name, column)
+        """
+        return self._changes.copy()
+
+    def iter_rows(self, chunk_size=10000):
+        """Yields the new values of the modified samples in chunks
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            The maximum number of samples in each chunk. Default: 10000
+
+        Returns
+        -------
+        generator of list of lists
+            The rows of each chunk. The first value of each row is the sample
+            id, followed by the values of `columns`, in order
+        """
+        for start in range(0, len(self._samples), chunk_size):
+            chunk = self._new.iloc[start:start + chunk_size]
+            yield [list(row) for row in chunk.itertuples()]
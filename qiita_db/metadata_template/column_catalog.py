@@ -0,0 +1,193 @@
+r"""
+Metadata column catalog (:mod: `qiita_db.metadata_template.column_catalog`)
+==========================================================================
+
+..currentmodule:: qiita_db.metadata_template.column_catalog
+
+This module provides the functions that maintain the catalog of the columns
+of the metadata templates, stored in the ``qiita.metadata_column`` table. The
+catalog holds the columns of every template, with the type inferred from
+their values, so the lookups of the templates having a given column are
+indexed queries regardless of the storage engine.
+
+The columns are added when a template is created or extended and removed
+when a column or the template are deleted. The type of a column is widened
+as values are stored (e.g. an integer column becomes float when a decimal
+value is stored), so all its values can always be cast to it.
+
+Methods
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    infer_types
+    add_columns
+    widen_types
+    drop_columns
+    get_columns
+    rebuild
+"""
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from __future__ import division
+
+from future.utils import viewitems
+
+import qiita_db as qdb
+
+
+def infer_types(md_template):
+    """Infers the type of each column of a template
+
+    Parameters
+    ----------
+    md_template : pandas DataFrame
+        The metadata, indexed by sample id
+
+    Returns
+    -------
+    dict of {str: str or None}
+        The type of each column, as returned by `infer_column_type`
+    """
+    return {column: qdb.metadata_template.util.infer_column_type(
+                md_template[column])
+            for column in md_template.columns}
+
+
+def add_columns(template_type, obj_id, column_types):
+    """Adds columns to the catalog
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    column_types : dict of {str: str or None}
+        The type of each of the new columns
+    """
+    if not column_types:
+        return
+    sql = """INSERT INTO qiita.metadata_column
+                (template_type, template_id, column_name, column_type)
+             VALUES (%s, %s, %s, %s)"""
+    qdb.sql_connection.TRN.add(
+        sql, [[template_type, obj_id, column, column_type]
+              for column, column_type in viewitems(column_types)], many=True)
+
+
+def widen_types(template_type, obj_id, column_types):
+    """Widens the type of some columns to hold values of another type
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    column_types : dict of {str: str or None}
+        The type of the values stored in each column
+
+    Notes
+    -----
+    An integer column becomes float if float values are stored. Any other
+    combination of different types results in varchar
+    """
+    column_types = [[column, column_type]
+                    for column, column_type in viewitems(column_types)
+                    if column_type is not None]
+    if not column_types:
+        return
+    sql = """UPDATE qiita.metadata_column AS c
+             SET column_type = CASE
+                WHEN c.column_type IS NULL
+                    OR c.column_type = n.column_type THEN n.column_type
+                WHEN c.column_type IN ('integer', 'float')
+                    AND n.column_type IN ('integer', 'float') THEN 'float'
+                ELSE 'varchar' END
+             FROM (VALUES {0}) AS n(column_name, column_type)
+             WHERE c.template_type = %s AND c.template_id = %s
+                AND c.column_name = n.column_name
+                AND c.column_type IS DISTINCT FROM n.column_type""".format(
+        ', '.join(["(%s, %s)"] * len(column_types)))
+    qdb.sql_connection.TRN.add(
+        sql, [v for row in column_types for v in row] +
+        [template_type, obj_id])
+
+
+def drop_columns(template_type, obj_id, columns=None):
+    """Removes columns from the catalog
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    columns : list of str, optional
+        The columns to remove. Default: all the columns of the template
+    """
+    sql = """DELETE FROM qiita.metadata_column
+             WHERE template_type = %s AND template_id = %s"""
+    sql_args = [template_type, obj_id]
+    if columns is not None:
+        sql += " AND column_name IN %s"
+        sql_args.append(tuple(columns))
+    qdb.sql_connection.TRN.add(sql, sql_args)
+
+
+def get_columns(template_type, obj_id):
+    """Returns the columns of a template in the catalog
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+
+    Returns
+    -------
+    dict of {str: str or None}
+        The type of each column of the template
+    """
+    with qdb.sql_connection.TRN:
+        sql = """SELECT column_name, column_type
+                 FROM qiita.metadata_column
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(sql, [template_type, obj_id])
+        return dict(qdb.sql_connection.TRN.execute_fetchindex())
+
+
+def rebuild(verbose=False):
+    """Rebuilds the catalog from the metadata stored in the templates
+
+    Parameters
+    ----------
+    verbose : bool, optional
+        If True, print the templates as they are added to the catalog
+
+    Returns
+    -------
+    int
+        The number of templates added to the catalog
+
+    Notes
+    -----
+    The catalog is written in the current transaction (see
+    `qiita_db.metadata_template.storage._rebuild`)
+    """
+    def catalog(template_type, obj_id, md_template):
+        drop_columns(template_type, obj_id)
+        add_columns(template_type, obj_id, infer_types(md_template))
+
+    return qdb.metadata_template.storage._rebuild(
+        catalog, 'Cataloging the columns of', verbose)
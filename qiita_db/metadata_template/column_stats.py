@@ -0,0 +1,307 @@
+r"""
+Metadata column statistics (:mod: `qiita_db.metadata_template.column_stats`)
+============================================================================
+
+..currentmodule:: qiita_db.metadata_template.column_stats
+
+This module provides the functions that maintain the statistics of the
+columns of the metadata templates, i.e. the number of samples holding each
+distinct value of a column (including NULL). The statistics are stored in
+the ``qiita.metadata_column_stats`` table, so the template summaries don't
+need to load the whole template.
+
+The statistics are computed when a template is created, and the methods
+modifying a template apply the difference between the old and the new values
+(see `count_values` and `count_changes`). The statistics of the templates
+created before the table existed are computed by `rebuild`.
+
+Methods
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    count_values
+    count_changes
+    get_stats
+    set_stats
+    update_stats
+    drop_stats
+    rebuild
+"""
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from __future__ import division
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from future.utils import viewitems
+
+import qiita_db as qdb
+from .storage import _json_value, _temp_table, _VALUES_ROWS
+
+
+_STATS_TABLE = 'qiita.metadata_column_stats'
+
+# Temporary table holding the differences applied by update_stats
+_DELTA_TABLE = 'qiita_column_stats_delta'
+
+
+def _count(columns, values):
+    """Counts the (column, value) pairs
+
+    Parameters
+    ----------
+    columns : array-like of str
+        The column of each value
+    values : array-like of objects
+        The values, in the same order as `columns`
+
+    Returns
+    -------
+    Counter of {(str, str or None): int}
+        The number of occurrences of each pair. The values are converted to
+        the strings stored in the database, and the missing values are
+        counted as None
+    """
+    columns = np.asarray(columns, dtype=object)
+    # Casting to object turns the numpy scalars into python objects
+    values = pd.Series([_json_value(v)
+                        for v in np.asarray(values, dtype=object)],
+                       dtype=object)
+    null = values.isnull().values
+
+    counts = Counter()
+    if (~null).any():
+        pairs = pd.DataFrame({'column': columns[~null],
+                              'value': values.values[~null]})
+        counts.update(pairs.groupby(['column', 'value']).size().to_dict())
+    if null.any():
+        counts.update({(column, None): n for column, n in viewitems(
+            pd.Series(columns[null]).value_counts().to_dict())})
+    return counts
+
+
+def count_values(md_template):
+    """Counts the values of each column of a template
+
+    Parameters
+    ----------
+    md_template : pandas DataFrame
+        The metadata, indexed by sample id
+
+    Returns
+    -------
+    Counter of {(str, str or None): int}
+        The number of samples holding each value of each column. Missing
+        values are counted as None
+    """
+    # The values are flattened row by row, so the columns repeat in order
+    return _count(np.tile(md_template.columns.values, len(md_template)),
+                  md_template.values.ravel())
+
+
+def count_changes(changes):
+    """Computes the difference in the statistics introduced by some changes
+
+    Parameters
+    ----------
+    changes : pandas DataFrame
+        The modified cells, indexed by (sample_name, column) and with the
+        'old' and 'new' values as columns, as in `TemplateChangeset.changes`
+
+    Returns
+    -------
+    Counter of {(str, str or None): int}
+        The variation of the number of samples holding each value
+    """
+    columns = changes.index.get_level_values('column')
+    delta = _count(columns, changes['new'].values)
+    delta.subtract(_count(columns, changes['old'].values))
+    return delta
+
+
+def get_stats(template_type, obj_id):
+    """Returns the statistics of the columns of a template
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+
+    Returns
+    -------
+    dict of {str: dict of {str or None: int}}
+        The number of samples holding each value, keyed by column. The
+        number of samples without value is keyed by None. It is empty if the
+        statistics of the template have not been computed
+    """
+    with qdb.sql_connection.TRN:
+        sql = """SELECT column_name, value, count
+                 FROM {0}
+                 WHERE template_type = %s AND template_id = %s""".format(
+            _STATS_TABLE)
+        qdb.sql_connection.TRN.add(sql, [template_type, obj_id])
+        stats = {}
+        for column, value, n in qdb.sql_connection.TRN.execute_fetchindex():
+            stats.setdefault(column, {})[value] = n
+        return stats
+
+
+def set_stats(template_type, obj_id, counts):
+    """Replaces the statistics of the columns of a template
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    counts : Counter of {(str, str or None): int}
+        The number of samples holding each value of each column, as returned
+        by `count_values`
+    """
+    drop_stats(template_type, obj_id)
+    qdb.sql_connection.TRN.copy_from(
+        _STATS_TABLE,
+        ['template_type', 'template_id', 'column_name', 'value', 'count'],
+        ([template_type, obj_id, column, value, n]
+         for (column, value), n in viewitems(counts) if n > 0))
+
+
+def _apply_delta(template_type, obj_id, sql_delta, delta_args):
+    """Adds the queries applying a variation of the statistics of a template
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    sql_delta : str
+        The FROM item holding the variation, aliased as d(column_name, value,
+        count)
+    delta_args : list
+        The arguments of `sql_delta`
+    """
+    sql = """UPDATE {0} AS s SET count = s.count + d.count
+             FROM {1}
+             WHERE s.template_type = %s AND s.template_id = %s
+                AND s.column_name = d.column_name
+                AND s.value IS NOT DISTINCT FROM d.value""".format(
+        _STATS_TABLE, sql_delta)
+    qdb.sql_connection.TRN.add(sql, delta_args + [template_type, obj_id])
+
+    sql = """INSERT INTO {0}
+                (template_type, template_id, column_name, value, count)
+             SELECT %s, %s, d.column_name, d.value, d.count
+             FROM {1}
+             WHERE EXISTS (SELECT 1 FROM {0}
+                           WHERE template_type = %s AND template_id = %s)
+                AND NOT EXISTS (
+                    SELECT 1 FROM {0} AS s
+                    WHERE s.template_type = %s AND s.template_id = %s
+                        AND s.column_name = d.column_name
+                        AND s.value IS NOT DISTINCT FROM d.value)""".format(
+        _STATS_TABLE, sql_delta)
+    qdb.sql_connection.TRN.add(
+        sql, [template_type, obj_id] + delta_args +
+        [template_type, obj_id, template_type, obj_id])
+
+    sql = """DELETE FROM {0}
+             WHERE template_type = %s AND template_id = %s
+                AND count <= 0""".format(_STATS_TABLE)
+    qdb.sql_connection.TRN.add(sql, [template_type, obj_id])
+
+
+def update_stats(template_type, obj_id, delta):
+    """Applies a difference to the statistics of the columns of a template
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    delta : dict of {(str, str or None): int}
+        The variation of the number of samples holding each value, e.g. as
+        returned by `count_changes`
+
+    Notes
+    -----
+    Nothing is done if the statistics of the template have not been
+    computed, as they can only be computed from the stored metadata (see
+    `rebuild`). The values no sample holds are removed.
+    """
+    rows = [[column, value, n]
+            for (column, value), n in viewitems(delta) if n != 0]
+    if not rows:
+        return
+
+    if len(rows) > _VALUES_ROWS:
+        table_cols = [('column_name', 'varchar'), ('value', 'varchar'),
+                      ('count', 'bigint')]
+        with _temp_table(_DELTA_TABLE, table_cols, rows) as table:
+            _apply_delta(template_type, obj_id, "%s AS d" % table, [])
+    else:
+        sql_delta = "(VALUES {0}) AS d(column_name, value, count)".format(
+            ', '.join(["(%s, %s::varchar, %s::bigint)"] * len(rows)))
+        _apply_delta(template_type, obj_id, sql_delta,
+                     [v for row in rows for v in row])
+
+
+def drop_stats(template_type, obj_id, columns=None):
+    """Removes the statistics of the columns of a template
+
+    Parameters
+    ----------
+    template_type : {'sample', 'prep'}
+        The type of the template
+    obj_id : int
+        The template id
+    columns : list of str, optional
+        The columns whose statistics are removed. Default: all of them
+    """
+    sql = """DELETE FROM {0}
+             WHERE template_type = %s AND template_id = %s""".format(
+        _STATS_TABLE)
+    sql_args = [template_type, obj_id]
+    if columns is not None:
+        sql += " AND column_name IN %s"
+        sql_args.append(tuple(columns))
+    qdb.sql_connection.TRN.add(sql, sql_args)
+
+
+def rebuild(verbose=False):
+    """Recomputes the statistics of all the templates from their metadata
+
+    Parameters
+    ----------
+    verbose : bool, optional
+        If True, print the templates as their statistics are computed
+
+    Returns
+    -------
+    int
+        The number of templates whose statistics have been computed
+
+    Notes
+    -----
+    The statistics are written in the current transaction (see
+    `qiita_db.metadata_template.storage._rebuild`)
+    """
+    def compute(template_type, obj_id, md_template):
+        set_stats(template_type, obj_id, count_values(md_template))
+
+    return qdb.metadata_template.storage._rebuild(
+        compute, 'Computing the column statistics of', verbose)
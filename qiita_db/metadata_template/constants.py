@@ -74,6 +74,16 @@ ALL_RESTRICTIONS = [SAMPLE_TEMPLATE_COLUMNS, PREP_TEMPLATE_COLUMNS,
 EBI_NULL_VALUES = ['Not applicable', 'Missing: Not collected',
                    'Missing: Not provided', 'Missing: Restricted access']
 
+# The formats accepted in the datetime restricted columns, in the order they
+# are tried
+DATETIME_FORMATS = [
+    # 4 digits year
+    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y %H', '%m/%d/%Y', '%m/%Y',
+    '%Y',
+    # 2 digits year
+    '%m/%d/%y %H:%M:%S', '%m/%d/%y %H:%M', '%m/%d/%y %H', '%m/%d/%y', '%m/%y',
+    '%y']
+
 # These are what will be considered 'True' bool values on metadata import
 TRUE_VALUES = ['Yes', 'yes', 'YES', 'Y', 'y', 'True', 'true', 'TRUE', 't', 'T']
 
@@ -9,7 +9,6 @@
 from __future__ import division
 from future.utils import viewvalues
 from itertools import chain
-from os.path import join
 from time import strftime
 from copy import deepcopy
 import warnings
@@ -20,7 +19,8 @@ from qiita_core.exceptions import IncompetentQiitaDeveloperError
 import qiita_db as qdb
 from .constants import (PREP_TEMPLATE_COLUMNS, TARGET_GENE_DATA_TYPES,
                         PREP_TEMPLATE_COLUMNS_TARGET_GENE)
-from .base_metadata_template import BaseSample, MetadataTemplate
+from .base_metadata_template import (BaseSample, MetadataTemplate,
+                                     _serialize_dataframe)
 
 
 class PrepSample(BaseSample):
@@ -196,8 +196,6 @@ class PrepTemplate(MetadataTemplate):
             If no prep template with id = id_ exists
         """
         with qdb.sql_connection.TRN:
-            table_name = cls._table_name(id_)
-
             if not cls.exists(id_):
                 raise qdb.exceptions.QiitaDBUnknownIDError(id_, cls.__name__)
 
@@ -219,9 +217,13 @@ class PrepTemplate(MetadataTemplate):
                      WHERE prep_template_id = %s"""
             qdb.sql_connection.TRN.add(sql, args)
 
-            # Drop the prep_X table
-            sql = "DROP TABLE qiita.{0}".format(table_name)
-            qdb.sql_connection.TRN.add(sql)
+            # Remove the metadata values
+            cls._storage().drop(id_)
+            qdb.metadata_template.column_stats.drop_stats(
+                cls._template_type(), id_)
+            qdb.metadata_template.column_catalog.drop_columns(
+                cls._template_type(), id_)
+            cls._invalidate_sample_ids(id_)
 
             # Remove the rows from prep_template_samples
             sql = "DELETE FROM qiita.{0} WHERE {1} = %s".format(
@@ -239,6 +241,7 @@ class PrepTemplate(MetadataTemplate):
             qdb.sql_connection.TRN.add(sql, args)
 
             qdb.sql_connection.TRN.execute()
+            cls._invalidate_identity_map(id_)
 
     def data_type(self, ret_id=False):
         """Returns the data_type or the data_type id
@@ -438,18 +441,24 @@ class PrepTemplate(MetadataTemplate):
 
     def generate_files(self):
         r"""Generates all the files that contain data from this template
+
+        Notes
+        -----
+        Files whose contents didn't change are not written again. The
+        generation is deferred until the transaction is committed if
+        requested with `deferred_file_generation`
         """
         with qdb.sql_connection.TRN:
-            # figuring out the filepath of the prep template
-            _id, fp = qdb.util.get_mountpoint('templates')[0]
-            fp = join(fp, '%d_prep_%d_%s.txt' % (self.study_id, self._id,
-                      strftime("%Y%m%d-%H%M%S")))
-            # storing the template
-            self.to_file(fp)
+            if self._defer_generate_files():
+                return
 
-            # adding the fp to the object
-            fp_id = qdb.util.convert_to_id("prep_template", "filepath_type")
-            self.add_filepath(fp, fp_id=fp_id)
+            # storing the template, unless the latest file already holds the
+            # same contents
+            self._write_file(
+                self._serialize(),
+                '%d_prep_%d_%s.txt' % (self.study_id, self._id,
+                                       strftime("%Y%m%d-%H%M%S")),
+                "prep_template")
 
             # creating QIIME mapping file
             self.create_qiime_mapping_file()
@@ -491,28 +500,18 @@ class PrepTemplate(MetadataTemplate):
             else:
                 new_cols = ['BarcodeSequence', 'LinkerPrimerSequence']
 
-            # Retrieve the latest sample template
-            # Since we sorted the filepath retrieval, the first result contains
-            # the filepath that we want. `retrieve_filepaths` returns a
-            # 3-tuple, in which the fp is the second element
-            sample_template_fp = qdb.util.retrieve_filepaths(
-                "sample_template_filepath", "study_id", self.study_id,
-                sort='descending')[0][1]
-
-            # reading files via pandas
-            st = qdb.metadata_template.util.load_template_to_dataframe(
-                sample_template_fp)
-            pt = self.to_dataframe()
+            # The metadata of the sample template is cached in the
+            # transaction, so it is retrieved only once when generating the
+            # files of all the prep templates of the study
+            st = qdb.metadata_template.sample_template.SampleTemplate(
+                self.study_id)._get_dataframe()
+            pt = self._get_dataframe()
 
-            st_sample_names = set(st.index)
-            pt_sample_names = set(pt.index)
-
-            if not pt_sample_names.issubset(st_sample_names):
+            missing_samples = pt.index.difference(st.index)
+            if len(missing_samples):
                 raise ValueError(
                     "Prep template is not a sub set of the sample template, "
-                    "file: %s - samples: %s"
-                    % (sample_template_fp,
-                       ', '.join(pt_sample_names-st_sample_names)))
+                    "samples: %s" % ', '.join(missing_samples))
 
             mapping = pt.join(st, lsuffix="_prep")
             mapping.rename(columns=rename_cols, inplace=True)
@@ -545,21 +544,13 @@ class PrepTemplate(MetadataTemplate):
             new_cols.append('Description')
             mapping = mapping[new_cols]
 
-            # figuring out the filepath for the QIIME map file
-            _id, fp = qdb.util.get_mountpoint('templates')[0]
-            filepath = join(fp, '%d_prep_%d_qiime_%s.txt' % (self.study_id,
-                            self.id, strftime("%Y%m%d-%H%M%S")))
-
-            # Save the mapping file
-            mapping.to_csv(filepath, index_label='#SampleID', na_rep='',
-                           sep='\t', encoding='utf-8')
-
-            # adding the fp to the object
-            self.add_filepath(
-                filepath,
-                fp_id=qdb.util.convert_to_id("qiime_map", "filepath_type"))
-
-            return filepath
+            # Save the mapping file, unless the latest mapping file already
+            # holds the same contents
+            return self._write_file(
+                _serialize_dataframe(mapping, '#SampleID'),
+                '%d_prep_%d_qiime_%s.txt' % (self.study_id, self.id,
+                                             strftime("%Y%m%d-%H%M%S")),
+                "qiime_map")
 
     @property
     def status(self):
@@ -664,9 +655,24 @@ class PrepTemplate(MetadataTemplate):
         QiitaDBColumnError
             If the prep info file has been processed
         """
+        self.delete_samples([sample_name])
+
+    def delete_samples(self, sample_names):
+        """Delete `sample_names` from prep information file
+
+        Parameters
+        ----------
+        sample_names : list of str
+            The sample names to be deleted
+
+        Raises
+        ------
+        QiitaDBOperationNotPermittedError
+            If the prep info file has been processed
+        """
         if self.artifact:
             raise qdb.exceptions.QiitaDBOperationNotPermittedError(
                 "Prep info file '%d' has files attached, you cannot delete "
                 "samples." % (self._id))
 
-        self._common_delete_sample_steps(sample_name)
+        self._common_delete_samples_steps(sample_names)
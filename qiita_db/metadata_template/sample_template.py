@@ -7,7 +7,6 @@
 # -----------------------------------------------------------------------------
 
 from __future__ import division
-from os.path import join
 from time import strftime
 from future.utils import viewitems
 
@@ -124,22 +123,25 @@ class SampleTemplate(MetadataTemplate):
                     "Sample template cannot be erased because there are prep "
                     "templates associated.")
 
-            table_name = cls._table_name(id_)
-
             # Delete the sample template filepaths
             sql = """DELETE FROM qiita.sample_template_filepath
                      WHERE study_id = %s"""
             args = [id_]
             qdb.sql_connection.TRN.add(sql, args)
 
-            sql = "DROP TABLE qiita.{0}".format(table_name)
-            qdb.sql_connection.TRN.add(sql)
+            cls._storage().drop(id_)
+            qdb.metadata_template.column_stats.drop_stats(
+                cls._template_type(), id_)
+            qdb.metadata_template.column_catalog.drop_columns(
+                cls._template_type(), id_)
+            cls._invalidate_sample_ids(id_)
 
             sql = "DELETE FROM qiita.{0} WHERE {1} = %s".format(
                 cls._table, cls._id_column)
             qdb.sql_connection.TRN.add(sql, args)
 
             qdb.sql_connection.TRN.execute()
+            cls._invalidate_identity_map(id_)
 
     @property
     def study_id(self):
@@ -176,15 +178,32 @@ class SampleTemplate(MetadataTemplate):
         QiitaDBOperationNotPermittedError
             If the `sample_name` has been used in a prep info file
         """
-        pts = {pt.id: pt.get(sample_name) is not None
+        self.delete_samples([sample_name])
+
+    def delete_samples(self, sample_names):
+        """Delete `sample_names` from sample information file
+
+        Parameters
+        ----------
+        sample_names : list of str
+            The sample names to be deleted
+
+        Raises
+        ------
+        QiitaDBOperationNotPermittedError
+            If any of the `sample_names` has been used in a prep info file
+        """
+        sample_names = set(sample_names)
+        pts = {pt.id: sample_names.intersection(pt.keys())
                for pt in qdb.study.Study(self.study_id).prep_templates()}
-        if any(pts.values()):
-            pts = ', '.join([str(k) for k, v in viewitems(pts) if v])
+        linked = set().union(*pts.values())
+        if linked:
+            pts = ', '.join([str(k) for k, v in sorted(viewitems(pts)) if v])
             raise qdb.exceptions.QiitaDBOperationNotPermittedError(
                 "'%s' has been linked in a prep template(s): %s" % (
-                    sample_name, pts))
+                    "', '".join(sorted(linked)), pts))
 
-        self._common_delete_sample_steps(sample_name)
+        self._common_delete_samples_steps(sorted(sample_names))
 
     def can_be_updated(self, **kwargs):
         """Whether the template can be updated or not
@@ -239,17 +258,23 @@ class SampleTemplate(MetadataTemplate):
 
     def generate_files(self):
         r"""Generates all the files that contain data from this template
+
+        Notes
+        -----
+        Files whose contents didn't change are not written again. The
+        generation is deferred until the transaction is committed if
+        requested with `deferred_file_generation`
         """
         with qdb.sql_connection.TRN:
-            # figuring out the filepath of the sample template
-            _id, fp = qdb.util.get_mountpoint('templates')[0]
-            fp = join(fp, '%d_%s.txt' % (self.id, strftime("%Y%m%d-%H%M%S")))
-            # storing the sample template
-            self.to_file(fp)
-
-            # adding the fp to the object
-            fp_id = qdb.util.convert_to_id("sample_template", "filepath_type")
-            self.add_filepath(fp, fp_id=fp_id)
+            if self._defer_generate_files():
+                return
+
+            # storing the sample template, unless the latest file already
+            # holds the same contents
+            self._write_file(
+                self._serialize(),
+                '%d_%s.txt' % (self.id, strftime("%Y%m%d-%H%M%S")),
+                "sample_template")
 
             # generating all new QIIME mapping files
             for pt in qdb.study.Study(self._id).prep_templates():
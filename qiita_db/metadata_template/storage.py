@@ -0,0 +1,1089 @@
+r"""
+Metadata storage (:mod: `qiita_db.metadata_template.storage`)
+=============================================================
+
+..currentmodule:: qiita_db.metadata_template.storage
+
+This module provides the storage engines used to hold the sample and prep
+metadata in the database. The engine is selected per deployment with the
+METADATA_STORAGE option of the postgres section of the configuration file:
+
+- ``tables`` (default): each template is stored in its own table
+  (``qiita.sample_<study_id>`` or ``qiita.prep_<prep_template_id>``), with a
+  varchar column per metadata category.
+- ``jsonb``: all the templates are stored in the single table
+  ``qiita.metadata_sample_values``, with one row per sample holding the
+  metadata in a JSONB object, and ``qiita.metadata_template_header`` records
+  the templates and their categories. It requires PostgreSQL 9.5 or newer.
+
+The templates can be moved from one engine to the other with
+`migrate_storage` (see ``qiita-env migrate-metadata-storage``).
+
+Classes
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    MetadataStorage
+    TableStorage
+    JSONBStorage
+
+Methods
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    get_storage
+    migrate_storage
+"""
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from __future__ import division
+from contextlib import contextmanager
+from json import dumps
+from tempfile import SpooledTemporaryFile
+
+import pandas as pd
+from future.builtins import zip
+from six import text_type
+
+from qiita_core.qiita_settings import qiita_config
+import qiita_db as qdb
+
+
+_SPOOL_SIZE = 64 * 1024 * 1024
+
+# Updates of more rows than this are loaded with COPY in a temporary table
+# instead of being inlined in the statement
+_VALUES_ROWS = 500
+
+# Updates of more values than this, e.g. the new columns added when extending
+# a template, are also loaded with COPY
+_VALUES_CELLS = 20000
+
+# Temporary table holding the values of a bulk update
+_UPDATE_TABLE = 'qiita_metadata_update'
+
+
+def _json_value(value):
+    """Converts `value` to the value stored in the JSONB object
+
+    Parameters
+    ----------
+    value : object
+        The value to convert
+
+    Returns
+    -------
+    str or None
+        The value as stored in a varchar column of a template table. None and
+        NaN are stored as null
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, text_type):
+        return value
+    if isinstance(value, float):
+        # repr keeps all the significant digits, as psycopg2 does when it
+        # adapts a float
+        return repr(value)
+    return str(value)
+
+
+def _inline_values(n_rows, n_columns):
+    """Whether an update is small enough to inline its values in the statement
+
+    Parameters
+    ----------
+    n_rows : int
+        The number of rows updated
+    n_columns : int
+        The number of values of each row
+
+    Returns
+    -------
+    bool
+        False if the values should be loaded with COPY in a temporary table
+    """
+    return n_rows <= _VALUES_ROWS and n_rows * n_columns <= _VALUES_CELLS
+
+
+@contextmanager
+def _temp_table(name, columns, rows):
+    """Loads `rows` with COPY in a temporary table, dropped on exit
+
+    Parameters
+    ----------
+    name : str
+        The name of the temporary table
+    columns : list of (str, str)
+        The name and the SQL type of the columns of the table
+    rows : iterable of iterables
+        The rows to load, holding one value per column
+
+    Yields
+    ------
+    str
+        The name of the table
+
+    Notes
+    -----
+    It is used by the set-based updates of many rows: as the rows are loaded
+    with COPY, the size of the statements doesn't depend on the number of
+    rows. The statements using the table are added to the current
+    transaction within the context.
+    """
+    sql = "CREATE TEMP TABLE {0} ({1}) ON COMMIT DROP".format(
+        name, ', '.join('%s %s' % col for col in columns))
+    qdb.sql_connection.TRN.add(sql)
+    qdb.sql_connection.TRN.copy_from(name, [c for c, _ in columns], rows)
+    yield name
+    qdb.sql_connection.TRN.add("DROP TABLE %s" % name)
+
+
+def _read_dataframe(sql, sql_args, categorical=False):
+    """Executes `sql` and reads its result in a dataframe
+
+    Parameters
+    ----------
+    sql : str
+        The query to execute. The first column must be sample_id
+    sql_args : list or None
+        The arguments of the query
+    categorical : bool, optional
+        If true, the columns of the dataframe have the category dtype
+
+    Returns
+    -------
+    pandas DataFrame
+        The result of the query, indexed by sample id and with the columns
+        sorted by name. NULL values are returned as None (NaN if
+        `categorical` is true)
+    """
+    # The result is spooled to disk only if it does not fit in _SPOOL_SIZE
+    with SpooledTemporaryFile(max_size=_SPOOL_SIZE) as f:
+        qdb.sql_connection.TRN.copy_to(sql, sql_args, f)
+        f.seek(0)
+        # All the values are kept as strings, and only the NULL marker
+        # written by copy_to is parsed as a missing value
+        df = pd.read_csv(f, dtype=str, index_col='sample_id',
+                         na_values=['\\N'], keep_default_na=False)
+    df = df[sorted(df.columns)]
+
+    if categorical:
+        for col in df.columns:
+            df[col] = df[col].astype('category')
+    else:
+        df = df.where(pd.notnull(df), None)
+
+    return df
+
+
+class MetadataStorage(object):
+    r"""Base class of the metadata storage engines
+
+    Parameters
+    ----------
+    table_prefix : str
+        The prefix of the templates stored, i.e. "sample_" or "prep_"
+
+    Notes
+    -----
+    The methods modifying the metadata add their queries to the current
+    transaction, so it is up to the caller to execute them.
+    """
+    name = None
+
+    def __init__(self, table_prefix):
+        self._table_prefix = table_prefix
+        self._template_type = table_prefix.rstrip('_')
+
+    def template_ids(self):
+        r"""Returns the ids of the templates stored in this engine
+
+        Returns
+        -------
+        list of int
+            The template ids
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def exists(self, obj_id):
+        r"""Checks if the template `obj_id` is stored in this engine
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+
+        Returns
+        -------
+        bool
+            Whether the template is stored in this engine
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def create(self, obj_id, headers, rows):
+        r"""Stores a new template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        headers : list of str
+            The metadata categories of the template
+        rows : iterable of tuples
+            The metadata of the samples. The first value of each tuple is the
+            sample id, followed by the values of `headers`, in order
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def drop(self, obj_id):
+        r"""Removes the template `obj_id`
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def categories(self, obj_id):
+        r"""Returns the metadata categories of the template `obj_id`
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+
+        Returns
+        -------
+        list of str
+            The metadata categories
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def get_sample(self, obj_id, sample_id):
+        r"""Returns the metadata of a sample
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        sample_id : str
+            The sample id
+
+        Returns
+        -------
+        dict of {str: str}
+            The metadata of the sample keyed by category
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def get_value(self, obj_id, sample_id, column):
+        r"""Returns the value of `column` for a sample
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        sample_id : str
+            The sample id
+        column : str
+            The metadata category
+
+        Returns
+        -------
+        str
+            The value
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def get_category(self, obj_id, column):
+        r"""Returns the values of `column` for all the samples
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        column : str
+            The metadata category
+
+        Returns
+        -------
+        dict of {str: str}
+            The values keyed by sample id
+
+        Raises
+        ------
+        QiitaDBColumnError
+            If `column` is not part of the template
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def to_dataframe(self, obj_id, columns=None, samples=None,
+                     categorical=False):
+        r"""Returns the template `obj_id` as a dataframe
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        columns : list of str, optional
+            The metadata categories to retrieve. Default: all of them
+        samples : iterable of str, optional
+            The samples to retrieve. Default: all of them
+        categorical : bool, optional
+            If true, the columns of the dataframe have the category dtype.
+            Default: false
+
+        Returns
+        -------
+        pandas DataFrame
+            The metadata of the template, indexed by sample id and with the
+            columns sorted by name
+
+        Notes
+        -----
+        The projection is resolved by the database, and the result is
+        transferred with COPY TO STDOUT and parsed with `pandas.read_csv`
+        """
+        with qdb.sql_connection.TRN:
+            sql, sql_args = self._select_sql(obj_id, columns, samples)
+            return _read_dataframe(sql, sql_args, categorical)
+
+    def _select_sql(self, obj_id, columns, samples):
+        r"""Builds the query retrieving the metadata of the template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        columns : list of str or None
+            The metadata categories to retrieve. None for all of them
+        samples : iterable of str or None
+            The samples to retrieve. None for all of them
+
+        Returns
+        -------
+        (str, list)
+            The query and its arguments. The query returns the sample_id
+            column followed by a column per metadata category
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def iter_rows(self, obj_id, columns=None, samples=None, chunk_size=2000):
+        r"""Lazily yields the metadata of the samples of the template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        columns : list of str, optional
+            The metadata categories to retrieve. Default: all of them
+        samples : iterable of str, optional
+            The samples to retrieve. Default: all of them
+        chunk_size : int, optional
+            The number of rows transferred from the server at a time
+
+        Returns
+        -------
+        generator of (str, dict of {str: str})
+            The sample ids and their metadata keyed by category
+
+        Notes
+        -----
+        The rows are retrieved with a single streaming query, so this must be
+        consumed inside a transaction
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def add_columns(self, obj_id, columns):
+        r"""Adds empty metadata categories to the template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        columns : list of str
+            The new metadata categories
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def drop_column(self, obj_id, column):
+        r"""Removes a metadata category from the template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        column : str
+            The metadata category
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def insert_samples(self, obj_id, headers, rows):
+        r"""Adds new samples to the template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        headers : list of str
+            The metadata categories present in `rows`
+        rows : iterable of tuples
+            The metadata of the new samples. The first value of each tuple is
+            the sample id, followed by the values of `headers`, in order.
+            None and NaN are stored as null
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def update_values(self, obj_id, columns, rows):
+        r"""Updates the values of existing samples
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        columns : list of str
+            The metadata categories to update
+        rows : list of lists
+            The new values. The first value of each list is the sample id,
+            followed by the values of `columns`, in order
+
+        Notes
+        -----
+        When there are many rows or values (e.g. when the values of new
+        columns are added to all the samples), they are loaded with COPY in a
+        temporary table, and the template is updated with a single join
+        against it
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def delete_samples(self, obj_id, sample_ids):
+        r"""Removes samples from the template
+
+        Parameters
+        ----------
+        obj_id : int
+            The template id
+        sample_ids : list of str
+            The samples to remove
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def metadata_headers(self):
+        r"""Returns the metadata categories of all the templates
+
+        Returns
+        -------
+        list of str
+            Alphabetical list of the metadata categories
+
+        Notes
+        -----
+        The categories are looked up in the catalog of the metadata columns.
+        As when they were read from the template tables, sample_id is listed
+        if there is any template
+        """
+        with qdb.sql_connection.TRN:
+            sql = """SELECT column_name
+                     FROM qiita.metadata_column
+                     WHERE template_type = %s
+                     UNION
+                     SELECT 'sample_id'
+                     WHERE EXISTS (SELECT * FROM qiita.metadata_column
+                                   WHERE template_type = %s)
+                     ORDER BY column_name"""
+            qdb.sql_connection.TRN.add(
+                sql, [self._template_type, self._template_type])
+            return qdb.sql_connection.TRN.execute_fetchflatten()
+
+    def lat_longs(self, obj_ids):
+        r"""Returns the numeric latitude and longitude of the samples
+
+        Parameters
+        ----------
+        obj_ids : list of int
+            The templates to look at
+
+        Returns
+        -------
+        list of [float, float]
+            The latitude and longitude of each sample
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def search_templates_sql(self, columns):
+        r"""Returns the queries selecting the templates having `columns`
+
+        Parameters
+        ----------
+        columns : iterable of str
+            The metadata categories that the templates need to have
+
+        Returns
+        -------
+        list of str
+            Queries returning the template table names, i.e. prefix + id. The
+            templates having all the columns are the intersection of the
+            results of the queries
+
+        Notes
+        -----
+        The templates are looked up in the catalog of the metadata columns,
+        whose column names are in lowercase
+        """
+        sql = ("SELECT DISTINCT '{0}' || CAST(template_id AS VARCHAR) "
+               "FROM qiita.metadata_column "
+               "WHERE template_type = '{1}'".format(self._table_prefix,
+                                                    self._template_type))
+        if not columns:
+            return [sql]
+        return ["%s AND column_name = lower('%s')"
+                % (sql, qdb.util.scrub_data(col)) for col in columns]
+
+    def search_join_sql(self, alias):
+        r"""Returns the JOIN of the template '{0}' to the study_sample `ss`
+
+        Parameters
+        ----------
+        alias : str
+            The alias given to the joined template
+
+        Returns
+        -------
+        str
+            The JOIN clause. The template id is left as a '{0}' placeholder
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+    def search_column_sql(self, alias, column):
+        r"""Returns the SQL expression holding the value of `column`
+
+        Parameters
+        ----------
+        alias : str
+            The alias given to the template in `search_join_sql`
+        column : str
+            The metadata category
+
+        Returns
+        -------
+        str
+            The SQL expression
+        """
+        raise qdb.exceptions.QiitaDBNotImplementedError()
+
+
+class TableStorage(MetadataStorage):
+    r"""Stores each template in its own table, with a column per category"""
+    name = 'tables'
+
+    def _table_name(self, obj_id):
+        return "%s%d" % (self._table_prefix, obj_id)
+
+    def template_ids(self):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT table_name
+                     FROM information_schema.tables
+                     WHERE table_schema = 'qiita'
+                        AND table_name SIMILAR TO %s"""
+            qdb.sql_connection.TRN.add(sql, ['%s[0-9]+' % self._table_prefix])
+            return sorted(int(t[len(self._table_prefix):]) for t in
+                          qdb.sql_connection.TRN.execute_fetchflatten())
+
+    def exists(self, obj_id):
+        return qdb.util.exists_table(self._table_name(obj_id))
+
+    def create(self, obj_id, headers, rows):
+        table_name = self._table_name(obj_id)
+        # A template can have no categories, e.g. when it is moved from
+        # another storage after all its columns were deleted
+        column_datatype = ''.join(", %s varchar" % col for col in headers)
+        sql = """CREATE TABLE qiita.{0} (
+                    sample_id varchar NOT NULL{1},
+                    CONSTRAINT fk_{0} FOREIGN KEY (sample_id)
+                        REFERENCES qiita.study_sample (sample_id)
+                        ON UPDATE CASCADE
+                 )""".format(table_name, column_datatype)
+        qdb.sql_connection.TRN.add(sql)
+        qdb.sql_connection.TRN.copy_from(
+            "qiita.%s" % table_name, ['sample_id'] + headers, rows)
+
+    def drop(self, obj_id):
+        qdb.sql_connection.TRN.add(
+            "DROP TABLE qiita.{0}".format(self._table_name(obj_id)))
+
+    def categories(self, obj_id):
+        cols = qdb.util.get_table_cols(self._table_name(obj_id))
+        # The sample_id column is used internally for data storage and it
+        # doesn't actually belong to the metadata
+        cols.remove('sample_id')
+        return cols
+
+    def get_sample(self, obj_id, sample_id):
+        with qdb.sql_connection.TRN:
+            sql = "SELECT * FROM qiita.{0} WHERE sample_id=%s".format(
+                self._table_name(obj_id))
+            qdb.sql_connection.TRN.add(sql, [sample_id])
+            d = dict(qdb.sql_connection.TRN.execute_fetchindex()[0])
+            del d['sample_id']
+            return d
+
+    def get_value(self, obj_id, sample_id, column):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT {0} FROM qiita.{1}
+                     WHERE sample_id=%s""".format(column,
+                                                  self._table_name(obj_id))
+            qdb.sql_connection.TRN.add(sql, [sample_id])
+            return qdb.sql_connection.TRN.execute_fetchlast()
+
+    def get_category(self, obj_id, column):
+        with qdb.sql_connection.TRN:
+            table_name = self._table_name(obj_id)
+            qdb.util.check_table_cols([column], table_name)
+            sql = 'SELECT sample_id, {0} FROM qiita.{1}'.format(column,
+                                                                table_name)
+            qdb.sql_connection.TRN.add(sql)
+            return dict(qdb.sql_connection.TRN.execute_fetchindex())
+
+    def _select_sql(self, obj_id, columns, samples):
+        cols = '*' if columns is None else ', '.join(
+            ['sample_id'] + list(columns))
+        sql = "SELECT {0} FROM qiita.{1}".format(cols,
+                                                 self._table_name(obj_id))
+        sql_args = None
+        if samples is not None:
+            sql += " WHERE sample_id = ANY(%s)"
+            sql_args = [list(samples)]
+        return sql, sql_args
+
+    def iter_rows(self, obj_id, columns=None, samples=None, chunk_size=2000):
+        sql, sql_args = self._select_sql(obj_id, columns, samples)
+        qdb.sql_connection.TRN.add(sql, sql_args)
+        for row in qdb.sql_connection.TRN.execute_fetch_iter(
+                itersize=chunk_size):
+            row = dict(row)
+            yield row.pop('sample_id'), row
+
+    def add_columns(self, obj_id, columns):
+        if not columns:
+            return
+        # A single statement, so the table is altered only once
+        sql = "ALTER TABLE qiita.{0} {1}".format(
+            self._table_name(obj_id),
+            ', '.join("ADD COLUMN %s varchar" % c for c in columns))
+        qdb.sql_connection.TRN.add(sql)
+
+    def drop_column(self, obj_id, column):
+        qdb.sql_connection.TRN.add('ALTER TABLE qiita.%s DROP COLUMN %s'
+                                   % (self._table_name(obj_id), column))
+
+    def insert_samples(self, obj_id, headers, rows):
+        qdb.sql_connection.TRN.copy_from(
+            "qiita.%s" % self._table_name(obj_id), ['sample_id'] + headers,
+            rows)
+
+    def update_values(self, obj_id, columns, rows):
+        sql_eq_cols = ', '.join(["{0} = c.{0}".format(col) for col in columns])
+        if not _inline_values(len(rows), len(columns) + 1):
+            table_cols = [(c, 'varchar')
+                          for c in ['sample_id'] + list(columns)]
+            with _temp_table(_UPDATE_TABLE, table_cols, rows) as table:
+                sql = """UPDATE qiita.{0} AS t SET
+                            {1}
+                         FROM {2} AS c
+                         WHERE c.sample_id = t.sample_id""".format(
+                    self._table_name(obj_id), sql_eq_cols, table)
+                qdb.sql_connection.TRN.add(sql)
+            return
+
+        # We add 1 because we need to add the sample name
+        single_value = "(%s)" % ', '.join(["%s"] * (len(columns) + 1))
+        sql_values = ', '.join([single_value] * len(rows))
+        sql = """UPDATE qiita.{0} AS t SET
+                    {1}
+                 FROM (VALUES {2})
+                    AS c(sample_id, {3})
+                 WHERE c.sample_id = t.sample_id
+                """.format(self._table_name(obj_id), sql_eq_cols, sql_values,
+                           ', '.join(columns))
+        # The values are bound as strings, so the columns of the VALUES list
+        # are always varchar, and None and NaN are stored as null as in the
+        # COPY path
+        qdb.sql_connection.TRN.add(
+            sql, [_json_value(v) for row in rows for v in row])
+
+    def delete_samples(self, obj_id, sample_ids):
+        sql = 'DELETE FROM qiita.{0} WHERE sample_id = ANY(%s)'.format(
+            self._table_name(obj_id))
+        qdb.sql_connection.TRN.add(sql, [list(sample_ids)])
+
+    def lat_longs(self, obj_ids):
+        with qdb.sql_connection.TRN:
+            # The templates having both columns are found in the catalog
+            sql = """SELECT template_id
+                     FROM qiita.metadata_column
+                     WHERE template_type = %s AND template_id IN %s
+                        AND column_name IN ('latitude', 'longitude')
+                     GROUP BY template_id
+                     HAVING COUNT(*) = 2
+                     ORDER BY template_id"""
+            qdb.sql_connection.TRN.add(
+                sql, [self._template_type, tuple(obj_ids)])
+            tables = [self._table_name(obj_id) for obj_id in
+                      qdb.sql_connection.TRN.execute_fetchflatten()]
+            if not tables:
+                return []
+
+            # Retrieve the coordinates of all the tables in a single query,
+            # which is streamed from the server
+            sql = """SELECT CAST(latitude AS FLOAT), CAST(longitude AS FLOAT)
+                     FROM qiita.{0}
+                     WHERE isnumeric(latitude) AND isnumeric(longitude)"""
+            qdb.sql_connection.TRN.add(
+                " UNION ALL ".join(sql.format(table) for table in tables))
+
+            return list(qdb.sql_connection.TRN.execute_fetch_iter())
+
+    def search_join_sql(self, alias):
+        return ("JOIN qiita.{0}{{0}} {1} ON ss.sample_id = {1}.sample_id"
+                .format(self._table_prefix, alias))
+
+    def search_column_sql(self, alias, column):
+        return "%s.%s" % (alias, column)
+
+
+class JSONBStorage(MetadataStorage):
+    r"""Stores all the templates in a single table, with a JSONB object per
+    sample
+
+    Notes
+    -----
+    The existence and the categories of each template are recorded in a
+    header row, so a template without samples keeps them
+    """
+    name = 'jsonb'
+
+    def template_ids(self):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT template_id
+                     FROM qiita.metadata_template_header
+                     WHERE template_type = %s
+                     ORDER BY template_id"""
+            qdb.sql_connection.TRN.add(sql, [self._template_type])
+            return qdb.sql_connection.TRN.execute_fetchflatten()
+
+    def exists(self, obj_id):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT EXISTS(
+                        SELECT * FROM qiita.metadata_template_header
+                        WHERE template_type = %s AND template_id = %s)"""
+            qdb.sql_connection.TRN.add(sql, [self._template_type, obj_id])
+            return qdb.sql_connection.TRN.execute_fetchlast()
+
+    def create(self, obj_id, headers, rows):
+        sql = """INSERT INTO qiita.metadata_template_header
+                    (template_type, template_id, column_names)
+                 VALUES (%s, %s, %s::varchar[])"""
+        qdb.sql_connection.TRN.add(
+            sql, [self._template_type, obj_id, list(headers)])
+        self.insert_samples(obj_id, headers, rows)
+
+    def drop(self, obj_id):
+        sql = """DELETE FROM qiita.metadata_sample_values
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(sql, [self._template_type, obj_id])
+        sql = """DELETE FROM qiita.metadata_template_header
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(sql, [self._template_type, obj_id])
+
+    def categories(self, obj_id):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT column_names
+                     FROM qiita.metadata_template_header
+                     WHERE template_type = %s AND template_id = %s"""
+            qdb.sql_connection.TRN.add(sql, [self._template_type, obj_id])
+            return sorted(qdb.sql_connection.TRN.execute_fetchlast() or [])
+
+    def get_sample(self, obj_id, sample_id):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT sample_values
+                     FROM qiita.metadata_sample_values
+                     WHERE template_type = %s AND template_id = %s
+                        AND sample_id = %s"""
+            qdb.sql_connection.TRN.add(
+                sql, [self._template_type, obj_id, sample_id])
+            values = qdb.sql_connection.TRN.execute_fetchlast()
+            # Samples added after a category may not have it
+            return {c: values.get(c) for c in self.categories(obj_id)}
+
+    def get_value(self, obj_id, sample_id, column):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT sample_values->>%s
+                     FROM qiita.metadata_sample_values
+                     WHERE template_type = %s AND template_id = %s
+                        AND sample_id = %s"""
+            qdb.sql_connection.TRN.add(
+                sql, [column, self._template_type, obj_id, sample_id])
+            return qdb.sql_connection.TRN.execute_fetchlast()
+
+    def get_category(self, obj_id, column):
+        with qdb.sql_connection.TRN:
+            if column not in self.categories(obj_id):
+                raise qdb.exceptions.QiitaDBColumnError(
+                    "Non-database keys found: %s" % set([column]))
+            sql = """SELECT sample_id, sample_values->>%s
+                     FROM qiita.metadata_sample_values
+                     WHERE template_type = %s AND template_id = %s"""
+            qdb.sql_connection.TRN.add(
+                sql, [column, self._template_type, obj_id])
+            return dict(qdb.sql_connection.TRN.execute_fetchindex())
+
+    def _select_sql(self, obj_id, columns, samples):
+        if columns is None:
+            columns = self.categories(obj_id)
+        # The categories are validated identifiers, so they can be used as
+        # column aliases
+        cols = ''.join(', sample_values->>%s AS "{0}"'.format(c)
+                       for c in columns)
+        sql = """SELECT sample_id{0}
+                 FROM qiita.metadata_sample_values
+                 WHERE template_type = %s AND template_id = %s""".format(cols)
+        sql_args = list(columns) + [self._template_type, obj_id]
+        if samples is not None:
+            sql += " AND sample_id = ANY(%s)"
+            sql_args.append(list(samples))
+        return sql, sql_args
+
+    def iter_rows(self, obj_id, columns=None, samples=None, chunk_size=2000):
+        if columns is None:
+            columns = self.categories(obj_id)
+        sql = """SELECT sample_id, sample_values
+                 FROM qiita.metadata_sample_values
+                 WHERE template_type = %s AND template_id = %s"""
+        sql_args = [self._template_type, obj_id]
+        if samples is not None:
+            sql += " AND sample_id = ANY(%s)"
+            sql_args.append(list(samples))
+        qdb.sql_connection.TRN.add(sql, sql_args)
+        for sid, values in qdb.sql_connection.TRN.execute_fetch_iter(
+                itersize=chunk_size):
+            yield sid, {c: values.get(c) for c in columns}
+
+    def add_columns(self, obj_id, columns):
+        # The existing values go last, so they are not overwritten
+        sql = """UPDATE qiita.metadata_sample_values
+                 SET sample_values = %s::jsonb || sample_values
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(
+            sql, [dumps({c: None for c in columns}), self._template_type,
+                  obj_id])
+        sql = """UPDATE qiita.metadata_template_header
+                 SET column_names = column_names || %s::varchar[]
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(
+            sql, [list(columns), self._template_type, obj_id])
+
+    def drop_column(self, obj_id, column):
+        sql = """UPDATE qiita.metadata_sample_values
+                 SET sample_values = sample_values - %s
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(
+            sql, [column, self._template_type, obj_id])
+        sql = """UPDATE qiita.metadata_template_header
+                 SET column_names = array_remove(column_names, %s::varchar)
+                 WHERE template_type = %s AND template_id = %s"""
+        qdb.sql_connection.TRN.add(
+            sql, [column, self._template_type, obj_id])
+
+    def insert_samples(self, obj_id, headers, rows):
+        qdb.sql_connection.TRN.copy_from(
+            "qiita.metadata_sample_values",
+            ['template_type', 'template_id', 'sample_id', 'sample_values'],
+            ((self._template_type, obj_id, row[0],
+              dumps(dict(zip(headers, [_json_value(v) for v in row[1:]]))))
+             for row in rows))
+
+    def update_values(self, obj_id, columns, rows):
+        values = ([row[0], dumps(dict(zip(columns,
+                                          [_json_value(v) for v in row[1:]])))]
+                  for row in rows)
+        sql = """UPDATE qiita.metadata_sample_values AS t
+                 SET sample_values = t.sample_values || c.sample_values
+                 FROM {0} AS c(sample_id, sample_values)
+                 WHERE c.sample_id = t.sample_id
+                    AND t.template_type = %s AND t.template_id = %s"""
+        if not _inline_values(len(rows), len(columns) + 1):
+            table_cols = [('sample_id', 'varchar'), ('sample_values', 'jsonb')]
+            with _temp_table(_UPDATE_TABLE, table_cols, values) as table:
+                qdb.sql_connection.TRN.add(
+                    sql.format(table), [self._template_type, obj_id])
+            return
+
+        source = "(VALUES {0})".format(
+            ', '.join(["(%s, %s::jsonb)"] * len(rows)))
+        qdb.sql_connection.TRN.add(
+            sql.format(source), [v for row in values for v in row] +
+            [self._template_type, obj_id])
+
+    def delete_samples(self, obj_id, sample_ids):
+        sql = """DELETE FROM qiita.metadata_sample_values
+                 WHERE template_type = %s AND template_id = %s
+                    AND sample_id = ANY(%s)"""
+        qdb.sql_connection.TRN.add(
+            sql, [self._template_type, obj_id, list(sample_ids)])
+
+    def lat_longs(self, obj_ids):
+        with qdb.sql_connection.TRN:
+            sql = """SELECT CAST(sample_values->>'latitude' AS FLOAT),
+                            CAST(sample_values->>'longitude' AS FLOAT)
+                     FROM qiita.metadata_sample_values
+                     WHERE template_type = %s AND template_id IN %s
+                        AND sample_values ?& ARRAY['latitude', 'longitude']
+                        AND isnumeric(sample_values->>'latitude')
+                        AND isnumeric(sample_values->>'longitude')"""
+            qdb.sql_connection.TRN.add(
+                sql, [self._template_type, tuple(obj_ids)])
+            return list(qdb.sql_connection.TRN.execute_fetch_iter())
+
+    def search_join_sql(self, alias):
+        return ("JOIN qiita.metadata_sample_values {0} ON "
+                "ss.sample_id = {0}.sample_id AND "
+                "{0}.template_type = '{1}' AND {0}.template_id = {{0}}"
+                .format(alias, self._template_type))
+
+    def search_column_sql(self, alias, column):
+        # Unlike the column names, the JSONB keys are case sensitive
+        return "%s.sample_values->>'%s'" % (alias, column.lower())
+
+
+STORAGES = {s.name: s for s in (TableStorage, JSONBStorage)}
+
+
+def get_storage(table_prefix):
+    r"""Returns the storage engine used by the templates of `table_prefix`
+
+    Parameters
+    ----------
+    table_prefix : str
+        The prefix of the templates, i.e. "sample_" or "prep_"
+
+    Returns
+    -------
+    MetadataStorage
+        The storage engine selected in the configuration file
+    """
+    return STORAGES[qiita_config.metadata_storage](table_prefix)
+
+
+def migrate_storage(storage, verbose=False):
+    r"""Moves all the templates to the storage engine `storage`
+
+    Parameters
+    ----------
+    storage : {'tables', 'jsonb'}
+        The storage engine to which the templates are moved
+    verbose : bool, optional
+        If True, print the templates as they are moved
+
+    Returns
+    -------
+    int
+        The number of templates moved
+
+    Raises
+    ------
+    ValueError
+        If `storage` is not a known storage engine
+    QiitaDBError
+        If the database doesn't support `storage`
+
+    Notes
+    -----
+    Each template is moved in its own transaction, so the migration can be
+    resumed if interrupted. Once it is done, the METADATA_STORAGE option of the
+    configuration file should be set to `storage`.
+    """
+    if storage not in STORAGES:
+        raise ValueError("Unknown metadata storage: %s. Valid options: %s"
+                         % (storage, ', '.join(sorted(STORAGES))))
+    # The table used by the jsonb storage is only created by the patches if
+    # the server supports it
+    has_jsonb = qdb.util.exists_table('metadata_sample_values')
+    if storage == JSONBStorage.name and not has_jsonb:
+        raise qdb.exceptions.QiitaDBError(
+            "The jsonb metadata storage requires PostgreSQL 9.5 or newer")
+
+    moved = 0
+    for table_prefix in ('sample_', 'prep_'):
+        target = STORAGES[storage](table_prefix)
+        for name, storage_cls in STORAGES.items():
+            if name == storage or (name == JSONBStorage.name and
+                                   not has_jsonb):
+                continue
+            source = storage_cls(table_prefix)
+            for obj_id in source.template_ids():
+                if verbose:
+                    print('\tMoving %s%d to %s...'
+                          % (table_prefix, obj_id, storage))
+                with qdb.sql_connection.TRN:
+                    df = source.to_dataframe(obj_id)
+                    headers = sorted(df.columns)
+                    target.create(obj_id, headers, df[headers].itertuples())
+                    source.drop(obj_id)
+                    qdb.sql_connection.TRN.execute()
+                moved += 1
+    return moved
+
+
+def _rebuild(func, description, verbose=False):
+    r"""Calls `func` with the metadata of each template, one at a time
+
+    Parameters
+    ----------
+    func : callable
+        Called as func(template_type, obj_id, md_template) for each template,
+        where md_template is its metadata as returned by `to_dataframe`. It
+        adds its queries to the current transaction
+    description : str
+        The action printed before the name of each template if `verbose`
+    verbose : bool, optional
+        If True, print the templates as they are processed
+
+    Returns
+    -------
+    int
+        The number of templates processed
+
+    Notes
+    -----
+    The templates are read one at a time, so the whole metadata doesn't need
+    to be loaded at once. The queries of each template are executed as part
+    of the current transaction: when called within an outer transaction (e.g.
+    from a patch), nothing is committed until that transaction is.
+    """
+    processed = 0
+    for table_prefix in ('sample_', 'prep_'):
+        storage = get_storage(table_prefix)
+        template_type = table_prefix.rstrip('_')
+        for obj_id in storage.template_ids():
+            if verbose:
+                print('\t%s %s%d...' % (description, table_prefix, obj_id))
+            with qdb.sql_connection.TRN:
+                func(template_type, obj_id, storage.to_dataframe(obj_id))
+                qdb.sql_connection.TRN.execute()
+            processed += 1
+    return processed
@@ -0,0 +1,58 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+
+import numpy as np
+import pandas as pd
+
+import qiita_db as qdb
+
+
+class TestTemplateChangeset(TestCase):
+    def setUp(self):
+        self.current = pd.DataFrame.from_dict(
+            {'1.S1': {'col1': 'a', 'col2': 'b', 'col3': None},
+             '1.S2': {'col1': 'c', 'col2': 'd', 'col3': None},
+             '1.S3': {'col1': 'e', 'col2': 'f', 'col3': 'g'}},
+            orient='index')
+
+    def test_changeset(self):
+        new = pd.DataFrame.from_dict(
+            {'1.S1': {'col1': 'a', 'col2': 'CHANGED', 'col3': np.nan},
+             '1.S3': {'col1': 'CHANGED', 'col2': 'f', 'col3': 'g'}},
+            orient='index')
+        obs = qdb.metadata_template.changeset.TemplateChangeset(
+            self.current, new)
+        self.assertFalse(obs.empty)
+        self.assertEqual(len(obs), 2)
+        self.assertEqual(obs.samples, ['1.S1', '1.S3'])
+        self.assertEqual(obs.columns, ['col1', 'col2'])
+        self.assertEqual(
+            obs.changes.to_dict(orient='index'),
+            {('1.S1', 'col2'): {'old': 'b', 'new': 'CHANGED'},
+             ('1.S3', 'col1'): {'old': 'e', 'new': 'CHANGED'}})
+        self.assertEqual(list(obs.iter_rows()),
+                         [[['1.S1', 'a', 'CHANGED'],
+                           ['1.S3', 'CHANGED', 'f']]])
+        self.assertEqual(list(obs.iter_rows(chunk_size=1)),
+                         [[['1.S1', 'a', 'CHANGED']],
+                          [['1.S3', 'CHANGED', 'f']]])
+
+    def test_changeset_empty(self):
+        obs = qdb.metadata_template.changeset.TemplateChangeset(
+            self.current, self.current.loc[['1.S2'], ['col2', 'col3']])
+        self.assertTrue(obs.empty)
+        self.assertEqual(len(obs), 0)
+        self.assertEqual(obs.samples, [])
+        self.assertEqual(obs.columns, [])
+        self.assertEqual(list(obs.iter_rows()), [])
+
+
+if __name__ == '__main__':
+    main()
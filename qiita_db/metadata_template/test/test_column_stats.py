@@ -0,0 +1,122 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+
+import numpy as np
+import pandas as pd
+
+from qiita_core.util import qiita_test_checker
+import qiita_db as qdb
+
+
+class TestCountValues(TestCase):
+    def test_count_values(self):
+        md = pd.DataFrame.from_dict(
+            {'1.S1': {'col1': 'a', 'col2': 1, 'col3': None},
+             '1.S2': {'col1': 'a', 'col2': 2, 'col3': np.nan},
+             '1.S3': {'col1': 'b', 'col2': 1, 'col3': True}},
+            orient='index')
+        obs = qdb.metadata_template.column_stats.count_values(md)
+        # The values are counted as they are stored in the database
+        exp = {('col1', 'a'): 2, ('col1', 'b'): 1, ('col2', '1'): 2,
+               ('col2', '2'): 1, ('col3', None): 2, ('col3', 'true'): 1}
+        self.assertEqual(obs, exp)
+
+    def test_count_values_empty(self):
+        obs = qdb.metadata_template.column_stats.count_values(
+            pd.DataFrame(columns=['col1']))
+        self.assertEqual(obs, {})
+
+    def test_count_changes(self):
+        current = pd.DataFrame.from_dict(
+            {'1.S1': {'col1': 'a', 'col2': 'b'},
+             '1.S2': {'col1': 'a', 'col2': None}},
+            orient='index')
+        new = pd.DataFrame.from_dict(
+            {'1.S1': {'col1': 'c', 'col2': 'b'},
+             '1.S2': {'col1': 'a', 'col2': 'b'}},
+            orient='index')
+        changes = qdb.metadata_template.changeset.TemplateChangeset(
+            current, new).changes
+        obs = qdb.metadata_template.column_stats.count_changes(changes)
+        self.assertEqual(
+            {k: n for k, n in obs.items() if n},
+            {('col1', 'a'): -1, ('col1', 'c'): 1, ('col2', 'b'): 1,
+             ('col2', None): -1})
+
+
+@qiita_test_checker()
+class TestColumnStats(TestCase):
+    def _update_stats(self, obj_id, delta):
+        with qdb.sql_connection.TRN:
+            qdb.metadata_template.column_stats.update_stats(
+                'prep', obj_id, delta)
+            qdb.sql_connection.TRN.execute()
+
+    def test_update_stats(self):
+        pt = qdb.metadata_template.prep_template.PrepTemplate(1)
+        obs = pt.column_stats()
+        self.assertEqual(obs['center_name'], {'ANL': 27})
+
+        self._update_stats(1, {('center_name', 'ANL'): -2,
+                               ('center_name', 'UCSD'): 1,
+                               ('center_name', None): 1})
+        self.assertEqual(pt.column_stats()['center_name'],
+                         {'ANL': 25, 'UCSD': 1, None: 1})
+
+        # The values without samples are removed
+        self._update_stats(1, {('center_name', 'UCSD'): -1})
+        self.assertEqual(pt.column_stats()['center_name'],
+                         {'ANL': 25, None: 1})
+
+    def test_update_stats_copy(self):
+        pt = qdb.metadata_template.prep_template.PrepTemplate(1)
+        pt.column_stats()
+        # Forcing the update through the temporary table
+        column_stats = qdb.metadata_template.column_stats
+        values_rows = column_stats._VALUES_ROWS
+        column_stats._VALUES_ROWS = 0
+        try:
+            self._update_stats(1, {('center_name', 'ANL'): -1,
+                                   ('center_name', 'UCSD'): 1})
+        finally:
+            column_stats._VALUES_ROWS = values_rows
+        self.assertEqual(pt.column_stats()['center_name'],
+                         {'ANL': 26, 'UCSD': 1})
+
+    def _drop_stats(self, obj_id):
+        with qdb.sql_connection.TRN:
+            qdb.metadata_template.column_stats.drop_stats('prep', obj_id)
+            qdb.sql_connection.TRN.execute()
+
+    def test_update_stats_not_computed(self):
+        # The statistics that have not been computed are left untouched
+        self._drop_stats(2)
+        self._update_stats(2, {('center_name', 'UCSD'): 1})
+        self.assertEqual(
+            qdb.metadata_template.column_stats.get_stats('prep', 2), {})
+
+    def test_column_stats_not_stored(self):
+        self._drop_stats(2)
+        pt = qdb.metadata_template.prep_template.PrepTemplate(2)
+        self.assertEqual(pt.column_stats()['center_name'], {'ANL': 27})
+        # The statistics are computed without storing them
+        self.assertEqual(
+            qdb.metadata_template.column_stats.get_stats('prep', 2), {})
+
+    def test_rebuild(self):
+        column_stats = qdb.metadata_template.column_stats
+        exp = column_stats.get_stats('prep', 2)
+        self._drop_stats(2)
+        self.assertEqual(column_stats.rebuild(), 3)
+        self.assertEqual(column_stats.get_stats('prep', 2), exp)
+
+
+if __name__ == '__main__':
+    main()
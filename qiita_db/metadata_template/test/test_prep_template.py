@@ -915,6 +915,21 @@ class TestPrepTemplate(TestCase):
 
         assert_frame_equal(obs, exp)
 
+    def test_create_qiime_mapping_file_updated_sample_template(self):
+        pt = qdb.metadata_template.prep_template.PrepTemplate(1)
+        st = qdb.metadata_template.sample_template.SampleTemplate(1)
+        with qdb.sql_connection.TRN:
+            # The sample template values are read from the database, so the
+            # mapping file includes changes without a new sample template file
+            st.update_category('ph', {'1.SKB1.640202': '9.9'})
+            obs_fp = pt.create_qiime_mapping_file()
+
+        obs = pd.read_csv(obs_fp, sep='\t', infer_datetime_format=False,
+                          parse_dates=False, index_col=0, comment='\t',
+                          dtype=str)
+        self.assertEqual(obs.loc['1.SKB1.640202', 'ph'], '9.9')
+        self.assertEqual(obs.loc['1.SKB2.640194', 'ph'], '6.94')
+
     def test_create_data_type_id(self):
         """Creates a new PrepTemplate passing the data_type_id"""
         fp_count = qdb.util.get_count('qiita.filepath')
@@ -1477,6 +1492,22 @@ class TestPrepTemplate(TestCase):
         with self.assertRaises(QE.QiitaDBOperationNotPermittedError):
             pt.delete_sample('1.SKM5.640177')
 
+    def test_delete_samples(self):
+        QE = qdb.exceptions
+
+        pt = qdb.metadata_template.prep_template.PrepTemplate.create(
+            self.metadata, self.test_study, self.data_type)
+        sample_ids = ['%s.SKB8.640193' % self.test_study.id,
+                      '%s.SKD8.640184' % self.test_study.id]
+        pt.delete_samples(sample_ids)
+        self.assertEqual(set(pt.keys()),
+                         {'%s.SKB7.640196' % self.test_study.id})
+        self.assertEqual(pt.column_stats()['center_name'], {'ANL': 1})
+
+        pt = qdb.metadata_template.prep_template.PrepTemplate(2)
+        with self.assertRaises(QE.QiitaDBOperationNotPermittedError):
+            pt.delete_samples(['1.SKM5.640177', '1.SKB8.640193'])
+
 
 EXP_PREP_TEMPLATE = (
     'sample_name\tbarcode\tcenter_name\tcenter_project_name\t'
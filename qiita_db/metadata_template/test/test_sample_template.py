@@ -14,6 +14,7 @@ from collections import Iterable
 from warnings import catch_warnings
 from time import time
 
+import numpy as np
 import numpy.testing as npt
 import pandas as pd
 from pandas.util.testing import assert_frame_equal
@@ -227,6 +228,48 @@ class TestSample(TestCase):
         tester['tot_nitro'] = '1234.5'
         self.assertEqual(tester['tot_nitro'], '1234.5')
 
+    def test_categories_cached(self):
+        with qdb.sql_connection.TRN:
+            self.assertEqual(self.tester._get_categories(),
+                             self.exp_categories)
+            other = qdb.metadata_template.sample_template.Sample(
+                '1.SKB1.640202', self.sample_template)
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertEqual(other._get_categories(), self.exp_categories)
+                self.assertIn('tot_nitro', other)
+                self.assertEqual(len(other), 30)
+
+            # The changes made through another instance are visible
+            qdb.metadata_template.sample_template.SampleTemplate(
+                1).delete_column('tot_nitro')
+            self.assertNotIn('tot_nitro', other)
+            self.assertEqual(len(other), 29)
+
+        # The cache does not outlive the transaction
+        self.assertNotIn(
+            qdb.metadata_template.base_metadata_template._CATEGORIES_CACHE_KEY,
+            qdb.sql_connection.TRN.cache)
+
+    def test_prefetch(self):
+        with qdb.sql_connection.TRN:
+            tester = qdb.metadata_template.sample_template.Sample(
+                '1.SKB1.640202', self.sample_template)
+            tester.prefetch()
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertEqual(tester['tot_nitro'], '1.41')
+                self.assertEqual(tester['season_environment'], 'winter')
+                self.assertEqual(dict(tester.items())['tot_nitro'], '1.41')
+
+            tester['tot_nitro'] = '1234.5'
+            self.assertIsNone(tester._prefetched_row())
+            self.assertEqual(tester['tot_nitro'], '1234.5')
+
+            tester.prefetch()
+            self.sample_template.update_category(
+                'tot_nitro', {'1.SKB1.640202': '1.41'})
+            self.assertIsNone(tester._prefetched_row())
+            self.assertEqual(tester['tot_nitro'], '1.41')
+
     def test_delitem(self):
         """delitem raises an error (currently not allowed)"""
         with self.assertRaises(qdb.exceptions.QiitaDBNotImplementedError):
@@ -528,6 +571,58 @@ class TestSampleTemplate(TestCase):
             '1.SKM7.640188', self.tester)
         self.assertEqual(obs, exp)
 
+    def test_iter_rows(self):
+        with qdb.sql_connection.TRN:
+            obs = dict(self.tester.iter_rows())
+            self.assertEqual(set(obs), self.tester._get_sample_ids())
+            self.assertEqual(obs['1.SKB1.640202'],
+                             dict(self.tester['1.SKB1.640202']))
+
+            obs = list(self.tester.iter_rows(
+                columns=['season_environment', 'tot_nitro'],
+                samples=['1.SKB1.640202', '1.SKM7.640188'], chunk_size=1))
+        exp = [('1.SKB1.640202', {'season_environment': 'winter',
+                                  'tot_nitro': '1.41'}),
+               ('1.SKM7.640188', {'season_environment': 'winter',
+                                  'tot_nitro': '1.3'})]
+        self.assertEqual(sorted(obs), exp)
+
+    def test_iter_rows_error(self):
+        with self.assertRaises(RuntimeError):
+            self.tester.iter_rows()
+
+        with qdb.sql_connection.TRN:
+            # The columns are checked without consuming the generator
+            with self.assertRaises(qdb.exceptions.QiitaDBColumnError):
+                self.tester.iter_rows(columns=['not_a_column'])
+
+    def test_iter_rows_not_consumed(self):
+        """A generator not fully consumed doesn't affect the transaction"""
+        with qdb.sql_connection.TRN:
+            rows = self.tester.iter_rows(chunk_size=1)
+            next(rows)
+            self.tester.update_category('ph', {'1.SKB1.640202': '9.9'})
+        # The transaction has been committed
+        self.assertEqual(qdb.sql_connection.TRN._contexts_entered, 0)
+        self.assertEqual(
+            self.tester.get_category('ph')['1.SKB1.640202'], '9.9')
+
+    def test_get_sample_ids_cached(self):
+        st = qdb.metadata_template.sample_template.SampleTemplate.create(
+            self.metadata, self.new_study)
+        with qdb.sql_connection.TRN:
+            self.assertEqual(len(st), 3)
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertIn('%s.Sample1' % st.id, st)
+                self.assertNotIn('%s.Sample4' % st.id, st)
+                self.assertEqual(set(st.keys()), set(st._get_sample_ids()))
+                self.assertEqual(st['%s.Sample1' % st.id].id,
+                                 '%s.Sample1' % st.id)
+
+            st.delete_sample('%s.Sample1' % st.id)
+            self.assertNotIn('%s.Sample1' % st.id, st)
+            self.assertEqual(len(st), 2)
+
     def test_getitem_error(self):
         """Get item raises an error if key does not exists"""
         with self.assertRaises(KeyError):
@@ -1202,6 +1297,49 @@ class TestSampleTemplate(TestCase):
         self.assertEqual(self.tester['1.SKD6.640190']['country'], "3")
         self.assertEqual(self.tester['1.SKM7.640188']['country'], negtest)
 
+    def test_update_category_bulk(self):
+        mapping = {'1.SKB1.640202': np.int64(1),
+                   '1.SKB5.640181': np.int64(2),
+                   '1.SKD6.640190': np.int64(3)}
+        with qdb.sql_connection.TRN:
+            # Loading the sample ids and the categories
+            self.assertIn('country', self.tester.categories())
+            self.assertEqual(len(self.tester), 27)
+            # The update takes a fixed number of queries, regardless the
+            # number of samples: reading the old values, the update itself and
+            # the three statements maintaining the column statistics
+            with qdb.sql_connection.TRN.query_budget(5):
+                self.tester.update_category('country', mapping)
+
+        obs = self.tester.get_category('country')
+        self.assertEqual(obs['1.SKB1.640202'], '1')
+        self.assertEqual(obs['1.SKB5.640181'], '2')
+        self.assertEqual(obs['1.SKD6.640190'], '3')
+
+        mapping = {'1.SKB1.640202': 'USA', '1.SKB5.640181': np.bool_(True)}
+        self.tester.update_category('country', mapping)
+        obs = self.tester.get_category('country')
+        self.assertEqual(obs['1.SKB1.640202'], 'USA')
+        self.assertEqual(obs['1.SKB5.640181'], 'true')
+
+        # Mixed types are stored as if they were updated one by one
+        mapping = {'1.SKB1.640202': 1, '1.SKB5.640181': 2.5,
+                   '1.SKD6.640190': True}
+        self.tester.update_category('country', mapping)
+        obs = self.tester.get_category('country')
+        self.assertEqual(obs['1.SKB1.640202'], '1')
+        self.assertEqual(obs['1.SKB5.640181'], '2.5')
+        self.assertEqual(obs['1.SKD6.640190'], 'true')
+
+        mapping = {'1.SKB1.640202': np.int64(3),
+                   '1.SKB5.640181': np.float64(4.5),
+                   '1.SKD6.640190': np.bool_(False)}
+        self.tester.update_category('country', mapping)
+        obs = self.tester.get_category('country')
+        self.assertEqual(obs['1.SKB1.640202'], '3')
+        self.assertEqual(obs['1.SKB5.640181'], '4.5')
+        self.assertEqual(obs['1.SKD6.640190'], 'false')
+
     def test_update_equal(self):
         """It doesn't fail with the exact same template"""
         # Create a new sample tempalte
@@ -1284,6 +1422,51 @@ class TestSampleTemplate(TestCase):
                 '2015-09-01 00:00:00']]
         self.assertEqual(sorted(obs), sorted(exp))
 
+    def test_changeset(self):
+        st = qdb.metadata_template.sample_template.SampleTemplate.create(
+            self.metadata, self.new_study)
+        new_metadata = pd.DataFrame.from_dict(
+            {'Sample1': {'physical_specimen_location': 'CHANGE',
+                         'dna_extracted': 'true'},
+             'Sample2': {'physical_specimen_location': 'location1',
+                         'dna_extracted': 'true'}},
+            orient='index', dtype=str)
+        obs = st.changeset(new_metadata)
+        s_id = '%d.Sample1' % self.new_study.id
+        self.assertEqual(len(obs), 1)
+        self.assertEqual(obs.samples, [s_id])
+        self.assertEqual(obs.columns, ['physical_specimen_location'])
+        self.assertEqual(
+            obs.changes.to_dict(orient='index'),
+            {(s_id, 'physical_specimen_location'): {
+                'old': 'location1', 'new': 'CHANGE'}})
+        # Computing the changeset does not modify the template
+        self.assertEqual(st[s_id]['physical_specimen_location'], 'location1')
+
+        with self.assertRaises(qdb.exceptions.QiitaDBError):
+            st.changeset(self.metadata_dict_updated_sample_error)
+
+    def test_update_bulk(self):
+        """Updates through the temporary table, in several chunks"""
+        st = qdb.metadata_template.sample_template.SampleTemplate.create(
+            self.metadata, self.new_study)
+        new_metadata = pd.DataFrame.from_dict(
+            {'Sample1': {'physical_specimen_location': 'CHANGE1'},
+             'Sample2': {'physical_specimen_location': 'CHANGE2'},
+             'Sample3': {'physical_specimen_location': 'CHANGE3'}},
+            orient='index', dtype=str)
+        values_rows = qdb.metadata_template.storage._VALUES_ROWS
+        qdb.metadata_template.storage._VALUES_ROWS = 0
+        try:
+            st.update(new_metadata, chunk_size=2)
+        finally:
+            qdb.metadata_template.storage._VALUES_ROWS = values_rows
+
+        obs = st.get_category('physical_specimen_location')
+        exp = {'%d.Sample%d' % (self.new_study.id, i): 'CHANGE%d' % i
+               for i in range(1, 4)}
+        self.assertEqual(obs, exp)
+
     def test_generate_files(self):
         fp_count = qdb.util.get_count("qiita.filepath")
         self.tester.generate_files()
@@ -1292,6 +1475,96 @@ class TestSampleTemplate(TestCase):
         # the contents of the files have been tested elsewhere.
         self.assertEqual(obs, fp_count + 5)
 
+    def test_generate_files_unchanged(self):
+        self.tester.generate_files()
+        fp_count = qdb.util.get_count("qiita.filepath")
+        # Nothing changed, so no new file should be added
+        self.tester.generate_files()
+        self.assertEqual(qdb.util.get_count("qiita.filepath"), fp_count)
+
+        # The sample information file and the QIIME mapping files of both
+        # prep templates change, but the prep information files don't
+        self.tester.update_category('ph', {'1.SKB1.640202': '9.9'})
+        self.tester.generate_files()
+        self.assertEqual(qdb.util.get_count("qiita.filepath"), fp_count + 3)
+
+    def test_generate_files_setitem(self):
+        with qdb.sql_connection.TRN:
+            self.tester.generate_files()
+            fp_count = qdb.util.get_count("qiita.filepath")
+            # The dataframe cached by the first call must not be reused
+            self.tester['1.SKB1.640202']['ph'] = '9.9'
+            self.tester.generate_files()
+            # The sample information file and the QIIME mapping files of both
+            # prep templates change
+            self.assertEqual(qdb.util.get_count("qiita.filepath"),
+                             fp_count + 3)
+            fp = self.tester.get_filepaths()[0][1]
+            with open(fp, 'U') as f:
+                obs = qdb.metadata_template.util.load_template_to_dataframe(f)
+            self.assertEqual(obs.loc['1.SKB1.640202', 'ph'], '9.9')
+
+    def test_generate_files_deferred(self):
+        self.tester.generate_files()
+        fp_count = qdb.util.get_count("qiita.filepath")
+        with qdb.sql_connection.TRN:
+            with qdb.metadata_template.base_metadata_template.\
+                    deferred_file_generation():
+                self.tester.update_category('ph', {'1.SKB1.640202': '9.9'})
+                self.tester.generate_files()
+                self.tester.update_category('ph', {'1.SKB2.640194': '9.9'})
+                self.tester.generate_files()
+                # The files are not generated until the transaction commits
+                self.assertEqual(qdb.util.get_count("qiita.filepath"),
+                                 fp_count)
+        # The files have been generated only once
+        self.assertEqual(qdb.util.get_count("qiita.filepath"), fp_count + 3)
+
+    def test_generate_files_deferred_block_exited(self):
+        self.tester.generate_files()
+        fp_count = qdb.util.get_count("qiita.filepath")
+        with qdb.sql_connection.TRN:
+            with qdb.metadata_template.base_metadata_template.\
+                    deferred_file_generation():
+                self.tester.update_category('ph', {'1.SKB1.640202': '9.9'})
+                self.tester.generate_files()
+            self.assertNotIn(
+                qdb.metadata_template.base_metadata_template.
+                _DEFERRED_FILES_CACHE_KEY, qdb.sql_connection.TRN.cache)
+            # Once the block is exited the files are generated right away,
+            # even if the transaction is still open
+            self.tester.generate_files()
+            self.assertEqual(qdb.util.get_count("qiita.filepath"),
+                             fp_count + 3)
+        # And the files deferred in the block are generated on commit
+        self.assertEqual(qdb.util.get_count("qiita.filepath"), fp_count + 6)
+
+    def test_generate_files_deferred_rollback(self):
+        self.tester.generate_files()
+        fp_count = qdb.util.get_count("qiita.filepath")
+        with qdb.sql_connection.TRN:
+            with qdb.metadata_template.base_metadata_template.\
+                    deferred_file_generation():
+                self.tester.update_category('ph', {'1.SKB1.640202': '9.9'})
+                self.tester.generate_files()
+                qdb.sql_connection.TRN.rollback()
+        self.assertEqual(qdb.util.get_count("qiita.filepath"), fp_count)
+
+    def test_generate_deferred_files_error(self):
+        class FailingTemplate(
+                qdb.metadata_template.sample_template.SampleTemplate):
+            def generate_files(self):
+                qdb.sql_connection.TRN.add(
+                    "SELECT * FROM qiita.not_a_table")
+                raise ValueError('generation failed')
+
+        log_count = qdb.util.get_count("qiita.logging")
+        # The error is logged, not raised
+        qdb.metadata_template.base_metadata_template._generate_deferred_files(
+            {('sample', 1): FailingTemplate(1)})
+        self.assertEqual(qdb.sql_connection.TRN._queries, [])
+        self.assertEqual(qdb.util.get_count("qiita.logging"), log_count + 1)
+
     def test_to_file(self):
         """to file writes a tab delimited file with all the metadata"""
         fd, fp = mkstemp()
@@ -1883,6 +2156,141 @@ class TestSampleTemplate(TestCase):
             'anonymized_name', 'tot_org_carb', 'description_duplicate',
             'env_feature', 'scientific_name'})
 
+    def test_to_dataframe_projection(self):
+        obs = self.tester.to_dataframe(
+            columns=['tot_nitro', 'season_environment'],
+            samples=['1.SKB1.640202', '1.SKM7.640188'])
+        exp = pd.DataFrame.from_dict(
+            {'1.SKB1.640202': {'season_environment': 'winter',
+                               'tot_nitro': '1.41'},
+             '1.SKM7.640188': {'season_environment': 'winter',
+                               'tot_nitro': '1.3'}},
+            orient='index', dtype=str)
+        exp.index.name = 'sample_id'
+        obs.sort_index(axis=0, inplace=True)
+        assert_frame_equal(obs, exp)
+
+        obs = self.tester.to_dataframe(columns=['season_environment'],
+                                       categorical=True)
+        self.assertEqual(len(obs), 27)
+        self.assertEqual(str(obs['season_environment'].dtype), 'category')
+        self.assertEqual(list(obs['season_environment'].cat.categories),
+                         ['winter'])
+
+        with self.assertRaises(qdb.exceptions.QiitaDBColumnError):
+            self.tester.to_dataframe(columns=['not_a_column'])
+
+    def test_get_dataframe(self):
+        with qdb.sql_connection.TRN:
+            obs = self.tester._get_dataframe()
+            self.assertEqual(len(obs), 27)
+            self.assertEqual(obs.loc['1.SKB1.640202', 'ph'], '6.94')
+            # The metadata is retrieved only once per transaction
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertIs(self.tester._get_dataframe(), obs)
+
+            # Modifying the metadata discards the cached dataframe
+            self.tester.update_category('ph', {'1.SKB1.640202': '9.9'})
+            obs = self.tester._get_dataframe()
+            self.assertEqual(obs.loc['1.SKB1.640202', 'ph'], '9.9')
+
+    def test_column_stats(self):
+        obs = self.tester.column_stats()
+        self.assertEqual(set(obs), set(self.tester.categories()))
+        self.assertEqual(obs['season_environment'], {'winter': 27})
+        self.assertEqual(obs['ph'], {'6.82': 10, '6.8': 9, '6.94': 8})
+
+        # The statistics have been stored, so the metadata is not read again
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.query_budget(1):
+                self.assertEqual(self.tester.column_stats(), obs)
+
+        self.tester.update_category(
+            'ph', {'1.SKB1.640202': '9.9', '1.SKB2.640194': None})
+        self.assertEqual(self.tester.column_stats()['ph'],
+                         {'6.82': 10, '6.8': 9, '6.94': 6, '9.9': 1, None: 1})
+
+        self.tester['1.SKB1.640202']['ph'] = '6.8'
+        self.assertEqual(self.tester.column_stats()['ph'],
+                         {'6.82': 10, '6.8': 10, '6.94': 6, None: 1})
+
+    def test_column_stats_maintained(self):
+        st = qdb.metadata_template.sample_template.SampleTemplate.create(
+            self.metadata, self.new_study)
+        # The statistics are computed when the template is created
+        obs = qdb.metadata_template.column_stats.get_stats('sample', st.id)
+        self.assertEqual(obs['sample_type'], {'type1': 3})
+        self.assertEqual(obs['latitude'], {'42.42': 1, '4.2': 1, '4.8': 1})
+
+        md_ext = self.metadata.loc[['Sample1', 'Sample2']].copy()
+        md_ext.index = ['Sample1', 'Sample4']
+        md_ext.loc['Sample4', 'sample_type'] = 'type2'
+        md_ext['ph'] = '7'
+        npt.assert_warns(qdb.exceptions.QiitaDBWarning, st.extend, md_ext)
+        obs = st.column_stats()
+        self.assertEqual(obs['sample_type'], {'type1': 3, 'type2': 1})
+        self.assertEqual(obs['latitude'], {'42.42': 1, '4.2': 2, '4.8': 1})
+        self.assertEqual(obs['ph'], {'7': 2, None: 2})
+
+        md = self.metadata.copy()
+        md.loc['Sample2', 'sample_type'] = 'type2'
+        st.update(md)
+        self.assertEqual(st.column_stats()['sample_type'],
+                         {'type1': 2, 'type2': 2})
+
+        st.delete_sample('%d.Sample4' % st.id)
+        self.assertEqual(st.column_stats()['sample_type'],
+                         {'type1': 2, 'type2': 1})
+
+        st.delete_column('ph')
+        exp = st.column_stats()
+        self.assertNotIn('ph', exp)
+
+        # The statistics maintained match the ones computed from scratch
+        with qdb.sql_connection.TRN:
+            qdb.metadata_template.column_stats.drop_stats('sample', st.id)
+            qdb.sql_connection.TRN.execute()
+        self.assertEqual(st.column_stats(), exp)
+
+    def test_column_catalog(self):
+        obs = qdb.metadata_template.column_catalog.get_columns('sample', 1)
+        self.assertEqual(len(obs), 30)
+        self.assertEqual(obs['altitude'], 'integer')
+        self.assertEqual(obs['latitude'], 'float')
+        self.assertEqual(obs['collection_timestamp'], 'datetime')
+        self.assertEqual(obs['description'], 'varchar')
+
+    def test_column_catalog_maintained(self):
+        get_columns = qdb.metadata_template.column_catalog.get_columns
+        st = qdb.metadata_template.sample_template.SampleTemplate.create(
+            self.metadata, self.new_study)
+        obs = get_columns('sample', st.id)
+        self.assertItemsEqual(obs, st.categories())
+        self.assertEqual(obs['taxon_id'], 'integer')
+        self.assertEqual(obs['latitude'], 'float')
+        self.assertEqual(obs['collection_timestamp'], 'datetime')
+        self.assertEqual(obs['sample_type'], 'varchar')
+
+        # The new columns are added and the existing ones widened
+        md_ext = self.metadata.loc[['Sample1']].copy()
+        md_ext.index = ['Sample4']
+        md_ext['taxon_id'] = '96.06'
+        md_ext['ph'] = '7'
+        npt.assert_warns(qdb.exceptions.QiitaDBWarning, st.extend, md_ext)
+        obs = get_columns('sample', st.id)
+        self.assertEqual(obs['taxon_id'], 'float')
+        self.assertEqual(obs['ph'], 'integer')
+
+        st.update_category('ph', {'%d.Sample4' % st.id: 'neutral'})
+        self.assertEqual(get_columns('sample', st.id)['ph'], 'varchar')
+
+        st.delete_column('ph')
+        self.assertNotIn('ph', get_columns('sample', st.id))
+
+        self.assertIn('taxon_id', st.metadata_headers())
+        qdb.metadata_template.sample_template.SampleTemplate.delete(st.id)
+        self.assertEqual(get_columns('sample', st.id), {})
+
     def test_check_restrictions(self):
         obs = self.tester.check_restrictions(
             [qdb.metadata_template.constants.SAMPLE_TEMPLATE_COLUMNS['EBI']])
@@ -2068,16 +2476,31 @@ class TestSampleTemplate(TestCase):
             self.assertEqual(warn.category, qdb.exceptions.QiitaDBWarning)
             # it should contain this text
             message = str(warn.message)
-            exp_error = ('Sample "%s.Sample2", column "latitude", wrong value '
-                         '"wrong latitude"' % self.new_study.id)
+            exp_error = ('Column "latitude", 2 wrong values: '
+                         '"wrong latitude" (sample {0}.Sample2), '
+                         '"None" (sample {0}.Sample3)'.format(
+                             self.new_study.id))
             self.assertIn(exp_error, message)
-            exp_error = ('Sample "%s.Sample1", column "collection_timestamp", '
-                         'wrong value "wrong date"' % self.new_study.id)
-            self.assertIn(exp_error, message)
-            exp_error = ('Sample "%s.Sample3", column "latitude", '
-                         'wrong value "None"' % self.new_study.id)
+            exp_error = ('Column "collection_timestamp", 1 wrong values: '
+                         '"wrong date" (sample %s.Sample1)'
+                         % self.new_study.id)
             self.assertIn(exp_error, message)
 
+    def test_validate_processes(self):
+        self.metadata.set_value('Sample2', 'latitude', 'wrong latitude')
+        st = npt.assert_warns(
+            qdb.exceptions.QiitaDBWarning,
+            qdb.metadata_template.sample_template.SampleTemplate.create,
+            self.metadata, self.new_study)
+
+        with catch_warnings(record=True) as warn:
+            st.validate(st.columns_restrictions, processes=2)
+            self.assertEqual(len(warn), 1)
+            exp_error = ('Column "latitude", 1 wrong values: '
+                         '"wrong latitude" (sample %s.Sample2)'
+                         % self.new_study.id)
+            self.assertIn(exp_error, str(warn[0].message))
+
     def test_validate_errors_timestampA_year4digits(self):
         self.metadata.set_value('Sample1', 'collection_timestamp',
                                 '09/20/2016 12:00')
@@ -2162,6 +2585,29 @@ class TestSampleTemplate(TestCase):
         with self.assertRaises(QE.QiitaDBOperationNotPermittedError):
             st.delete_sample('1.SKM5.640177')
 
+    def test_delete_samples(self):
+        QE = qdb.exceptions
+        st = qdb.metadata_template.sample_template.SampleTemplate.create(
+            self.metadata, self.new_study)
+        sample_ids = ['%d.Sample%d' % (st.id, i) for i in range(1, 4)]
+
+        # Nothing is deleted if any of the samples doesn't exist
+        with self.assertRaises(QE.QiitaDBUnknownIDError):
+            st.delete_samples([sample_ids[0], 'not.existing.sample'])
+        self.assertEqual(set(st.keys()), set(sample_ids))
+
+        fp_count = qdb.util.get_count("qiita.filepath")
+        st.delete_samples(sample_ids[:2])
+        self.assertEqual(set(st.keys()), {sample_ids[2]})
+        self.assertEqual(st.column_stats()['sample_type'], {'type1': 1})
+        # The files are regenerated only once
+        self.assertEqual(qdb.util.get_count("qiita.filepath"), fp_count + 1)
+
+        st = qdb.metadata_template.sample_template.SampleTemplate(1)
+        with self.assertRaises(QE.QiitaDBOperationNotPermittedError):
+            st.delete_samples(['1.SKM5.640177', '1.SKB8.640193'])
+        self.assertIn('1.SKM5.640177', st)
+
 
 EXP_SAMPLE_TEMPLATE = (
     "sample_name\tcollection_timestamp\tdescription\tdna_extracted\t"
@@ -0,0 +1,258 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+import warnings
+
+import pandas as pd
+from pandas.util.testing import assert_frame_equal
+
+from qiita_core.util import qiita_test_checker
+from qiita_core.qiita_settings import qiita_config
+import qiita_db as qdb
+
+
+class TestStorage(TestCase):
+    def test_get_storage(self):
+        obs = qdb.metadata_template.storage.get_storage('sample_')
+        self.assertTrue(isinstance(
+            obs, qdb.metadata_template.storage.TableStorage))
+
+    def test_json_value(self):
+        obs = [qdb.metadata_template.storage._json_value(v)
+               for v in [None, float('nan'), True, u'\xe9', 1.5, 2]]
+        self.assertEqual(obs, [None, None, 'true', u'\xe9', '1.5', '2'])
+        obs = qdb.metadata_template.storage._json_value(-122.123456789012345)
+        self.assertEqual(obs, '-122.12345678901235')
+
+    def test_migrate_storage_error(self):
+        with self.assertRaises(ValueError):
+            qdb.metadata_template.storage.migrate_storage('unknown')
+
+
+@qiita_test_checker()
+class TestTableStorage(TestCase):
+    def setUp(self):
+        self.storage = qdb.metadata_template.storage.TableStorage('prep_')
+
+    def test_template_ids(self):
+        self.assertEqual(self.storage.template_ids(), [1, 2])
+
+    def test_exists(self):
+        self.assertTrue(self.storage.exists(1))
+        self.assertFalse(self.storage.exists(1000))
+
+    def test_search_sql(self):
+        self.assertEqual(
+            self.storage.search_join_sql('sa'),
+            "JOIN qiita.prep_{0} sa ON ss.sample_id = sa.sample_id")
+        self.assertEqual(self.storage.search_column_sql('sa', 'barcode'),
+                         'sa.barcode')
+
+    def test_temp_table(self):
+        storage = qdb.metadata_template.storage
+        with qdb.sql_connection.TRN:
+            with storage._temp_table('qiita_test_temp', [('a', 'varchar'),
+                                                         ('b', 'bigint')],
+                                     [['x', 1], ['y', 2]]) as table:
+                self.assertEqual(table, 'qiita_test_temp')
+                qdb.sql_connection.TRN.add(
+                    "SELECT a, b FROM qiita_test_temp ORDER BY b")
+                self.assertEqual(
+                    qdb.sql_connection.TRN.execute_fetchindex(),
+                    [['x', 1], ['y', 2]])
+            # The table is dropped on exit
+            qdb.sql_connection.TRN.add(
+                "SELECT EXISTS(SELECT * FROM pg_tables "
+                "WHERE tablename = 'qiita_test_temp')")
+            self.assertFalse(qdb.sql_connection.TRN.execute_fetchlast())
+
+    def test_add_columns_update_values(self):
+        storage = qdb.metadata_template.storage
+        sample_ids = sorted(self.storage.get_category(1, 'center_name'))
+        rows = [[s_id, 'value_%d' % i, 'other'] for i, s_id in enumerate(
+            sample_ids)]
+        # Forcing the update through the temporary table
+        values_cells = storage._VALUES_CELLS
+        storage._VALUES_CELLS = 0
+        try:
+            with qdb.sql_connection.TRN:
+                # All the columns are added with a single statement
+                with qdb.sql_connection.TRN.query_budget(1):
+                    self.storage.add_columns(1, ['new_col1', 'new_col2'])
+                    qdb.sql_connection.TRN.execute()
+                self.storage.update_values(
+                    1, ['new_col1', 'new_col2'], rows)
+                qdb.sql_connection.TRN.execute()
+        finally:
+            storage._VALUES_CELLS = values_cells
+
+        obs = self.storage.get_category(1, 'new_col1')
+        self.assertEqual(obs, {s_id: 'value_%d' % i
+                               for i, s_id in enumerate(sample_ids)})
+        obs = self.storage.get_category(1, 'new_col2')
+        self.assertEqual(set(obs.values()), {'other'})
+
+    def test_update_values_mixed_types(self):
+        sample_ids = sorted(self.storage.get_category(1, 'center_name'))[:5]
+        values = [1, 2.5, True, 'text', float('nan')]
+        with qdb.sql_connection.TRN:
+            self.storage.update_values(
+                1, ['center_name'],
+                [[s_id, v] for s_id, v in zip(sample_ids, values)])
+            qdb.sql_connection.TRN.execute()
+
+        obs = self.storage.get_category(1, 'center_name')
+        self.assertEqual([obs[s_id] for s_id in sample_ids],
+                         ['1', '2.5', 'true', 'text', None])
+
+    def test_lat_longs_non_numeric_longitude(self):
+        storage = qdb.metadata_template.storage.TableStorage('sample_')
+        exp = storage.lat_longs([1])
+        sample_id = '1.SKM7.640188'
+        with qdb.sql_connection.TRN:
+            storage.update_values(1, ['longitude'], [[sample_id, 'unknown']])
+            qdb.sql_connection.TRN.execute()
+        # The sample is skipped instead of failing the cast
+        self.assertEqual(len(storage.lat_longs([1])), len(exp) - 1)
+
+
+@qiita_test_checker()
+class TestJSONBStorage(TestCase):
+    def setUp(self):
+        if not qdb.util.exists_table('metadata_sample_values'):
+            self.skipTest("The jsonb storage requires PostgreSQL 9.5")
+        self.st = qdb.metadata_template.sample_template.SampleTemplate(1)
+        self.exp_df = self.st.to_dataframe()
+        self.exp_categories = set(self.st.categories())
+        self.exp_lat_longs = sorted(qdb.meta_util.get_lat_longs())
+
+        obs = qdb.metadata_template.storage.migrate_storage('jsonb')
+        self.assertEqual(obs, 3)
+        self._metadata_storage = qiita_config.metadata_storage
+        qiita_config.metadata_storage = 'jsonb'
+
+    def tearDown(self):
+        qiita_config.metadata_storage = self._metadata_storage
+        qdb.metadata_template.storage.migrate_storage('tables')
+
+    def test_migrate_storage(self):
+        self.assertFalse(qdb.util.exists_table('sample_1'))
+        self.assertFalse(qdb.util.exists_table('prep_1'))
+        self.assertEqual(
+            qdb.metadata_template.storage.get_storage('prep_').template_ids(),
+            [1, 2])
+
+        # Nothing left to move
+        self.assertEqual(
+            qdb.metadata_template.storage.migrate_storage('jsonb'), 0)
+
+    def test_template_without_samples(self):
+        storage = qdb.metadata_template.storage.get_storage('prep_')
+        categories = storage.categories(2)
+        with qdb.sql_connection.TRN:
+            storage.delete_samples(2, storage.get_category(2, 'barcode'))
+            qdb.sql_connection.TRN.execute()
+        # The template and its categories don't depend on its samples
+        self.assertTrue(storage.exists(2))
+        self.assertEqual(storage.template_ids(), [1, 2])
+        self.assertEqual(storage.categories(2), categories)
+        self.assertEqual(storage.get_category(2, 'barcode'), {})
+
+        # The template is kept when it is moved between storages
+        self.assertEqual(
+            qdb.metadata_template.storage.migrate_storage('tables'), 3)
+        self.assertTrue(qdb.util.exists_table('prep_2'))
+        self.assertEqual(
+            qdb.metadata_template.storage.migrate_storage('jsonb'), 3)
+        self.assertEqual(storage.template_ids(), [1, 2])
+        self.assertEqual(storage.categories(2), categories)
+
+    def test_read(self):
+        self.assertTrue(
+            qdb.metadata_template.sample_template.SampleTemplate.exists(1))
+        self.assertFalse(
+            qdb.metadata_template.sample_template.SampleTemplate.exists(2))
+        self.assertEqual(set(self.st.categories()), self.exp_categories)
+        assert_frame_equal(self.st.to_dataframe().sort_index(axis=1),
+                           self.exp_df.sort_index(axis=1))
+        assert_frame_equal(
+            self.st.to_dataframe(columns=['season_environment'],
+                                 samples=['1.SKM7.640188']),
+            self.exp_df.loc[['1.SKM7.640188'], ['season_environment']])
+
+        sample = self.st['1.SKM7.640188']
+        self.assertEqual(sample['season_environment'], 'winter')
+        self.assertEqual(sample.get('not_a_column'), None)
+        self.assertEqual(set(sample.keys()), self.exp_categories)
+        with qdb.sql_connection.TRN:
+            self.assertEqual(dict(self.st.iter_rows())['1.SKM7.640188'],
+                             dict(sample))
+            self.assertEqual(
+                list(self.st.iter_rows(columns=['season_environment'],
+                                       samples=['1.SKM7.640188'])),
+                [('1.SKM7.640188', {'season_environment': 'winter'})])
+        self.assertEqual(self.st.get_category('season_environment'),
+                         self.exp_df['season_environment'].to_dict())
+        with self.assertRaises(qdb.exceptions.QiitaDBColumnError):
+            self.st.get_category('not_a_column')
+
+        self.assertIn(
+            'season_environment',
+            qdb.metadata_template.sample_template.SampleTemplate
+            .metadata_headers())
+        self.assertEqual(sorted(qdb.meta_util.get_lat_longs()),
+                         self.exp_lat_longs)
+
+    def test_search(self):
+        search = qdb.search.QiitaStudySearch()
+        obs, meta = search(
+            '(sample_type = ENVO:soil AND COMMON_NAME = "rhizosphere '
+            'metagenome" ) AND NOT Description_duplicate includes Burmese',
+            qdb.user.User('test@foo.bar'))
+        self.assertEqual(
+            meta, ["COMMON_NAME", "Description_duplicate", "sample_type"])
+        self.assertEqual(list(obs), [1])
+        exp = [['1.SKD4.640185', 'rhizosphere metagenome', 'Diesel Rhizo',
+                'ENVO:soil'],
+               ['1.SKD5.640186', 'rhizosphere metagenome', 'Diesel Rhizo',
+                'ENVO:soil'],
+               ['1.SKD6.640190', 'rhizosphere metagenome', 'Diesel Rhizo',
+                'ENVO:soil'],
+               ['1.SKM4.640180', 'rhizosphere metagenome', 'Bucu Rhizo',
+                'ENVO:soil'],
+               ['1.SKM5.640177', 'rhizosphere metagenome', 'Bucu Rhizo',
+                'ENVO:soil'],
+               ['1.SKM6.640187', 'rhizosphere metagenome', 'Bucu Rhizo',
+                'ENVO:soil']]
+        self.assertEqual(sorted(obs[1]), exp)
+
+    def test_update(self):
+        self.st.update_category('season_environment',
+                                {'1.SKM7.640188': 'summer'})
+        self.assertEqual(self.st['1.SKM7.640188']['season_environment'],
+                         'summer')
+
+        md = pd.DataFrame.from_dict(
+            {'SKM7.640188': {'new_column': 'value1'},
+             'SKD8.640184': {'new_column': 'value2'}},
+            orient='index', dtype=str)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.st.extend(md)
+        self.assertIn('new_column', self.st.categories())
+        obs = self.st.get_category('new_column')
+        self.assertEqual(obs['1.SKM7.640188'], 'value1')
+        self.assertEqual(obs['1.SKB8.640193'], None)
+
+        self.st.delete_column('new_column')
+        self.assertNotIn('new_column', self.st.categories())
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@
 # -----------------------------------------------------------------------------
 
 from six import StringIO
+from datetime import datetime
 from unittest import TestCase, main
 
 import numpy.testing as npt
@@ -81,6 +82,15 @@ class TestUtil(TestCase):
         exp.index.name = 'sample_name'
         assert_frame_equal(obs, exp)
 
+    def test_load_template_to_dataframe_empty_header_cells(self):
+        obs = npt.assert_warns(
+            qdb.exceptions.QiitaDBWarning,
+            qdb.metadata_template.util.load_template_to_dataframe,
+            StringIO(EXP_ST_SPACES_EMPTY_HEADER_CELLS))
+        exp = pd.DataFrame.from_dict(SAMPLE_TEMPLATE_DICT_FORM, dtype=str)
+        exp.index.name = 'sample_name'
+        assert_frame_equal(obs, exp)
+
     def test_load_template_to_dataframe_empty_rows(self):
         obs = qdb.metadata_template.util.load_template_to_dataframe(
             StringIO(EXP_SAMPLE_TEMPLATE_SPACES_EMPTY_ROW))
@@ -153,6 +163,20 @@ class TestUtil(TestCase):
             qdb.metadata_template.util.load_template_to_dataframe(
                 StringIO(bad))
 
+        with self.assertRaisesRegexp(qdb.exceptions.QiitaDBError,
+                                     'description: row\\(s\\) 3'):
+            qdb.metadata_template.util.load_template_to_dataframe(
+                StringIO(bad))
+
+    def test_load_template_to_dataframe_whitespace_rows(self):
+        # Rows with only whitespace and delimiters are ignored
+        template = EXP_SAMPLE_TEMPLATE + ' \t \t\t\n   \n'
+        obs = qdb.metadata_template.util.load_template_to_dataframe(
+            StringIO(template))
+        exp = pd.DataFrame.from_dict(SAMPLE_TEMPLATE_DICT_FORM, dtype=str)
+        exp.index.name = 'sample_name'
+        assert_frame_equal(obs, exp)
+
     def test_load_template_to_dataframe_typechecking(self):
         obs = qdb.metadata_template.util.load_template_to_dataframe(
             StringIO(EXP_SAMPLE_TEMPLATE_LAT_ALL_INT))
@@ -214,6 +238,39 @@ class TestUtil(TestCase):
             invalid + valid)
         self.assertEqual(obs, invalid)
 
+    def test_get_invalid_values(self):
+        get_invalid_values = qdb.metadata_template.util.get_invalid_values
+        values = pd.Series(
+            ['12', ' -3 ', '1.5', 'nan', 'abc', None, 'Not applicable'],
+            index=['S%d' % i for i in range(7)])
+        obs = get_invalid_values(values, int)
+        self.assertEqual(obs.to_dict(), {'S2': '1.5', 'S3': 'nan',
+                                         'S4': 'abc', 'S5': None})
+        obs = get_invalid_values(values, float)
+        self.assertEqual(obs.to_dict(), {'S4': 'abc', 'S5': None})
+        self.assertTrue(get_invalid_values(values, str).empty)
+        self.assertTrue(get_invalid_values(values, bool).empty)
+
+        values = pd.Series(
+            ['09/20/2016 12:00', '9/20/2016 12', '09/20/16', '2016',
+             '1/1600', '20/09/2016', None, 'Missing: Not provided'],
+            index=['S%d' % i for i in range(8)])
+        obs = get_invalid_values(values, datetime)
+        self.assertEqual(obs.to_dict(), {'S5': '20/09/2016', 'S6': None})
+
+    def test_infer_column_type(self):
+        infer_column_type = qdb.metadata_template.util.infer_column_type
+        self.assertEqual(infer_column_type(['1', ' -2', 'Not applicable']),
+                         'integer')
+        self.assertEqual(infer_column_type(['1', '2.5', None]), 'float')
+        self.assertEqual(infer_column_type([3, 2.5]), 'float')
+        self.assertEqual(infer_column_type(['09/20/2016 12:00', '2016']),
+                         'datetime')
+        self.assertEqual(infer_column_type(['1', 'abc']), 'varchar')
+        self.assertEqual(infer_column_type([True, False]), 'varchar')
+        self.assertIsNone(infer_column_type([None, 'Missing: Not provided']))
+        self.assertIsNone(infer_column_type([]))
+
     def test_looks_like_qiime_mapping_file(self):
         obs = qdb.metadata_template.util.looks_like_qiime_mapping_file(
             StringIO(EXP_SAMPLE_TEMPLATE))
@@ -365,6 +422,21 @@ EXP_SAMPLE_TEMPLATE_SPACES_EMPTY_ROW = (
     "\t\t\t\t\t\t\t\t\t\t\t\t\n"
     "\t\t\t\t\t\t\t\t\t\t\t\t\n")
 
+EXP_ST_SPACES_EMPTY_HEADER_CELLS = (
+    "sample_name\tcollection_timestamp\tdescription\thas_extracted_data\t"
+    "has_physical_specimen\thost_subject_id\tint_column\tlatitude\tlongitude\t"
+    "physical_location\trequired_sample_info_status\tsample_type\t"
+    "str_column\t\t\t\n"
+    "2.Sample1         \t05/29/2014 12:24:51\tTest Sample 1\tTrue\tTrue\t"
+    "NotIdentified\t1\t42.42\t41.41\tlocation1\treceived\ttype1\t"
+    "Value for sample 1\t\t\t\n"
+    "2.Sample2  \t05/29/2014 12:24:51\t"
+    "Test Sample 2\tTrue\tTrue\tNotIdentified\t2\t4.2\t1.1\tlocation1\t"
+    "received\ttype1\tValue for sample 2\t\t\t\n"
+    "2.Sample3\t05/29/2014 12:24:51\tTest Sample 3\tTrue\t"
+    "True\tNotIdentified\t3\t4.8\t4.41\tlocation1\treceived\ttype1\t"
+    "Value for sample 3\t\t\t\n")
+
 EXP_ST_SPACES_EMPTY_COLUMN = (
     "sample_name\tcollection_timestamp\tdescription\thas_extracted_data\t"
     "has_physical_specimen\thost_subject_id\tint_column\tlatitude\tlongitude\t"
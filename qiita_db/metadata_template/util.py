@@ -8,8 +8,9 @@
 
 from __future__ import division
 from collections import defaultdict
+from datetime import datetime
 from future.utils import PY3, viewitems
-from six import StringIO
+from six import StringIO, text_type
 
 import pandas as pd
 import numpy as np
@@ -60,32 +61,30 @@ def prefix_sample_names_with_id(md_template, study_id):
         md_template.index.name = None
 
 
-def load_template_to_dataframe(fn, strip_whitespace=True, index='sample_name'):
-    """Load a sample/prep template or a QIIME mapping file into a data frame
+def _read_template(f, index, strip_whitespace):
+    """Reads the contents of a template file in a dataframe
 
     Parameters
     ----------
-    fn : str or file-like object
-        filename of the template to load, or an already open template file
-    strip_whitespace : bool, optional
-        Defaults to True. Whether or not to strip whitespace from values in the
-        input file
-    index : str, optional
-        Defaults to 'sample_name'. The index to use in the loaded information
+    f : file-like object
+        The open template file
+    index : str
+        The column holding the sample names
+    strip_whitespace : bool
+        Whether or not to strip whitespace from the values
 
     Returns
     -------
     DataFrame
-        Pandas dataframe with the loaded information
+        The contents of the file, without index and with all the values as
+        strings. Rows whose first value is empty are removed
 
     Raises
     ------
     ValueError
         Empty file passed
     QiitaDBColumnError
-        If the sample_name column is not present in the template.
-    QiitaDBWarning
-        When columns are dropped because they have no content for any sample.
+        If the `index` column is not present in the template.
     QiitaDBError
         When non UTF-8 characters are found in the file.
     QiitaDBDuplicateHeaderError
@@ -93,92 +92,141 @@ def load_template_to_dataframe(fn, strip_whitespace=True, index='sample_name'):
 
     Notes
     -----
-    The index attribute of the DataFrame will be forced to be 'sample_name'
-    and will be cast to a string. Additionally rows that start with a '\t'
-    character will be ignored and columns that are empty will be removed. Empty
-    sample names will be removed from the DataFrame.
-
-    Column names are case-insensitive but will be lowercased on addition to
-    the database
-
-    Everything in the DataFrame will be read and managed as string
+    Only the header line is processed in Python. The rest of the file is
+    streamed to `pandas.read_csv`, and the whitespace is stripped column by
+    column, so the file is never held in memory more than once.
     """
-    # Load in file lines
-    holdfile = None
-    with open_file(fn, mode='U') as f:
-        holdfile = f.readlines()
-    if not holdfile:
+    header = f.readline()
+    if not header:
         raise ValueError('Empty file passed!')
 
-    # Strip all values in the cells in the input file, if requested
-    if strip_whitespace:
-        for pos, line in enumerate(holdfile):
-            holdfile[pos] = '\t'.join(d.strip(" \r\x0b\x0c")
-                                      for d in line.split('\t'))
-
     # get and clean the controlled columns
-    cols = holdfile[0].split('\t')
+    cols = header.rstrip('\r\n').split('\t')
+    if strip_whitespace:
+        cols = [c.strip(" \r\x0b\x0c") for c in cols]
     controlled_cols = {'sample_name'}
     controlled_cols.update(qdb.metadata_template.constants.CONTROLLED_COLS)
-    holdfile[0] = '\t'.join(c.lower() if c.lower() in controlled_cols else c
-                            for c in cols)
-
-    if index == "#SampleID":
-        # We're going to parse a QIIME mapping file. We are going to first
-        # parse it with the QIIME function so we can remove the comments
-        # easily and make sure that QIIME will accept this as a mapping file
-        data, headers, comments = _parse_mapping_file(holdfile)
-        holdfile = ["%s\n" % '\t'.join(d) for d in data]
-        holdfile.insert(0, "%s\n" % '\t'.join(headers))
-        # The QIIME parser fixes the index and removes the #
-        index = 'SampleID'
+    cols = [c.lower() if c.lower() in controlled_cols else c for c in cols]
+    # name the empty header cells as pandas does, so they are not reported
+    # as duplicates and are removed with the rest of the empty columns
+    cols = [c if c else 'Unnamed: %d' % i for i, c in enumerate(cols)]
+
+    # Check that we don't have duplicate columns
+    if len(set(cols)) != len(cols):
+        raise qdb.exceptions.QiitaDBDuplicateHeaderError(
+            find_duplicates(cols))
+
+    if index not in cols:
+        raise qdb.exceptions.QiitaDBColumnError(
+            "The '%s' column is missing from your template, this file cannot "
+            "be parsed." % index)
 
     # index_col:
     #   is set as False, otherwise it is cast as a float and we want a string
     # keep_default:
     #   is set as False, to avoid inferring empty/NA values with the defaults
     #   that Pandas has.
-    # comment:
-    #   using the tab character as "comment" we remove rows that are
-    #   constituted only by delimiters i. e. empty rows.
+    start = f.tell()
     try:
         template = pd.read_csv(
-            StringIO(''.join(holdfile)),
+            f,
             sep='\t',
+            header=None,
+            names=cols,
             dtype=str,
             encoding='utf-8',
             infer_datetime_format=False,
             keep_default_na=False,
             index_col=False,
-            comment='\t',
-            mangle_dupe_cols=False,
             converters={index: lambda x: str(x).strip()})
     except UnicodeDecodeError:
-        # Find row number and col number for utf-8 encoding errors
-        headers = holdfile[0].strip().split('\t')
+        # Find row number and col number for utf-8 encoding errors. The file
+        # is read again, one line at a time
+        f.seek(start)
         errors = defaultdict(list)
-        for row, line in enumerate(holdfile, 1):
+        for row, line in enumerate(iter(f.readline, ''), 2):
             for col, cell in enumerate(line.split('\t')):
                 try:
-                    cell.encode('utf-8')
+                    if isinstance(cell, bytes):
+                        cell.decode('utf-8')
                 except UnicodeError:
-                    errors[headers[col]].append(row)
-        lines = ['%s: row(s) %s' % (header, ', '.join(map(str, rows)))
-                 for header, rows in viewitems(errors)]
+                    errors[cols[col]].append(row)
+        lines = ['%s: row(s) %s' % (column, ', '.join(map(str, rows)))
+                 for column, rows in viewitems(errors)]
         raise qdb.exceptions.QiitaDBError(
             'Non UTF-8 characters found in columns:\n' + '\n'.join(lines))
 
-    # Check that we don't have duplicate columns
-    if len(set(template.columns)) != len(template.columns):
-        raise qdb.exceptions.QiitaDBDuplicateHeaderError(
-            find_duplicates(template.columns))
+    # Strip all values in the cells in the input file, if requested
+    if strip_whitespace:
+        for col in cols:
+            if col != index and template[col].notnull().any():
+                template[col] = template[col].str.strip(" \r\x0b\x0c")
 
-    initial_columns = set(template.columns)
+    # remove the rows constituted only by delimiters, i.e. empty rows
+    return template[(template[cols[0]] != '').values]
 
-    if index not in template.columns:
-        raise qdb.exceptions.QiitaDBColumnError(
-            "The '%s' column is missing from your template, this file cannot "
-            "be parsed." % index)
+
+def load_template_to_dataframe(fn, strip_whitespace=True, index='sample_name'):
+    """Load a sample/prep template or a QIIME mapping file into a data frame
+
+    Parameters
+    ----------
+    fn : str or file-like object
+        filename of the template to load, or an already open template file
+    strip_whitespace : bool, optional
+        Defaults to True. Whether or not to strip whitespace from values in the
+        input file
+    index : str, optional
+        Defaults to 'sample_name'. The index to use in the loaded information
+
+    Returns
+    -------
+    DataFrame
+        Pandas dataframe with the loaded information
+
+    Raises
+    ------
+    ValueError
+        Empty file passed
+    QiitaDBColumnError
+        If the sample_name column is not present in the template.
+    QiitaDBWarning
+        When columns are dropped because they have no content for any sample.
+    QiitaDBError
+        When non UTF-8 characters are found in the file.
+    QiitaDBDuplicateHeaderError
+        If duplicate columns are present in the template
+
+    Notes
+    -----
+    The index attribute of the DataFrame will be forced to be 'sample_name'
+    and will be cast to a string. Additionally rows that start with a '\t'
+    character will be ignored and columns that are empty will be removed. Empty
+    sample names will be removed from the DataFrame.
+
+    Column names are case-insensitive but will be lowercased on addition to
+    the database
+
+    Everything in the DataFrame will be read and managed as string
+    """
+    with open_file(fn, mode='U') as f:
+        if index == "#SampleID":
+            # We're going to parse a QIIME mapping file. We are going to first
+            # parse it with the QIIME function so we can remove the comments
+            # easily and make sure that QIIME will accept this as a mapping
+            # file. These files are small, so they are parsed in memory
+            lines = f.readlines()
+            if not lines:
+                raise ValueError('Empty file passed!')
+            data, headers, comments = _parse_mapping_file(lines)
+            # The QIIME parser fixes the index and removes the #
+            index = 'SampleID'
+            lines = ["%s\n" % '\t'.join(d) for d in data]
+            lines.insert(0, "%s\n" % '\t'.join(headers))
+            template = _read_template(StringIO(''.join(lines)), index,
+                                      strip_whitespace)
+        else:
+            template = _read_template(f, index, strip_whitespace)
 
     # remove rows that have no sample identifier but that may have other data
     # in the rest of the columns
@@ -189,11 +237,10 @@ def load_template_to_dataframe(fn, strip_whitespace=True, index='sample_name'):
 
     # it is not uncommon to find templates that have empty columns so let's
     # find the columns that are all ''
-    columns = np.where(np.all(template.applymap(lambda x: x == ''), axis=0))
-    template.drop(template.columns[columns], axis=1, inplace=True)
+    empty = (template == '').all(axis=0)
+    dropped_cols = template.columns[empty.values].tolist()
+    template.drop(dropped_cols, axis=1, inplace=True)
 
-    initial_columns.remove(index)
-    dropped_cols = initial_columns - set(template.columns)
     if dropped_cols:
         warnings.warn(
             'The following column(s) were removed from the template because '
@@ -268,6 +315,109 @@ def get_invalid_column_names(column_names):
     return inv
 
 
+def _castable(value, datatype):
+    """Whether `value` can be cast to `datatype`"""
+    if datatype == datetime:
+        for fmt in qdb.metadata_template.constants.DATETIME_FORMATS:
+            try:
+                datetime.strptime(str(value), fmt)
+                return True
+            except ValueError:
+                pass
+        return False
+    try:
+        datatype(value)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+def get_invalid_values(values, datatype):
+    """Get the values that can't be cast to `datatype`
+
+    Parameters
+    ----------
+    values : pandas Series
+        The values to check
+    datatype : type
+        The type to which the values should be castable
+
+    Returns
+    -------
+    pandas Series
+        The values of `values` that can't be cast to `datatype`, other than
+        the EBI null values
+
+    Notes
+    -----
+    Whole columns are checked at once: the datetimes are parsed with
+    `pandas.to_datetime` trying each of the formats in DATETIME_FORMATS on the
+    values not parsed yet, and the numbers with `pandas.to_numeric`. Only the
+    values rejected by pandas are checked one by one, so the result is the
+    same as casting each value.
+    """
+    values = values[~values.isin(
+        qdb.metadata_template.constants.EBI_NULL_VALUES)]
+
+    if datatype in (str, text_type, bool):
+        # Any value can be cast to these types
+        return values.iloc[:0]
+    elif datatype == datetime:
+        candidates = values
+        for fmt in qdb.metadata_template.constants.DATETIME_FORMATS:
+            if candidates.empty:
+                break
+            parsed = pd.to_datetime(candidates, format=fmt, errors='coerce')
+            candidates = candidates[parsed.isnull()]
+    elif datatype == int:
+        candidates = values[~values.str.match(r'^\s*[+-]?\d+\s*$',
+                                              na=False).astype(bool)]
+    elif datatype == float:
+        candidates = values[
+            pd.to_numeric(values, errors='coerce').isnull()]
+    else:
+        candidates = values
+
+    return candidates[np.array(
+        [not _castable(v, datatype) for v in candidates], dtype=bool)]
+
+
+def _get_invalid_values(args):
+    """Unpacks the arguments of get_invalid_values for Pool.map"""
+    return get_invalid_values(*args)
+
+
+def infer_column_type(values):
+    """Infers the type of the values of a metadata column
+
+    Parameters
+    ----------
+    values : pandas Series
+        The values of the column
+
+    Returns
+    -------
+    str or None
+        The first of 'integer', 'float' and 'datetime' to which all the
+        values, other than the EBI null values, can be cast, or 'varchar' if
+        there is none. None if the column has no values
+    """
+    # Only the distinct values are checked, as they are stored in the db
+    values = pd.Series(
+        [qdb.metadata_template.storage._json_value(v)
+         for v in pd.Series(values).unique()], dtype=object)
+    values = values[values.notnull() & ~values.isin(
+        qdb.metadata_template.constants.EBI_NULL_VALUES)]
+    if values.empty:
+        return None
+
+    for name, datatype in (('integer', int), ('float', float),
+                           ('datetime', datetime)):
+        if get_invalid_values(values, datatype).empty:
+            return name
+    return 'varchar'
+
+
 def looks_like_qiime_mapping_file(fp):
     """Checks if the file looks like a QIIME mapping file
 
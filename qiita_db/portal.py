@@ -175,6 +175,8 @@ class Portal(qdb.base.QiitaObject):
                 END $do$;"""
             qdb.sql_connection.TRN.add(sql, [portal_id] * 2)
             qdb.sql_connection.TRN.execute()
+            # The default analyses of all the users have been removed too
+            qdb.base.clear_identity_map()
 
     @staticmethod
     def exists(portal):
@@ -210,9 +212,8 @@ class Portal(qdb.base.QiitaObject):
                      FROM qiita.study_portal
                      WHERE portal_type_id = %s"""
             qdb.sql_connection.TRN.add(sql, [self._id])
-            return set(
-                qdb.study.Study(sid)
-                for sid in qdb.sql_connection.TRN.execute_fetchflatten())
+            return set(qdb.study.Study.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten()))
 
     def _check_studies(self, studies):
         with qdb.sql_connection.TRN:
@@ -323,6 +324,8 @@ class Portal(qdb.base.QiitaObject):
             if len(clean_studies) != 0:
                 qdb.sql_connection.TRN.add(sql, [tuple(studies), self._id])
             qdb.sql_connection.TRN.execute()
+            for study_id in clean_studies:
+                qdb.study.Study._invalidate_identity_map(study_id)
 
     def get_analyses(self):
         """Returns all analyses belonging to a portal
@@ -337,9 +340,8 @@ class Portal(qdb.base.QiitaObject):
                      FROM qiita.analysis_portal
                      WHERE portal_type_id = %s"""
             qdb.sql_connection.TRN.add(sql, [self._id])
-            return set(
-                qdb.analysis.Analysis(aid)
-                for aid in qdb.sql_connection.TRN.execute_fetchflatten())
+            return set(qdb.analysis.Analysis.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten()))
 
     def _check_analyses(self, analyses):
         with qdb.sql_connection.TRN:
@@ -472,3 +474,5 @@ class Portal(qdb.base.QiitaObject):
                 qdb.sql_connection.TRN.add(
                     sql, [tuple(clean_analyses), self._id])
             qdb.sql_connection.TRN.execute()
+            for analysis_id in clean_analyses:
+                qdb.analysis.Analysis._invalidate_identity_map(analysis_id)
@@ -88,6 +88,37 @@ class ProcessingJob(qdb.base.QiitaObject):
     create
     """
     _table = 'processing_job'
+    _row_sql = """SELECT *
+                  FROM qiita.processing_job
+                    JOIN qiita.processing_job_status
+                        USING (processing_job_status_id)
+                  WHERE processing_job_id = ANY(%s::uuid[])"""
+
+    @classmethod
+    def _check_ids(cls, ids):
+        """Returns which of the provided IDs actually exist in the database
+
+        Parameters
+        ----------
+        ids : list of str
+            The IDs to test
+
+        Returns
+        -------
+        set of str
+            The IDs in `ids` present in the database
+
+        Notes
+        -----
+        This function overwrites the base function, as the ids need to be
+        casted to uuid.
+        """
+        with qdb.sql_connection.TRN:
+            sql = """SELECT processing_job_id
+                     FROM qiita.processing_job
+                     WHERE processing_job_id = ANY(%s::uuid[])"""
+            qdb.sql_connection.TRN.add(sql, [ids])
+            return set(qdb.sql_connection.TRN.execute_fetchflatten())
 
     @classmethod
     def exists(cls, job_id):
@@ -181,6 +212,9 @@ class ProcessingJob(qdb.base.QiitaObject):
             The user that launched the job
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return qdb.user.User(row['email'])
             sql = """SELECT email
                      FROM qiita.processing_job
                      WHERE processing_job_id = %s"""
@@ -198,6 +232,9 @@ class ProcessingJob(qdb.base.QiitaObject):
             The command that the job executes
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return qdb.software.Command(row['command_id'])
             sql = """SELECT command_id
                      FROM qiita.processing_job
                      WHERE processing_job_id = %s"""
@@ -215,11 +252,15 @@ class ProcessingJob(qdb.base.QiitaObject):
             The parameters used in the job's command
         """
         with qdb.sql_connection.TRN:
-            sql = """SELECT command_id, command_parameters
-                     FROM qiita.processing_job
-                     WHERE processing_job_id = %s"""
-            qdb.sql_connection.TRN.add(sql, [self.id])
-            res = qdb.sql_connection.TRN.execute_fetchindex()[0]
+            res = self._prefetched_row()
+            if res is not None:
+                res = [res['command_id'], res['command_parameters']]
+            else:
+                sql = """SELECT command_id, command_parameters
+                         FROM qiita.processing_job
+                         WHERE processing_job_id = %s"""
+                qdb.sql_connection.TRN.add(sql, [self.id])
+                res = qdb.sql_connection.TRN.execute_fetchindex()[0]
             return qdb.software.Parameters.load(
                 qdb.software.Command(res[0]), values_dict=res[1])
 
@@ -253,6 +294,9 @@ class ProcessingJob(qdb.base.QiitaObject):
 
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['processing_job_status']
             sql = """SELECT processing_job_status
                      FROM qiita.processing_job_status
                         JOIN qiita.processing_job
@@ -293,6 +337,7 @@ class ProcessingJob(qdb.base.QiitaObject):
                      WHERE processing_job_id = %s"""
             qdb.sql_connection.TRN.add(sql, [new_status, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     def _generate_cmd(self):
         """Generates the command to submit the job
@@ -449,6 +494,7 @@ class ProcessingJob(qdb.base.QiitaObject):
                      WHERE processing_job_id = %s"""
             qdb.sql_connection.TRN.add(sql, [log.id, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
             # All the children should be marked as failure
             for c in self.children:
@@ -464,6 +510,9 @@ class ProcessingJob(qdb.base.QiitaObject):
             The last heartbeat timestamp
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['heartbeat']
             sql = """SELECT heartbeat
                      FROM qiita.processing_job
                      WHERE processing_job_id = %s"""
@@ -493,6 +542,7 @@ class ProcessingJob(qdb.base.QiitaObject):
                      WHERE processing_job_id = %s"""
             qdb.sql_connection.TRN.add(sql, [datetime.now(), self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     @property
     def step(self):
@@ -504,6 +554,9 @@ class ProcessingJob(qdb.base.QiitaObject):
             The current step of the job
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['step']
             sql = """SELECT step
                      FROM qiita.processing_job
                      WHERE processing_job_id = %s"""
@@ -534,6 +587,7 @@ class ProcessingJob(qdb.base.QiitaObject):
                      WHERE processing_job_id = %s"""
             qdb.sql_connection.TRN.add(sql, [value, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     @property
     def children(self):
@@ -600,6 +654,7 @@ class ProcessingJob(qdb.base.QiitaObject):
                 qdb.sql_connection.TRN.add(sql_update,
                                            [dumps(params), pending, c.id])
                 qdb.sql_connection.TRN.execute()
+                c._invalidate_prefetched_row()
 
                 if pending is None:
                     # The child already has all the parameters
@@ -1028,6 +1083,7 @@ class ProcessingWorkflow(qdb.base.QiitaObject):
             sql = """DELETE FROM qiita.processing_job
                      WHERE processing_job_id = %s"""
             qdb.sql_connection.TRN.add(sql, [job.id])
+            ProcessingJob._invalidate_identity_map(job.id)
 
             qdb.sql_connection.TRN.execute()
 
@@ -139,7 +139,8 @@ class SearchTerm(object):
         if column_name in self.study_cols:
             column_name = "st.%s" % column_name.lower()
         else:
-            column_name = "sa.%s" % column_name.lower()
+            column_name = qdb.metadata_template.storage.get_storage(
+                'sample_').search_column_sql('sa', column_name.lower())
 
         if argument_type in [int, float]:
             column_name = 'CAST(%s AS FLOAT)' % column_name
@@ -310,19 +311,10 @@ class QiitaStudySearch(object):
         meta_headers.discard('sample_id')
         meta_headers = tuple(meta_headers.difference(self.study_cols))
 
-        # get all study ids that contain all metadata categories searched for
-        sql = []
-        if meta_headers:
-            # have study-specific metadata, so need to find specific studies
-            for meta in meta_headers:
-                sql.append("SELECT DISTINCT table_name FROM "
-                           "information_schema.columns WHERE "
-                           "lower(column_name) = lower('{0}')".format(
-                            qdb.util.scrub_data(meta)))
-        else:
-            # no study-specific metadata, so need all studies
-            sql.append("SELECT DISTINCT table_name "
-                       "FROM information_schema.columns")
+        # get all study ids that contain all metadata categories searched for.
+        # If there is no study-specific metadata, we need all studies
+        storage = qdb.metadata_template.storage.get_storage('sample_')
+        sql = storage.search_templates_sql(meta_headers)
 
         # combine the query
         if only_with_processed_data:
@@ -346,15 +338,15 @@ class QiitaStudySearch(object):
             if meta in self.study_cols:
                 header_info.append("st.%s" % meta)
             else:
-                header_info.append("sa.%s" % meta)
+                header_info.append(storage.search_column_sql('sa', meta))
         # build the SQL query
 
         sample_sql = ("SELECT ss.sample_id, %s "
-                      "FROM qiita.study_sample ss "
-                      "JOIN qiita.sample_{0} sa ON ss.sample_id = sa.sample_id"
-                      " JOIN qiita.study st ON st.study_id = ss.study_id "
+                      "FROM qiita.study_sample ss %s "
+                      "JOIN qiita.study st ON st.study_id = ss.study_id "
                       "WHERE %s" %
-                      (','.join(header_info), sql_where))
+                      (','.join(header_info), storage.search_join_sql('sa'),
+                       sql_where))
 
         return study_sql, sample_sql, meta_header_type_lookup.keys()
 
@@ -8,8 +8,12 @@ This modules provides wrappers for the psycopg2 module to allow easy use of
 transaction blocks and SQL execution/data retrieval.
 
 This module provides the variable TRN, which is the transaction available
-to use in the system. The singleton pattern is applied and this works as long
-as the system remains single-threaded.
+to use in the system. The singleton pattern is applied, but the state of the
+transaction is local to each thread, so different threads can use TRN at the
+same time without interfering with each other. If the connection pool is
+enabled in the configuration file (POOL_MAX_CONNECTIONS > 0), each thread
+takes a connection from the pool when entering the first context and returns
+it to the pool when leaving it.
 
 Classes
 -------
@@ -18,6 +22,8 @@ Classes
    :toctree: generated/
 
    SQLConnectionHandler
+   ConnectionPool
+   QueryStats
    Transaction
 
 Examples
@@ -128,18 +134,26 @@ transaction (represented by entering to the context) is exited:
 # -----------------------------------------------------------------------------
 from __future__ import division
 from contextlib import contextmanager
+from re import compile as re_compile, IGNORECASE
 from itertools import chain
 from functools import partial, wraps
 from datetime import date, time, datetime
+from threading import local, Lock, BoundedSemaphore
+from timeit import default_timer
+from uuid import uuid4
+from warnings import warn
 
+from six import text_type
 from psycopg2 import (connect, ProgrammingError, Error as PostgresError,
                       OperationalError)
 from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from psycopg2.extensions import (
     ISOLATION_LEVEL_AUTOCOMMIT, ISOLATION_LEVEL_READ_COMMITTED,
     TRANSACTION_STATUS_IDLE)
 
 from qiita_core.qiita_settings import qiita_config
+import qiita_db as qdb
 
 
 class SQLConnectionHandler(object):
@@ -499,6 +513,276 @@ class SQLConnectionHandler(object):
         return result
 
 
+class ConnectionPool(object):
+    """A bounded, thread-safe pool of connections to the qiita database
+
+    Parameters
+    ----------
+    minconn : int
+        The number of connections opened when the pool is created
+    maxconn : int
+        The maximum number of connections that the pool can hold
+
+    Notes
+    -----
+    Differently from psycopg2's ThreadedConnectionPool, which raises an error
+    when all the connections are in use, `getconn` blocks until one of the
+    connections is returned to the pool.
+    """
+    def __init__(self, minconn, maxconn):
+        self._semaphore = BoundedSemaphore(maxconn)
+        self._pool = ThreadedConnectionPool(
+            minconn, maxconn, user=qiita_config.user,
+            password=qiita_config.password, database=qiita_config.database,
+            host=qiita_config.host, port=qiita_config.port)
+
+    def getconn(self):
+        """Takes a connection from the pool, waiting until one is available
+
+        Returns
+        -------
+        psycopg2.connection
+            The connection taken from the pool
+        """
+        self._semaphore.acquire()
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def putconn(self, conn):
+        """Returns a connection to the pool
+
+        Parameters
+        ----------
+        conn : psycopg2.connection
+            The connection to return. If it is closed, it is discarded and the
+            pool will open a new one when needed
+        """
+        try:
+            self._pool.putconn(conn, close=conn.closed != 0)
+        finally:
+            self._semaphore.release()
+
+    def closeall(self):
+        """Closes all the connections in the pool"""
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _get_connection_pool():
+    """Returns the system connection pool, creating it if needed
+
+    Returns
+    -------
+    ConnectionPool
+        The connection pool configured in the qiita configuration file
+
+    Raises
+    ------
+    RuntimeError
+        If the connection pool is disabled in the configuration file
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if qiita_config.pool_max_connections < 1:
+                raise RuntimeError(
+                    "The connection pool is disabled. Set "
+                    "POOL_MAX_CONNECTIONS in the configuration file to use "
+                    "pooled transactions.")
+            _pool = ConnectionPool(qiita_config.pool_min_connections,
+                                   qiita_config.pool_max_connections)
+    return _pool
+
+
+def close_connection_pool():
+    """Closes all the connections of the system connection pool, if any"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+# Statements that never return rows (as long as they don't have a RETURNING
+# clause), so they can be sent to the server in a single round trip
+_NON_RETURNING_RE = re_compile(
+    r'^\s*(INSERT|UPDATE|DELETE|CREATE|ALTER|DROP)\b', IGNORECASE)
+_RETURNING_RE = re_compile(r'\bRETURNING\b', IGNORECASE)
+
+
+def _is_non_returning(sql):
+    """Checks if the SQL statement is known to not return any row
+
+    Parameters
+    ----------
+    sql : str
+        The SQL statement
+
+    Returns
+    -------
+    bool
+        Whether `sql` is a statement that doesn't return rows
+    """
+    return (_NON_RETURNING_RE.match(sql) is not None and
+            _RETURNING_RE.search(sql) is None)
+
+
+def _copy_value(value):
+    """Serializes `value` in the text format of the COPY command
+
+    Parameters
+    ----------
+    value : object
+        The value to serialize
+
+    Returns
+    -------
+    str
+        The serialized value. None and NaN are serialized as NULL
+
+    Notes
+    -----
+    NaN is loaded as NULL, unlike a NaN passed as a query parameter, which
+    psycopg2 sends as the 'NaN' string. The metadata storages write None and
+    NaN as NULL in all their write paths, so a missing value is stored the
+    same way regardless of how many rows are written at once.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return '\\N'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, text_type):
+        value = value.encode('utf-8')
+    elif isinstance(value, float):
+        # repr keeps all the significant digits, as psycopg2 does when it
+        # adapts a float
+        value = repr(value)
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n').replace('\r', '\\r')
+
+
+class _CopyStream(object):
+    """File-like object that serializes rows in the COPY text format on demand
+
+    Parameters
+    ----------
+    rows : iterable of iterables
+        The rows to serialize
+
+    Notes
+    -----
+    The rows are serialized as they are read, so the full serialization is
+    never held in memory.
+    """
+    def __init__(self, rows):
+        self._lines = ("%s\n" % '\t'.join(_copy_value(v) for v in row)
+                       for row in rows)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    def readline(self, size=-1):
+        if not self._buffer:
+            self._buffer = next(self._lines, '')
+        line, sep, rest = self._buffer.partition('\n')
+        self._buffer = rest
+        return line + sep
+
+
+class QueryStats(object):
+    """Statistics of the queries executed through a transaction
+
+    Parameters
+    ----------
+    keep_records : bool, optional
+        If True, keep a record of every round trip in `records`. Default:
+        False, so the memory used doesn't grow with the transaction
+
+    Attributes
+    ----------
+    count : int
+        The number of queries executed
+    round_trips : int
+        The number of round trips to the database. It can be lower than
+        `count` if some queries have been executed in batches
+    total_time : float
+        The cumulative wall time, in seconds, of all the round trips
+    rows : int
+        The number of rows returned by all the queries
+    records : list of dict
+        One record per round trip, with the keys 'sql', 'sql_args',
+        'queries' (number of queries executed), 'time' (wall time in seconds)
+        and 'rows' (number of rows returned). Only filled if `keep_records`
+        is True
+    slow_queries : list of dict
+        The records whose time is above the configured slow query threshold
+    """
+    def __init__(self, keep_records=False):
+        self.count = 0
+        self.round_trips = 0
+        self.total_time = 0.0
+        self.rows = 0
+        self.keep_records = keep_records
+        self.records = []
+        self.slow_queries = []
+
+    def record(self, sql, sql_args, queries, elapsed, rows):
+        """Records the execution of a round trip to the database
+
+        Parameters
+        ----------
+        sql : str
+            The executed sql
+        sql_args : list, tuple or dict of objects
+            The arguments of the executed sql
+        queries : int
+            The number of queries executed in the round trip
+        elapsed : float
+            The wall time of the round trip, in seconds
+        rows : int
+            The number of rows returned
+
+        Returns
+        -------
+        dict
+            The record of the round trip
+        """
+        record = {'sql': sql, 'sql_args': sql_args, 'queries': queries,
+                  'time': elapsed, 'rows': rows}
+        self.count += queries
+        self.round_trips += 1
+        self.total_time += elapsed
+        self.rows += rows
+        if self.keep_records:
+            self.records.append(record)
+        threshold = qiita_config.slow_query_threshold
+        if threshold and elapsed >= threshold:
+            self.slow_queries.append(record)
+        return record
+
+
 def _checker(func):
     """Decorator to check that methods are executed inside the context"""
     @wraps(func)
@@ -511,12 +795,30 @@ def _checker(func):
     return wrapper
 
 
-class Transaction(object):
+class Transaction(local):
     """A context manager that encapsulates a DB transaction
 
     A transaction is defined by a series of consecutive queries that need to
     be applied to the database as a single block.
 
+    Parameters
+    ----------
+    pooled : bool, optional
+        Whether the connection is taken from the connection pool when entering
+        the first context and returned to it when leaving it. Defaults to
+        True if the pool is enabled in the configuration file.
+
+    Attributes
+    ----------
+    batch_size : int
+        The maximum number of consecutive statements that don't return rows
+        (INSERT, UPDATE, DELETE and DDL without a RETURNING clause) that are
+        sent to the server in a single round trip. If 1, every statement is
+        executed in its own round trip.
+    stats
+    cache
+    is_read_only
+
     Raises
     ------
     RuntimeError
@@ -526,14 +828,30 @@ class Transaction(object):
     -----
     When the execution leaves the context manager, any remaining queries in
     the transaction will be executed and committed.
+    The state of the transaction (queries, results, contexts and connection)
+    is local to each thread.
+    Transactions that only read from the database can be started with
+    `read_only` instead.
     """
-    def __init__(self):
+    batch_size = 500
+
+    def __init__(self, pooled=None):
+        if pooled is None:
+            pooled = qiita_config.pool_max_connections > 0
+        self._pooled = pooled
         self._queries = []
         self._results = []
         self._contexts_entered = 0
         self._connection = None
         self._post_commit_funcs = []
         self._post_rollback_funcs = []
+        self._stats = QueryStats()
+        self._budgets = []
+        self._logging_slow_queries = False
+        self._cache = {}
+        self._read_only = False
+        self._primary_connection = None
+        self._replica_connection = None
 
     def _open_connection(self):
         # If the connection already exists and is not closed, don't do anything
@@ -541,11 +859,20 @@ class Transaction(object):
             return
 
         try:
-            self._connection = connect(user=qiita_config.user,
-                                       password=qiita_config.password,
-                                       database=qiita_config.database,
-                                       host=qiita_config.host,
-                                       port=qiita_config.port)
+            if self._read_only and qiita_config.replica_dsn:
+                self._connection = connect(qiita_config.replica_dsn)
+            elif self._pooled:
+                if self._connection is not None:
+                    # The connection was closed while in use, give it back so
+                    # the pool discards it
+                    self._release_connection()
+                self._connection = _get_connection_pool().getconn()
+            else:
+                self._connection = connect(user=qiita_config.user,
+                                           password=qiita_config.password,
+                                           database=qiita_config.database,
+                                           host=qiita_config.host,
+                                           port=qiita_config.port)
         except OperationalError as e:
             # catch three known common exceptions and raise runtime errors
             try:
@@ -574,9 +901,67 @@ class Transaction(object):
                      ' in the Qiita installation base directory.')
             raise RuntimeError(ebase % (e.message, etext))
 
+    def _release_connection(self):
+        """Returns the connection to the connection pool"""
+        conn = self._connection
+        self._connection = None
+        _get_connection_pool().putconn(conn)
+
     def close(self):
         if self._connection is not None:
-            self._connection.close()
+            if self._pooled and not (self._read_only and
+                                     qiita_config.replica_dsn):
+                self._release_connection()
+            else:
+                self._connection.close()
+        if self._replica_connection is not None:
+            self._replica_connection.close()
+            self._replica_connection = None
+
+    def _start_read_only(self):
+        """Flags the transaction as read only and switches to the replica"""
+        self._read_only = True
+        if qiita_config.replica_dsn:
+            self._primary_connection = self._connection
+            self._connection = self._replica_connection
+
+    def _end_read_only(self):
+        """Unflags the transaction as read only and switches to the primary"""
+        self._read_only = False
+        if qiita_config.replica_dsn:
+            self._replica_connection = self._connection
+            self._connection = self._primary_connection
+            self._primary_connection = None
+
+    def _set_transaction_read_only(self):
+        """Starts the database transaction as read only if needed"""
+        if (self._read_only and self._connection.get_transaction_status() ==
+                TRANSACTION_STATUS_IDLE):
+            with self._connection.cursor() as cur:
+                cur.execute("SET TRANSACTION READ ONLY")
+
+    @contextmanager
+    def read_only(self):
+        """Context manager of a read only transaction
+
+        Notes
+        -----
+        If a transaction is already in progress, the context joins it as is.
+        Otherwise, a new transaction is started with SET TRANSACTION READ
+        ONLY, so any attempt to modify the database fails. When the last
+        context is left the transaction is closed without committing it. If
+        a read replica is configured (REPLICA_DSN), the queries are executed
+        in the replica.
+        """
+        if self._contexts_entered == 0:
+            self._start_read_only()
+        with self:
+            yield self
+
+    @property
+    def is_read_only(self):
+        """Whether the current transaction is read only"""
+        return self._read_only
 
     @contextmanager
     def _get_cursor(self):
@@ -595,13 +980,22 @@ class Transaction(object):
         self._open_connection()
 
         try:
+            self._set_transaction_read_only()
             with self._connection.cursor(cursor_factory=DictCursor) as cur:
                 yield cur
         except PostgresError as e:
             raise RuntimeError("Cannot get postgres cursor: %s" % e)
 
     def __enter__(self):
-        self._open_connection()
+        try:
+            self._open_connection()
+        except Exception:
+            if self._contexts_entered == 0 and self._read_only:
+                self._end_read_only()
+            raise
+        if self._contexts_entered == 0:
+            self._stats = QueryStats()
+            self._cache = {}
         self._contexts_entered += 1
         return self
 
@@ -632,9 +1026,149 @@ class Transaction(object):
                 self._clean_up(exc_type)
             finally:
                 self._contexts_entered -= 1
+                if self._read_only:
+                    self._end_read_only()
+                if self._pooled and self._connection is not None:
+                    self._release_connection()
+            if (qiita_config.log_slow_queries and self._stats.slow_queries and
+                    not self._logging_slow_queries):
+                self._log_slow_queries()
         else:
             self._contexts_entered -= 1
 
+    def _log_slow_queries(self):
+        """Stores the slow queries of the last transaction in qiita.logging
+
+        Notes
+        -----
+        The entries are created in a new transaction, so they are stored even
+        if the transaction that executed the slow queries was rolled back. The
+        transaction is already finished, so a failure storing them is only
+        reported as a warning.
+        """
+        stats = self._stats
+        self._logging_slow_queries = True
+        try:
+            for record in stats.slow_queries:
+                info = {'sql': record['sql'],
+                        'sql_args': str(record['sql_args']),
+                        'queries': record['queries'],
+                        'time': record['time'],
+                        'rows': record['rows'],
+                        'transaction_queries': stats.count,
+                        'transaction_time': stats.total_time}
+                qdb.logger.LogEntry.create(
+                    'Warning', 'Slow query: %.3f seconds' % record['time'],
+                    info=info)
+        except Exception as e:
+            warn("The slow queries could not be logged: %s" % e,
+                 qdb.exceptions.QiitaDBWarning)
+        finally:
+            self._logging_slow_queries = False
+            # Keep the stats of the instrumented transaction available
+            self._stats = stats
+
+    @property
+    def cache(self):
+        """A dictionary to cache values during the current transaction
+
+        Returns
+        -------
+        dict
+            The cache of the current transaction
+
+        Notes
+        -----
+        The cache is emptied when entering the first context and when the
+        transaction is committed or rolled back, so the values stored in it
+        are never visible outside the transaction in which they were
+        computed. Any code modifying the database is responsible for
+        invalidating the cached values that it makes stale.
+        """
+        return self._cache
+
+    @property
+    def stats(self):
+        """The statistics of the queries executed in the current transaction
+
+        Returns
+        -------
+        QueryStats
+            The statistics of the current transaction or, if invoked outside a
+            context, of the last transaction executed
+
+        See Also
+        --------
+        query_budget
+        """
+        return self._stats
+
+    def _record_query(self, sql, sql_args, queries, elapsed, rows):
+        """Records the execution of a round trip to the database
+
+        Parameters
+        ----------
+        sql : str
+            The executed sql
+        sql_args : list, tuple or dict of objects
+            The arguments of the executed sql
+        queries : int
+            The number of queries executed in the round trip
+        elapsed : float
+            The wall time of the round trip, in seconds
+        rows : int
+            The number of rows returned
+        """
+        self._stats.record(sql, sql_args, queries, elapsed, rows)
+        for budget in self._budgets:
+            budget.record(sql, sql_args, queries, elapsed, rows)
+
+    @contextmanager
+    def query_budget(self, max_queries):
+        """Checks that a block of code doesn't exceed a number of queries
+
+        Parameters
+        ----------
+        max_queries : int
+            The maximum number of queries that the block can execute
+
+        Returns
+        -------
+        QueryStats
+            The statistics of the queries executed in the block
+
+        Raises
+        ------
+        AssertionError
+            If the block executed more than `max_queries` queries
+
+        Notes
+        -----
+        Only the queries executed inside the block are taken into account, so
+        any transaction context used in the code under test should be entered
+        and exited inside the block.
+
+        Examples
+        --------
+        >>> with TRN.query_budget(2):
+        ...     with TRN:
+        ...         TRN.add("SELECT 42")
+        ...         TRN.add("SELECT 43")
+        ...         res = TRN.execute()
+        """
+        stats = QueryStats(keep_records=True)
+        self._budgets.append(stats)
+        try:
+            yield stats
+        finally:
+            self._budgets.remove(stats)
+
+        if stats.count > max_queries:
+            raise AssertionError(
+                "%d queries executed, but the query budget is %d:\n%s"
+                % (stats.count, max_queries,
+                   "\n".join(r['sql'] for r in stats.records)))
+
     def _raise_execution_error(self, sql, sql_args, error):
         """Rollbacks the current transaction and raises a useful error
         The error message contains the name of the transaction, the failed
@@ -689,39 +1223,130 @@ class Transaction(object):
                                     " Found %s" % type(args))
             self._queries.append((sql, args))
 
+    def _execute_single(self, cur, sql, sql_args):
+        """Executes a single query and stores its results
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The cursor used to execute the query
+        sql : str
+            The sql query
+        sql_args : list, tuple or dict of objects
+            The arguments to the sql query
+        """
+        start = default_timer()
+        # Execute the current SQL command
+        try:
+            cur.execute(sql, sql_args)
+        except Exception as e:
+            # We catch any exception as we want to make sure that we
+            # rollback every time that something went wrong
+            self._raise_execution_error(sql, sql_args, e)
+
+        try:
+            res = cur.fetchall()
+        except ProgrammingError as e:
+            # At this execution point, we don't know if the sql query
+            # that we executed should retrieve values from the database
+            # If the query was not supposed to retrieve any value
+            # (e.g. an INSERT without a RETURNING clause), it will
+            # raise a ProgrammingError. Otherwise it will just return
+            # an empty list
+            res = None
+        except PostgresError as e:
+            # Some other error happened during the execution of the
+            # query, so we need to rollback
+            self._raise_execution_error(sql, sql_args, e)
+
+        self._record_query(sql, sql_args, 1, default_timer() - start,
+                           len(res) if res is not None else 0)
+
+        # Store the results of the current query
+        self._results.append(res)
+
+    def _execute_batch(self, cur, queries):
+        """Executes multiple queries that don't return rows in a single
+        round trip
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The cursor used to execute the queries
+        queries : list of (str, list, tuple or dict of objects)
+            The queries to execute and their arguments
+        """
+        if len(queries) == 1:
+            self._execute_single(cur, *queries[0])
+            return
+
+        statements = []
+        for sql, sql_args in queries:
+            try:
+                statements.append(cur.mogrify(sql, sql_args))
+            except Exception as e:
+                self._raise_execution_error(sql, sql_args, e)
+
+        # The new line before the semicolon makes sure that a trailing
+        # comment in a statement does not comment out the separator
+        sql = "".join("%s\n;\n" % st for st in statements)
+        # The batch runs inside a savepoint, so it can be undone on error and
+        # its queries executed one at a time to report the one that failed
+        savepoint = not self.autocommit
+        if savepoint:
+            cur.execute("SAVEPOINT qiita_batch")
+        start = default_timer()
+        try:
+            cur.execute(sql)
+        except Exception:
+            if savepoint:
+                try:
+                    cur.execute("ROLLBACK TO SAVEPOINT qiita_batch")
+                except Exception as e:
+                    self._raise_execution_error(sql, None, e)
+            # In autocommit mode, the batch was run as a single implicit
+            # transaction, which has already been rolled back
+            for sql, sql_args in queries:
+                self._execute_single(cur, sql, sql_args)
+            return
+        self._record_query(sql, None, len(queries), default_timer() - start,
+                           0)
+        if savepoint:
+            cur.execute("RELEASE SAVEPOINT qiita_batch")
+
+        # None of these queries return values, but we keep one result per
+        # query so TRN.index and execute_fetchindex keep working
+        self._results.extend([None] * len(queries))
+
     def _execute(self):
         """Internal function that actually executes the transaction
         The `execute` function exposed in the API wraps this one to make sure
         that we catch any exception that happens in here and we rollback the
         transaction
+
+        Notes
+        -----
+        Consecutive queries that don't return rows are grouped in batches of
+        at most `batch_size` queries and each batch is sent to the server in
+        a single round trip.
         """
         with self._get_cursor() as cur:
+            batch = []
             for sql, sql_args in self._queries:
-                # Execute the current SQL command
-                try:
-                    cur.execute(sql, sql_args)
-                except Exception as e:
-                    # We catch any exception as we want to make sure that we
-                    # rollback every time that something went wrong
-                    self._raise_execution_error(sql, sql_args, e)
+                if self.batch_size > 1 and _is_non_returning(sql):
+                    batch.append((sql, sql_args))
+                    if len(batch) >= self.batch_size:
+                        self._execute_batch(cur, batch)
+                        batch = []
+                    continue
 
-                try:
-                    res = cur.fetchall()
-                except ProgrammingError as e:
-                    # At this execution point, we don't know if the sql query
-                    # that we executed should retrieve values from the database
-                    # If the query was not supposed to retrieve any value
-                    # (e.g. an INSERT without a RETURNING clause), it will
-                    # raise a ProgrammingError. Otherwise it will just return
-                    # an empty list
-                    res = None
-                except PostgresError as e:
-                    # Some other error happened during the execution of the
-                    # query, so we need to rollback
-                    self._raise_execution_error(sql, sql_args, e)
+                if batch:
+                    self._execute_batch(cur, batch)
+                    batch = []
+                self._execute_single(cur, sql, sql_args)
 
-                # Store the results of the current query
-                self._results.append(res)
+            if batch:
+                self._execute_batch(cur, batch)
 
         # wipe out the already executed queries
         self._queries = []
@@ -834,17 +1459,217 @@ class Transaction(object):
         """
         return list(chain.from_iterable(self.execute()[idx]))
 
+    @_checker
+    def execute_fetch_iter(self, itersize=2000, chunks=False):
+        """Executes the transaction and lazily yields the results of the last
+        query
+
+        The last query is executed using a named (server-side) cursor, so its
+        results are transferred from the server in chunks of `itersize` rows
+        as they are consumed, instead of being loaded in memory at once.
+
+        Parameters
+        ----------
+        itersize : int, optional
+            The number of rows transferred from the server at a time.
+            Defaults to 2000.
+        chunks : bool, optional
+            If True, yield lists of at most `itersize` rows instead of single
+            rows. Defaults to False.
+
+        Returns
+        -------
+        generator of DictRow, or of list of DictRow if `chunks` is True
+            The results of the last query in the transaction
+
+        Raises
+        ------
+        RuntimeError
+            If invoked outside a context
+        ValueError
+            If there are no queries in the transaction
+
+        Notes
+        -----
+        All the queries in the transaction, except the last one, are executed
+        when calling this function. The last query, which must be a single
+        SELECT statement, is executed once the returned generator is first
+        consumed and the rows are only available while inside the context.
+        Other queries can be added and executed while consuming the
+        generator.
+
+        See Also
+        --------
+        execute
+        execute_fetchindex
+        """
+        if not self._queries:
+            raise ValueError("There are no queries in the transaction")
+
+        sql, sql_args = self._queries.pop()
+        try:
+            self._execute()
+        except Exception:
+            self.rollback()
+            raise
+        # Keep a result for the query so TRN.index keeps working. The actual
+        # results are only available through the generator
+        self._results.append(None)
+
+        return self._fetch_iter(sql, sql_args, itersize, chunks)
+
+    def _fetch_iter(self, sql, sql_args, itersize, chunks):
+        """Generator that executes `sql` using a named cursor and yields the
+        results
+
+        Parameters
+        ----------
+        sql : str
+            The sql query
+        sql_args : list, tuple or dict of objects
+            The arguments to the sql query
+        itersize : int
+            The number of rows transferred from the server at a time
+        chunks : bool
+            If True, yield lists of rows instead of single rows
+        """
+        name = "qiita_%s" % uuid4().hex
+        self._set_transaction_read_only()
+        cur = self._connection.cursor(name, cursor_factory=DictCursor)
+        cur.itersize = itersize
+        rows = 0
+        start = default_timer()
+        try:
+            try:
+                cur.execute(sql, sql_args)
+            except Exception as e:
+                self._raise_execution_error(sql, sql_args, e)
+
+            while True:
+                try:
+                    results = cur.fetchmany(itersize)
+                except Exception as e:
+                    self._raise_execution_error(sql, sql_args, e)
+                if not results:
+                    break
+                rows += len(results)
+                if chunks:
+                    yield results
+                else:
+                    for row in results:
+                        yield row
+        finally:
+            self._record_query(sql, sql_args, 1, default_timer() - start,
+                               rows)
+            # If the transaction has been rolled back, the server has already
+            # dropped the cursor
+            if (not cur.closed and self._connection.get_transaction_status()
+                    != TRANSACTION_STATUS_IDLE):
+                cur.close()
+
+    @_checker
+    def copy_from(self, table, columns, rows):
+        """Bulk loads `rows` in `table` using COPY FROM STDIN
+
+        Parameters
+        ----------
+        table : str
+            The table in which the rows are loaded, including the schema
+        columns : list of str
+            The columns of `table` in which the values are loaded
+        rows : iterable of iterables
+            The rows to load. Each row holds one value per column in
+            `columns`, in the same order. None and NaN are loaded as NULL
+
+        Raises
+        ------
+        RuntimeError
+            If invoked outside a context
+        ValueError
+            If there is an error loading the rows
+
+        Notes
+        -----
+        The queries already added to the transaction are executed before
+        the COPY, so the rows are loaded in the same order as the rest of the
+        transaction. As with any other query, the loaded rows are not
+        committed until the transaction is committed.
+        The rows are streamed to the server, so they don't need to fit in
+        memory.
+        """
+        try:
+            self._execute()
+            sql = "COPY {0} ({1}) FROM STDIN".format(table, ', '.join(columns))
+            with self._get_cursor() as cur:
+                start = default_timer()
+                try:
+                    cur.copy_expert(sql, _CopyStream(rows))
+                except Exception as e:
+                    self._raise_execution_error(sql, None, e)
+                self._record_query(sql, None, 1, default_timer() - start, 0)
+        except Exception:
+            self.rollback()
+            raise
+
+    @_checker
+    def copy_to(self, sql, sql_args, fileobj):
+        r"""Writes the result of `sql` to `fileobj` using COPY TO STDOUT
+
+        Parameters
+        ----------
+        sql : str
+            The SELECT query whose result is written
+        sql_args : list, tuple or dict
+            The arguments of the query, or None if it has no arguments
+        fileobj : file-like object
+            The binary file in which the result is written, as CSV with a
+            header line. NULL values are written as ``\N``, so they can be
+            told apart from empty strings
+
+        Raises
+        ------
+        RuntimeError
+            If invoked outside a context
+        ValueError
+            If there is an error executing the query
+
+        Notes
+        -----
+        The queries already added to the transaction are executed before
+        the COPY, so the result reflects the changes made by the transaction.
+        The arguments are bound client side, given that the server does not
+        accept parameters in a COPY statement.
+        """
+        try:
+            self._execute()
+            with self._get_cursor() as cur:
+                copy_sql = "COPY ({0}) TO STDOUT WITH CSV HEADER NULL '\\N'"
+                copy_sql = copy_sql.format(cur.mogrify(sql, sql_args))
+                start = default_timer()
+                try:
+                    cur.copy_expert(copy_sql, fileobj)
+                except Exception as e:
+                    self._raise_execution_error(sql, sql_args, e)
+                self._record_query(sql, sql_args, 1, default_timer() - start,
+                                   max(cur.rowcount, 0))
+        except Exception:
+            self.rollback()
+            raise
+
     def _funcs_executor(self, funcs, func_str):
+        # The functions in these two lines are mutually exclusive. When one of
+        # them is executed, we can restore both of them. They are restored
+        # before executing the functions, so the functions added while
+        # executing them (e.g. by a function committing its own changes) are
+        # kept for the next commit or rollback
+        self._post_commit_funcs = []
+        self._post_rollback_funcs = []
         error_msg = []
         for f, args, kwargs in funcs:
             try:
                 f(*args, **kwargs)
             except Exception as e:
                 error_msg.append(str(e))
-        # The functions in these two lines are mutually exclusive. When one of
-        # them is executed, we can restore both of them.
-        self._post_commit_funcs = []
-        self._post_rollback_funcs = []
         if error_msg:
             raise RuntimeError(
                 "An error occurred during the post %s commands:\n%s"
@@ -859,11 +1684,16 @@ class Transaction(object):
         RuntimeError
             If invoked outside a context
         """
-        # Reset the queries, the results and the index
+        # Reset the queries, the results, the index and the cache
         self._queries = []
         self._results = []
+        self._cache = {}
         try:
-            self._connection.commit()
+            if self._read_only:
+                # There is nothing to commit, just close the transaction
+                self._connection.rollback()
+            else:
+                self._connection.commit()
         except Exception:
             self._connection.close()
             raise
@@ -879,9 +1709,10 @@ class Transaction(object):
         RuntimeError
             If invoked outside a context
         """
-        # Reset the queries, the results and the index
+        # Reset the queries, the results, the index and the cache
         self._queries = []
         self._results = []
+        self._cache = {}
         try:
             self._connection.rollback()
         except Exception:
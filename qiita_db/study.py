@@ -142,6 +142,7 @@ class Study(qdb.base.QiitaObject):
     """
     _table = "study"
     _portal_table = "study_portal"
+    _row_sql = "SELECT * FROM qiita.study WHERE study_id = ANY(%s)"
     # The following columns are considered not part of the study info
     _non_info = frozenset(["email", "study_title", "ebi_submission_status",
                            "ebi_study_accession"])
@@ -218,7 +219,7 @@ class Study(qdb.base.QiitaObject):
                 studies = studies.union(
                     qdb.sql_connection.TRN.execute_fetchflatten())
 
-            return set(cls(sid) for sid in studies)
+            return set(cls.from_ids(studies))
 
     @classmethod
     def get_info(cls, study_ids=None, info_cols=None):
@@ -431,7 +432,8 @@ class Study(qdb.base.QiitaObject):
             # checking that the id_ exists
             cls(id_)
 
-            if qdb.util.exists_table('sample_%d' % id_):
+            if qdb.metadata_template.sample_template.SampleTemplate.exists(
+                    id_):
                 raise qdb.exceptions.QiitaDBError(
                     'Study "%s" cannot be erased because it has a '
                     'sample template' % cls(id_).title)
@@ -462,6 +464,7 @@ class Study(qdb.base.QiitaObject):
             qdb.sql_connection.TRN.add(sql, args)
 
             qdb.sql_connection.TRN.execute()
+            cls._invalidate_identity_map(id_)
 
 
 # --- Attributes ---
@@ -475,6 +478,9 @@ class Study(qdb.base.QiitaObject):
             Title of study
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['study_title']
             sql = """SELECT study_title FROM qiita.{0}
                      WHERE study_id = %s""".format(self._table)
             qdb.sql_connection.TRN.add(sql, [self._id])
@@ -493,6 +499,7 @@ class Study(qdb.base.QiitaObject):
             sql = """UPDATE qiita.{0} SET study_title = %s
                      WHERE study_id = %s""".format(self._table)
             qdb.sql_connection.TRN.add(sql, [title, self._id])
+            self._invalidate_prefetched_row()
             return qdb.sql_connection.TRN.execute()
 
     @property
@@ -505,10 +512,14 @@ class Study(qdb.base.QiitaObject):
             info of study keyed to column names
         """
         with qdb.sql_connection.TRN:
-            sql = "SELECT * FROM qiita.{0} WHERE study_id = %s".format(
-                self._table)
-            qdb.sql_connection.TRN.add(sql, [self._id])
-            info = dict(qdb.sql_connection.TRN.execute_fetchindex()[0])
+            info = self._prefetched_row()
+            if info is not None:
+                info = dict(info)
+            else:
+                sql = "SELECT * FROM qiita.{0} WHERE study_id = %s".format(
+                    self._table)
+                qdb.sql_connection.TRN.add(sql, [self._id])
+                info = dict(qdb.sql_connection.TRN.execute_fetchindex()[0])
             # remove non-info items from info
             for item in self._non_info:
                 info.pop(item)
@@ -580,6 +591,7 @@ class Study(qdb.base.QiitaObject):
                 self._table, ','.join(sql_vals))
             qdb.sql_connection.TRN.add(sql, data)
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     @property
     def efo(self):
@@ -778,6 +790,9 @@ class Study(qdb.base.QiitaObject):
             The user that owns this study
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return qdb.user.User(row['email'])
             sql = """SELECT email FROM qiita.{} WHERE study_id = %s""".format(
                 self._table)
             qdb.sql_connection.TRN.add(sql, [self._id])
@@ -876,6 +891,9 @@ class Study(qdb.base.QiitaObject):
             The study EBI accession
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['ebi_study_accession']
             sql = """SELECT ebi_study_accession
                      FROM qiita.{0}
                      WHERE study_id = %s""".format(self._table)
@@ -906,6 +924,7 @@ class Study(qdb.base.QiitaObject):
                      WHERE study_id = %s""".format(self._table)
             qdb.sql_connection.TRN.add(sql, [value, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     @property
     def ebi_submission_status(self):
@@ -917,6 +936,9 @@ class Study(qdb.base.QiitaObject):
             The study EBI submission status
         """
         with qdb.sql_connection.TRN:
+            row = self._prefetched_row()
+            if row is not None:
+                return row['ebi_submission_status']
             sql = """SELECT ebi_submission_status
                      FROM qiita.{0}
                      WHERE study_id = %s""".format(self._table)
@@ -946,6 +968,7 @@ class Study(qdb.base.QiitaObject):
                      WHERE study_id = %s""".format(self._table)
             qdb.sql_connection.TRN.add(sql, [value, self.id])
             qdb.sql_connection.TRN.execute()
+            self._invalidate_prefetched_row()
 
     ebi_submission_status.__doc__.format(', '.join(_VALID_EBI_STATUS))
 
@@ -1242,6 +1265,7 @@ class StudyPerson(qdb.base.QiitaObject):
             sql = "DELETE FROM qiita.study_person WHERE study_person_id = %s"
             qdb.sql_connection.TRN.add(sql, [id_])
             qdb.sql_connection.TRN.execute()
+            cls._invalidate_identity_map(id_)
 
     # Properties
     @property
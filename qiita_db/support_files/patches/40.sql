@@ -0,0 +1,44 @@
+-- Oct 16, 2026
+-- Adding the table used by the "jsonb" metadata storage (see the
+-- METADATA_STORAGE option of the configuration file), which holds the sample
+-- and prep metadata of all the templates, one JSONB object per sample. The
+-- JSONB operators used require PostgreSQL 9.5, so the table is only created if
+-- the server supports it; older servers can keep using the default "tables"
+-- storage. The existence and the columns of each template are recorded in
+-- qiita.metadata_template_header, so they don't depend on the samples
+
+DO $do$
+BEGIN
+    IF current_setting('server_version_num')::int >= 90500 THEN
+        EXECUTE 'CREATE TABLE qiita.metadata_template_header (
+                    template_type varchar NOT NULL,
+                    template_id bigint NOT NULL,
+                    column_names varchar[] DEFAULT ''{}'' NOT NULL,
+                    CONSTRAINT pk_metadata_template_header
+                        PRIMARY KEY (template_type, template_id),
+                    CONSTRAINT ck_metadata_template_header_type
+                        CHECK (template_type IN (''sample'', ''prep''))
+                 )';
+        EXECUTE 'CREATE TABLE qiita.metadata_sample_values (
+                    template_type varchar NOT NULL,
+                    template_id bigint NOT NULL,
+                    sample_id varchar NOT NULL,
+                    sample_values jsonb DEFAULT ''{}'' NOT NULL,
+                    CONSTRAINT pk_metadata_sample_values
+                        PRIMARY KEY (template_type, template_id, sample_id),
+                    CONSTRAINT fk_metadata_sample_values
+                        FOREIGN KEY (sample_id)
+                        REFERENCES qiita.study_sample (sample_id)
+                        ON UPDATE CASCADE,
+                    CONSTRAINT fk_metadata_sample_values_header
+                        FOREIGN KEY (template_type, template_id)
+                        REFERENCES qiita.metadata_template_header (
+                            template_type, template_id),
+                    CONSTRAINT ck_metadata_sample_values_type
+                        CHECK (template_type IN (''sample'', ''prep''))
+                 )';
+        EXECUTE 'CREATE INDEX idx_metadata_sample_values
+                    ON qiita.metadata_sample_values USING GIN (sample_values)';
+    END IF;
+END
+$do$;
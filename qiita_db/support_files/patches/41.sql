@@ -0,0 +1,24 @@
+-- Oct 16, 2026
+-- Adding the table holding the statistics of the columns of the sample and
+-- prep templates, i.e. the number of samples holding each distinct value of
+-- each column. A NULL value holds the number of samples without value. The
+-- statistics of the existing templates are computed by the python patch
+
+CREATE TABLE qiita.metadata_column_stats (
+    template_type varchar NOT NULL,
+    template_id bigint NOT NULL,
+    column_name varchar NOT NULL,
+    value varchar,
+    count bigint NOT NULL,
+    CONSTRAINT ck_metadata_column_stats_type
+        CHECK (template_type IN ('sample', 'prep'))
+);
+
+CREATE UNIQUE INDEX idx_metadata_column_stats_value
+    ON qiita.metadata_column_stats (
+        template_type, template_id, column_name, value)
+    WHERE value IS NOT NULL;
+
+CREATE UNIQUE INDEX idx_metadata_column_stats_null
+    ON qiita.metadata_column_stats (template_type, template_id, column_name)
+    WHERE value IS NULL;
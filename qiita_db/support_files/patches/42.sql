@@ -0,0 +1,23 @@
+-- Oct 16, 2026
+-- Adding the catalog of the metadata columns of the sample and prep templates,
+-- so the lookups of the templates having a column don't need to scan
+-- information_schema. column_type holds the type inferred from the values of
+-- the column (integer, float, datetime or varchar), or NULL if the column has
+-- no values. The catalog of the existing templates is filled by the python
+-- patch
+
+CREATE TABLE qiita.metadata_column (
+    template_type varchar NOT NULL,
+    template_id bigint NOT NULL,
+    column_name varchar NOT NULL,
+    column_type varchar,
+    CONSTRAINT pk_metadata_column
+        PRIMARY KEY (template_type, template_id, column_name),
+    CONSTRAINT ck_metadata_column_template_type
+        CHECK (template_type IN ('sample', 'prep')),
+    CONSTRAINT ck_metadata_column_column_type
+        CHECK (column_type IN ('integer', 'float', 'datetime', 'varchar'))
+);
+
+CREATE INDEX idx_metadata_column_name
+    ON qiita.metadata_column (template_type, column_name);
@@ -0,0 +1,8 @@
+# Oct 16, 2026
+# Computes the statistics of the columns of the existing sample and prep
+# templates, so they are never computed when the template summaries are
+# requested
+
+import qiita_db as qdb
+
+qdb.metadata_template.column_stats.rebuild(verbose=True)
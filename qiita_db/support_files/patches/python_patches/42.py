@@ -0,0 +1,7 @@
+# Oct 16, 2026
+# Fills the catalog of the metadata columns with the columns of the existing
+# sample and prep templates
+
+import qiita_db as qdb
+
+qdb.metadata_template.column_catalog.rebuild(verbose=True)
@@ -336,6 +336,30 @@ class ArtifactTestsReadOnly(TestCase):
     def test_study(self):
         self.assertEqual(qdb.artifact.Artifact(1).study, qdb.study.Study(1))
 
+    def test_prefetch(self):
+        with qdb.sql_connection.TRN:
+            a = qdb.artifact.Artifact(1)
+            qdb.study.Study(1)
+            a.prefetch()
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertEqual(a.name, "Raw data 1")
+                self.assertEqual(a.timestamp, datetime(2012, 10, 1, 9, 30, 27))
+                self.assertIsNone(a.processing_parameters)
+                self.assertEqual(a.visibility, "private")
+                self.assertEqual(a.artifact_type, "FASTQ")
+                self.assertEqual(a.data_type, "18S")
+                self.assertFalse(a.can_be_submitted_to_ebi)
+                self.assertFalse(a.can_be_submitted_to_vamps)
+                self.assertEqual(a.study, qdb.study.Study(1))
+
+    def test_from_ids_prefetch(self):
+        with qdb.sql_connection.TRN:
+            artifacts = qdb.artifact.Artifact.from_ids([1, 2, 4],
+                                                       prefetch=True)
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertEqual([a.name for a in artifacts],
+                                 ["Raw data 1", "Demultiplexed 1", "BIOM"])
+
     def test_jobs(self):
         obs = qdb.artifact.Artifact(1).jobs()
         exp = [
@@ -861,6 +885,13 @@ class ArtifactTests(TestCase):
             qdb.artifact.Artifact(1).name = (
                 "Some very large name to force the error to be raised")
 
+    def test_name_setter_prefetch(self):
+        with qdb.sql_connection.TRN:
+            a = qdb.artifact.Artifact(1)
+            a.prefetch()
+            a.name = "new name"
+            self.assertEqual(a.name, "new name")
+
     def test_visibility_setter(self):
         a = qdb.artifact.Artifact.create(
             self.filepaths_root, "FASTQ", prep_template=self.prep_template)
@@ -83,6 +83,99 @@ class QiitaBaseTest(TestCase):
         new = qdb.study.Study(1)
         self.assertNotEqual(self.tester, new)
 
+    def test_from_ids(self):
+        """Instantiates many objects at once"""
+        qdb.base.clear_identity_map()
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.query_budget(2):
+                obs = qdb.artifact.Artifact.from_ids([3, 1, 2, 1])
+            exp = [qdb.artifact.Artifact(3), qdb.artifact.Artifact(1),
+                   qdb.artifact.Artifact(2), qdb.artifact.Artifact(1)]
+            self.assertEqual(obs, exp)
+            # Already validated objects are not checked again
+            with qdb.sql_connection.TRN.query_budget(0):
+                qdb.artifact.Artifact.from_ids([1, 2])
+
+        self.assertEqual(qdb.artifact.Artifact.from_ids([]), [])
+
+    def test_from_ids_mixed_types(self):
+        """The ids are normalized as in the object constructor"""
+        qdb.base.clear_identity_map()
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.query_budget(2):
+                obs = qdb.artifact.Artifact.from_ids(['1', long(1), 2])
+            self.assertEqual([a.id for a in obs], [1, 1, 2])
+            self.assertTrue(qdb.artifact.Artifact._is_validated(1))
+        with self.assertRaises(TypeError):
+            qdb.artifact.Artifact.from_ids([1.5])
+
+    def test_from_ids_error(self):
+        """Raises the same errors as the object constructor"""
+        with self.assertRaises(IncompetentQiitaDeveloperError):
+            qdb.base.QiitaObject.from_ids([1])
+        with self.assertRaises(qdb.exceptions.QiitaDBUnknownIDError):
+            qdb.artifact.Artifact.from_ids([1, 10])
+
+        qiita_config.portal = 'EMP'
+        with self.assertRaises(qdb.exceptions.QiitaDBError):
+            qdb.analysis.Analysis.from_ids([1])
+
+    def test_from_ids_overwritten_check_id(self):
+        """Works with the classes that overwrite _check_id"""
+        self.assertEqual(
+            qdb.user.User.from_ids(['test@foo.bar', 'shared@foo.bar']),
+            [qdb.user.User('test@foo.bar'), qdb.user.User('shared@foo.bar')])
+        self.assertEqual(
+            qdb.metadata_template.sample_template.SampleTemplate.from_ids([1]),
+            [qdb.metadata_template.sample_template.SampleTemplate(1)])
+        self.assertEqual(qdb.software.Command.from_ids([1]),
+                         [qdb.software.Command(1)])
+        with self.assertRaises(qdb.exceptions.QiitaDBUnknownIDError):
+            qdb.user.User.from_ids(['test@foo.bar', 'unknown@foo.bar'])
+
+    def test_prefetch_error(self):
+        """Raises an error if the class does not support prefetching"""
+        with self.assertRaises(IncompetentQiitaDeveloperError):
+            qdb.study.StudyPerson(1).prefetch()
+
+    def test_init_identity_map(self):
+        """Objects already validated are not checked again"""
+        qdb.base.clear_identity_map()
+        with qdb.sql_connection.TRN:
+            qdb.study.Study(1)
+            with qdb.sql_connection.TRN.query_budget(0):
+                qdb.study.Study(1)
+        # The validation is shared with other transactions once committed
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.query_budget(0):
+                qdb.study.Study(1)
+
+    def test_init_identity_map_portal(self):
+        """Objects are validated again when the portal changes"""
+        qiita_config.portal = 'QIITA'
+        qdb.analysis.Analysis(1)
+        qiita_config.portal = 'EMP'
+        with self.assertRaises(qdb.exceptions.QiitaDBError):
+            qdb.analysis.Analysis(1)
+
+    def test_init_identity_map_rollback(self):
+        """Objects validated in a rolled back transaction are not kept"""
+        qdb.base.clear_identity_map()
+        with qdb.sql_connection.TRN:
+            qdb.study.StudyPerson(1)
+            qdb.sql_connection.TRN.rollback()
+        self.assertFalse(qdb.study.StudyPerson._is_validated(1))
+
+    def test_init_identity_map_delete(self):
+        """Deleted objects are removed from the identity map"""
+        person = qdb.study.StudyPerson.create(
+            'SomeDude', 'somedude@foo.bar', 'affil')
+        self.assertTrue(qdb.study.StudyPerson._is_validated(person.id))
+        qdb.study.StudyPerson.delete(person.id)
+        self.assertFalse(qdb.study.StudyPerson._is_validated(person.id))
+        with self.assertRaises(qdb.exceptions.QiitaDBUnknownIDError):
+            qdb.study.StudyPerson(person.id)
+
 
 @qiita_test_checker()
 class QiitaStatusObjectTest(TestCase):
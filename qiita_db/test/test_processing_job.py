@@ -376,6 +376,15 @@ class ProcessingJobTest(TestCase):
                 qdb.exceptions.QiitaDBOperationNotPermittedError):
             self.tester3.update_heartbeat_state()
 
+    def test_prefetch(self):
+        with qdb.sql_connection.TRN:
+            self.tester2.prefetch()
+            with qdb.sql_connection.TRN.query_budget(0):
+                self.assertEqual(self.tester2.status, 'running')
+                self.assertEqual(self.tester2.step, 'demultiplexing')
+            self.tester2.step = 'generating demux file'
+            self.assertEqual(self.tester2.step, 'generating demux file')
+
     def test_step_setter(self):
         job = _create_job()
         job._set_status('running')
@@ -680,7 +689,13 @@ class ProcessingWorkflowTests(TestCase):
         tester.add(dflt_params, connections=connections)
 
         self.assertEqual(len(tester.graph.nodes()), 2)
-        tester.remove(tester.graph.edges()[0][1])
+        removed = tester.graph.edges()[0][1]
+        tester.remove(removed)
+        # The removed job is not considered valid anymore
+        self.assertFalse(
+            qdb.processing_job.ProcessingJob._is_validated(removed.id))
+        with self.assertRaises(qdb.exceptions.QiitaDBUnknownIDError):
+            qdb.processing_job.ProcessingJob(removed.id)
 
         g = tester.graph
         obs_nodes = g.nodes()
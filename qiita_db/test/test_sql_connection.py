@@ -1,7 +1,10 @@
 from unittest import TestCase, main
+from io import BytesIO
 from os import remove, close
 from os.path import exists
 from tempfile import mkstemp
+from threading import Thread
+import warnings
 
 from psycopg2._psycopg import connection
 from psycopg2.extras import DictCursor
@@ -356,6 +359,213 @@ class TestTransaction(TestBase):
             # make sure rollback correctly
             self._assert_sql_equal([])
 
+    def test_is_non_returning(self):
+        self.assertTrue(qdb.sql_connection._is_non_returning(
+            "INSERT INTO qiita.test_table (int_column) VALUES (%s)"))
+        self.assertTrue(qdb.sql_connection._is_non_returning(
+            """\n  update qiita.test_table SET bool_column = %s"""))
+        self.assertTrue(qdb.sql_connection._is_non_returning(
+            "ALTER TABLE qiita.test_table ADD COLUMN foo varchar"))
+        self.assertFalse(qdb.sql_connection._is_non_returning("SELECT 42"))
+        self.assertFalse(qdb.sql_connection._is_non_returning(
+            "INSERT INTO qiita.test_table (int_column) VALUES (%s) "
+            "RETURNING int_column"))
+        self.assertFalse(qdb.sql_connection._is_non_returning(
+            "WITH x AS (SELECT 1) INSERT INTO qiita.test_table "
+            "(int_column) SELECT * FROM x"))
+
+    def test_execute_batch(self):
+        with qdb.sql_connection.TRN:
+            sql = """INSERT INTO qiita.test_table (str_column, int_column)
+                     VALUES (%s, %s) -- a trailing comment"""
+            args = [['insert1', 1], ['insert%2', 2], ["insert'3", 3]]
+            qdb.sql_connection.TRN.add(sql, args, many=True)
+            qdb.sql_connection.TRN.add(
+                "SELECT int_column FROM qiita.test_table ORDER BY int_column")
+            sql = """UPDATE qiita.test_table SET bool_column = %s
+                     WHERE str_column = %s"""
+            qdb.sql_connection.TRN.add(sql, [False, 'insert%2'])
+            qdb.sql_connection.TRN.add(sql, [False, "insert'3"])
+            obs = qdb.sql_connection.TRN.execute()
+            self.assertEqual(obs, [None, None, None, [[1], [2], [3]],
+                                   None, None])
+            self.assertEqual(qdb.sql_connection.TRN.index, 6)
+            self.assertEqual(qdb.sql_connection.TRN.execute_fetchindex(3),
+                             [[1], [2], [3]])
+
+        self._assert_sql_equal([('insert1', True, 1),
+                                ('insert%2', False, 2),
+                                ("insert'3", False, 3)])
+
+    def test_execute_batch_size(self):
+        trn = qdb.sql_connection.Transaction()
+        trn.batch_size = 2
+        with trn:
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            trn.add(sql, [[1], [2], [3], [4], [5]], many=True)
+            self.assertEqual(trn.execute(), [None] * 5)
+        self._assert_sql_equal([('foo', True, i) for i in range(1, 6)])
+
+    def test_execute_batch_disabled(self):
+        trn = qdb.sql_connection.Transaction()
+        trn.batch_size = 1
+        with trn:
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            trn.add(sql, [[1], [2]], many=True)
+            self.assertEqual(trn.execute(), [None, None])
+        self._assert_sql_equal([('foo', True, 1), ('foo', True, 2)])
+
+    def test_execute_batch_error(self):
+        with qdb.sql_connection.TRN:
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            qdb.sql_connection.TRN.add(sql, [[1], [2]], many=True)
+            qdb.sql_connection.TRN.add(
+                "INSERT INTO qiita.table_to_make (the_trans_to_fail) "
+                "VALUES (1)")
+            with self.assertRaises(ValueError) as cm:
+                qdb.sql_connection.TRN.execute()
+            self.assertEqual(qdb.sql_connection.TRN.index, 0)
+
+        # The error reports the failing query, not the whole batch
+        msg = str(cm.exception)
+        self.assertIn("Query: INSERT INTO qiita.table_to_make", msg)
+        self.assertNotIn("qiita.test_table", msg)
+        self._assert_sql_equal([])
+
+    def test_execute_fetch_iter(self):
+        self._populate_test_table()
+        with qdb.sql_connection.TRN:
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            qdb.sql_connection.TRN.add(sql, [5])
+            qdb.sql_connection.TRN.add(
+                "SELECT int_column FROM qiita.test_table "
+                "WHERE int_column > %s ORDER BY int_column", [1])
+            obs = qdb.sql_connection.TRN.execute_fetch_iter(itersize=2)
+            # The previous queries have been executed
+            self.assertEqual(qdb.sql_connection.TRN._queries, [])
+            self.assertEqual(qdb.sql_connection.TRN.index, 2)
+            self.assertEqual(list(obs), [[2], [3], [4], [5]])
+            self.assertEqual(qdb.sql_connection.TRN.stats.rows, 4)
+
+    def test_execute_fetch_iter_chunks(self):
+        self._populate_test_table()
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add(
+                "SELECT int_column FROM qiita.test_table ORDER BY int_column")
+            obs = list(qdb.sql_connection.TRN.execute_fetch_iter(
+                itersize=3, chunks=True))
+            self.assertEqual(obs, [[[1], [2], [3]], [[4]]])
+
+    def test_execute_fetch_iter_add_while_iterating(self):
+        self._populate_test_table()
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add(
+                "SELECT int_column FROM qiita.test_table ORDER BY int_column")
+            sql = "DELETE FROM qiita.test_table WHERE int_column = %s"
+            for int_column, in qdb.sql_connection.TRN.execute_fetch_iter(
+                    itersize=1):
+                qdb.sql_connection.TRN.add(sql, [int_column])
+                qdb.sql_connection.TRN.execute()
+
+        self._assert_sql_equal([])
+
+    def test_execute_fetch_iter_error(self):
+        with qdb.sql_connection.TRN:
+            with self.assertRaises(ValueError):
+                qdb.sql_connection.TRN.execute_fetch_iter()
+
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            qdb.sql_connection.TRN.add(sql, [1])
+            qdb.sql_connection.TRN.add("SELECT * FROM qiita.does_not_exist")
+            obs = qdb.sql_connection.TRN.execute_fetch_iter()
+            with self.assertRaises(ValueError):
+                list(obs)
+
+        self._assert_sql_equal([])
+
+    def test_copy_from(self):
+        with qdb.sql_connection.TRN:
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            qdb.sql_connection.TRN.add(sql, [1])
+            rows = (['tab\tnew\nline', True, 2], ['back\\slash', False, 3],
+                    [u'unicod\xe9', False, 4])
+            cols = ['str_column', 'bool_column', 'int_column']
+            qdb.sql_connection.TRN.copy_from(
+                'qiita.test_table', cols, iter(rows))
+            # The queued queries have been executed before the copy
+            self.assertEqual(qdb.sql_connection.TRN._queries, [])
+            self._assert_sql_equal([])
+
+        self._assert_sql_equal([('foo', True, 1),
+                                ('tab\tnew\nline', True, 2),
+                                ('back\\slash', False, 3),
+                                ('unicod\xc3\xa9', False, 4)])
+
+    def test_copy_from_null(self):
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add(
+                "ALTER TABLE qiita.test_table ALTER COLUMN str_column "
+                "DROP NOT NULL")
+            qdb.sql_connection.TRN.copy_from(
+                'qiita.test_table', ['str_column', 'int_column'],
+                [[None, 1], [float('nan'), 2]])
+            qdb.sql_connection.TRN.add(
+                "SELECT int_column FROM qiita.test_table "
+                "WHERE str_column IS NULL")
+            self.assertEqual(
+                qdb.sql_connection.TRN.execute_fetchflatten(), [1, 2])
+
+    def test_copy_from_float(self):
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.copy_from(
+                'qiita.test_table', ['str_column', 'int_column'],
+                [[-122.123456789012345, 1]])
+            qdb.sql_connection.TRN.add(
+                "SELECT str_column FROM qiita.test_table "
+                "WHERE int_column = 1")
+            obs = qdb.sql_connection.TRN.execute_fetchlast()
+            self.assertEqual(obs, '-122.12345678901235')
+            self.assertEqual(float(obs), -122.123456789012345)
+
+    def test_copy_from_error(self):
+        with qdb.sql_connection.TRN:
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            qdb.sql_connection.TRN.add(sql, [1])
+            with self.assertRaises(ValueError):
+                qdb.sql_connection.TRN.copy_from(
+                    'qiita.test_table', ['int_column'], [['not_an_int']])
+            self.assertEqual(qdb.sql_connection.TRN.index, 0)
+
+        self._assert_sql_equal([])
+
+    def test_copy_to(self):
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add(
+                "ALTER TABLE qiita.test_table ALTER COLUMN str_column "
+                "DROP NOT NULL")
+            sql = """INSERT INTO qiita.test_table (str_column, int_column)
+                     VALUES (%s, %s)"""
+            qdb.sql_connection.TRN.add(
+                sql, [['comma, "quote"', 1], ['', 2], [None, 3]], many=True)
+            fileobj = BytesIO()
+            qdb.sql_connection.TRN.copy_to(
+                "SELECT str_column, int_column FROM qiita.test_table "
+                "WHERE int_column > %s ORDER BY int_column", [0], fileobj)
+            # The queued queries have been executed before the copy
+            self.assertEqual(qdb.sql_connection.TRN._queries, [])
+
+        self.assertEqual(fileobj.getvalue(),
+                         'str_column,int_column\n"comma, ""quote""",1\n'
+                         '"",2\n\\N,3\n')
+
+    def test_copy_to_error(self):
+        with qdb.sql_connection.TRN:
+            with self.assertRaises(ValueError):
+                qdb.sql_connection.TRN.copy_to(
+                    "SELECT not_a_column FROM qiita.test_table", None,
+                    BytesIO())
+            self.assertEqual(qdb.sql_connection.TRN.index, 0)
+
     def test_execute_commit_false(self):
         with qdb.sql_connection.TRN:
             sql = """INSERT INTO qiita.test_table (str_column, int_column)
@@ -511,6 +721,47 @@ class TestTransaction(TestBase):
             qdb.sql_connection.TRN._connection.get_transaction_status(),
             TRANSACTION_STATUS_IDLE)
 
+    def test_read_only(self):
+        with qdb.sql_connection.TRN.read_only():
+            self.assertTrue(qdb.sql_connection.TRN.is_read_only)
+            qdb.sql_connection.TRN.add("SHOW transaction_read_only")
+            self.assertEqual(
+                qdb.sql_connection.TRN.execute_fetchlast(), 'on')
+            # The nested contexts join the read only transaction
+            with qdb.sql_connection.TRN:
+                sql = """INSERT INTO qiita.test_table (str_column, int_column)
+                         VALUES (%s, %s)"""
+                qdb.sql_connection.TRN.add(sql, ['insert1', 1])
+                with self.assertRaises(ValueError):
+                    qdb.sql_connection.TRN.execute()
+
+        self.assertFalse(qdb.sql_connection.TRN.is_read_only)
+        self.assertEqual(
+            qdb.sql_connection.TRN._connection.get_transaction_status(),
+            TRANSACTION_STATUS_IDLE)
+
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add("SHOW transaction_read_only")
+            self.assertEqual(
+                qdb.sql_connection.TRN.execute_fetchlast(), 'off')
+
+    def test_read_only_post_commit_funcs(self):
+        obs = []
+        with qdb.sql_connection.TRN.read_only():
+            qdb.sql_connection.TRN.add("SELECT 42")
+            qdb.sql_connection.TRN.execute()
+            qdb.sql_connection.TRN.add_post_commit_func(obs.append, 42)
+        self.assertEqual(obs, [42])
+
+    def test_read_only_joins_transaction(self):
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.read_only():
+                self.assertFalse(qdb.sql_connection.TRN.is_read_only)
+                sql = """INSERT INTO qiita.test_table (str_column, int_column)
+                         VALUES (%s, %s)"""
+                qdb.sql_connection.TRN.add(sql, ['insert1', 1])
+        self._assert_sql_equal([('insert1', True, 1)])
+
     def test_context_manager_multiple(self):
         self.assertEqual(qdb.sql_connection.TRN._contexts_entered, 0)
 
@@ -660,5 +911,243 @@ class TestTransaction(TestBase):
 
         self.assertEqual(qdb.sql_connection.TRN.index, 0)
 
+    def test_cache(self):
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.cache['key'] = 'value'
+            with qdb.sql_connection.TRN:
+                self.assertEqual(qdb.sql_connection.TRN.cache,
+                                 {'key': 'value'})
+            qdb.sql_connection.TRN.commit()
+            self.assertEqual(qdb.sql_connection.TRN.cache, {})
+
+            qdb.sql_connection.TRN.cache['key'] = 'value'
+            qdb.sql_connection.TRN.rollback()
+            self.assertEqual(qdb.sql_connection.TRN.cache, {})
+
+            qdb.sql_connection.TRN.cache['key'] = 'value'
+
+        with qdb.sql_connection.TRN:
+            self.assertEqual(qdb.sql_connection.TRN.cache, {})
+
+    def test_stats(self):
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add("SELECT 42")
+            sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+            qdb.sql_connection.TRN.add(sql, [[1], [2]], many=True)
+            qdb.sql_connection.TRN.execute()
+            obs = qdb.sql_connection.TRN.stats
+            self.assertEqual(obs.count, 3)
+            # The two inserts are executed in a single round trip
+            self.assertEqual(obs.round_trips, 2)
+            self.assertEqual(obs.rows, 1)
+            self.assertGreater(obs.total_time, 0)
+            self.assertEqual(obs.slow_queries, [])
+            # The round trips of the transaction are not kept
+            self.assertEqual(obs.records, [])
+
+        # The stats are still available once the context is exited
+        self.assertEqual(qdb.sql_connection.TRN.stats.count, 3)
+
+        # And they are reset when entering a new context
+        with qdb.sql_connection.TRN:
+            self.assertEqual(qdb.sql_connection.TRN.stats.count, 0)
+
+    def test_query_budget(self):
+        with qdb.sql_connection.TRN.query_budget(2) as obs:
+            with qdb.sql_connection.TRN:
+                qdb.sql_connection.TRN.add("SELECT 42")
+                qdb.sql_connection.TRN.execute()
+            with qdb.sql_connection.TRN:
+                qdb.sql_connection.TRN.add("SELECT 43")
+        self.assertEqual(obs.count, 2)
+        self.assertEqual(obs.round_trips, 2)
+        self.assertEqual(qdb.sql_connection.TRN._budgets, [])
+
+        # The round trips executed inside the block are kept
+        with qdb.sql_connection.TRN.query_budget(3) as obs:
+            with qdb.sql_connection.TRN:
+                qdb.sql_connection.TRN.add("SELECT 42")
+                sql = "INSERT INTO qiita.test_table (int_column) VALUES (%s)"
+                qdb.sql_connection.TRN.add(sql, [[1], [2]], many=True)
+                qdb.sql_connection.TRN.execute()
+        self.assertEqual(obs.records[0]['sql'], "SELECT 42")
+        self.assertEqual(obs.records[0]['queries'], 1)
+        self.assertEqual(obs.records[0]['rows'], 1)
+        self.assertEqual(obs.records[1]['queries'], 2)
+        self.assertEqual(obs.records[1]['rows'], 0)
+
+    def test_query_budget_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with qdb.sql_connection.TRN.query_budget(1):
+                with qdb.sql_connection.TRN:
+                    qdb.sql_connection.TRN.add("SELECT 42")
+                    qdb.sql_connection.TRN.add("SELECT 43")
+        self.assertEqual(qdb.sql_connection.TRN._budgets, [])
+
+    def test_slow_queries(self):
+        threshold = qiita_config.slow_query_threshold
+        log_slow_queries = qiita_config.log_slow_queries
+        qiita_config.slow_query_threshold = 1e-9
+        qiita_config.log_slow_queries = True
+        try:
+            with qdb.sql_connection.TRN:
+                qdb.sql_connection.TRN.add("SELECT 42")
+                qdb.sql_connection.TRN.execute()
+                obs = qdb.sql_connection.TRN.stats.slow_queries
+                self.assertEqual(len(obs), 1)
+                self.assertEqual(obs[0]['sql'], "SELECT 42")
+        finally:
+            qiita_config.slow_query_threshold = threshold
+            qiita_config.log_slow_queries = log_slow_queries
+
+        # The stats of the instrumented transaction are kept
+        self.assertEqual(qdb.sql_connection.TRN.stats.count, 1)
+        obs = qdb.logger.LogEntry.newest_records(1)[0]
+        self.assertTrue(obs.msg.startswith('Slow query'))
+        self.assertEqual(obs.info[0]['sql'], "SELECT 42")
+        self.assertEqual(obs.info[0]['rows'], 1)
+
+    def test_slow_queries_log_error(self):
+        threshold = qiita_config.slow_query_threshold
+        log_slow_queries = qiita_config.log_slow_queries
+        create = qdb.logger.LogEntry.__dict__['create']
+        qiita_config.slow_query_threshold = 1e-9
+        qiita_config.log_slow_queries = True
+
+        def _create(*args, **kwargs):
+            raise ValueError("The log is not available")
+
+        qdb.logger.LogEntry.create = staticmethod(_create)
+        try:
+            # The transaction is committed even if the slow queries can't be
+            # logged
+            with warnings.catch_warnings(record=True) as warns:
+                warnings.simplefilter('always')
+                with qdb.sql_connection.TRN:
+                    sql = """INSERT INTO qiita.test_table (int_column)
+                             VALUES (%s)"""
+                    qdb.sql_connection.TRN.add(sql, [1])
+        finally:
+            qdb.logger.LogEntry.create = create
+            qiita_config.slow_query_threshold = threshold
+            qiita_config.log_slow_queries = log_slow_queries
+
+        self.assertEqual(len(warns), 1)
+        self.assertEqual(warns[0].category, qdb.exceptions.QiitaDBWarning)
+        self.assertFalse(qdb.sql_connection.TRN._logging_slow_queries)
+        self._assert_sql_equal([('foo', True, 1)])
+
+    def _set_up_pool(self, maxconn):
+        """Aux function that sets up the system connection pool"""
+        qdb.sql_connection.close_connection_pool()
+        qdb.sql_connection._pool = qdb.sql_connection.ConnectionPool(
+            0, maxconn)
+        self.addCleanup(qdb.sql_connection.close_connection_pool)
+
+    def test_pooled(self):
+        self._set_up_pool(1)
+        obs = qdb.sql_connection.Transaction(pooled=True)
+        self.assertTrue(obs._pooled)
+        with obs:
+            obs.add("SELECT 42")
+            self.assertEqual(obs.execute_fetchlast(), 42)
+            self.assertTrue(isinstance(obs._connection, connection))
+        # The connection has been returned to the pool
+        self.assertIsNone(obs._connection)
+
+    def test_pooled_disabled_error(self):
+        qdb.sql_connection.close_connection_pool()
+        obs = qdb.sql_connection.Transaction(pooled=True)
+        with self.assertRaises(RuntimeError):
+            with obs:
+                pass
+
+    def test_pooled_threads(self):
+        self._set_up_pool(2)
+        obs = qdb.sql_connection.Transaction(pooled=True)
+        results = {}
+
+        def tester(value):
+            with obs:
+                sql = """INSERT INTO qiita.test_table (str_column, int_column)
+                         VALUES (%s, %s)"""
+                obs.add(sql, ['thread_%d' % value, value])
+                obs.add("SELECT %s", [value])
+                results[value] = (obs.execute_fetchlast(),
+                                  obs._contexts_entered)
+
+        threads = [Thread(target=tester, args=(i,)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, {i: (i, 1) for i in range(5)})
+        with self.con.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM qiita.test_table")
+            self.assertEqual(cur.fetchone()[0], 5)
+
+    def test_thread_local_state(self):
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add("SELECT 42")
+            obs = []
+
+            def tester():
+                obs.append((qdb.sql_connection.TRN._contexts_entered,
+                            qdb.sql_connection.TRN._queries))
+
+            t = Thread(target=tester)
+            t.start()
+            t.join()
+            self.assertEqual(obs, [(0, [])])
+            self.assertEqual(qdb.sql_connection.TRN._contexts_entered, 1)
+
+
+@qiita_test_checker()
+class TestConnectionPool(TestCase):
+    def test_getconn_putconn(self):
+        pool = qdb.sql_connection.ConnectionPool(0, 2)
+        conn1 = pool.getconn()
+        conn2 = pool.getconn()
+        self.assertTrue(isinstance(conn1, connection))
+        self.assertNotEqual(conn1, conn2)
+        pool.putconn(conn1)
+        # The connection returned is reused
+        self.assertEqual(pool.getconn(), conn1)
+        pool.putconn(conn1)
+        pool.putconn(conn2)
+        pool.closeall()
+
+    def test_getconn_blocks(self):
+        pool = qdb.sql_connection.ConnectionPool(0, 1)
+        conn = pool.getconn()
+        obs = []
+
+        def tester():
+            obs.append(pool.getconn())
+
+        t = Thread(target=tester)
+        t.start()
+        t.join(0.5)
+        # The thread is waiting for a connection
+        self.assertEqual(obs, [])
+        pool.putconn(conn)
+        t.join()
+        self.assertEqual(obs, [conn])
+        pool.putconn(conn)
+        pool.closeall()
+
+    def test_putconn_closed(self):
+        pool = qdb.sql_connection.ConnectionPool(0, 1)
+        conn = pool.getconn()
+        conn.close()
+        pool.putconn(conn)
+        obs = pool.getconn()
+        self.assertNotEqual(obs, conn)
+        self.assertEqual(obs.closed, 0)
+        pool.putconn(obs)
+        pool.closeall()
+
+
 if __name__ == "__main__":
     main()
@@ -95,6 +95,51 @@ class DBUtilTests(TestCase):
         with self.assertRaises(qdb.exceptions.QiitaDBLookupError):
             qdb.util.convert_to_id("FAKE", "filepath_type")
 
+    def test_lookup_cache(self):
+        qdb.util.clear_lookup_cache()
+        exp = qdb.util.get_data_types()
+        qdb.util.convert_to_id("directory", "filepath_type")
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.query_budget(0):
+                obs = qdb.util.get_data_types()
+                self.assertEqual(obs, exp)
+                self.assertEqual(
+                    qdb.util.convert_to_id("directory", "filepath_type"), 8)
+        # The cached values can be modified by the callers
+        obs.clear()
+        self.assertEqual(qdb.util.get_data_types(), exp)
+
+        # The cache is discarded if the database is patched
+        with qdb.sql_connection.TRN:
+            qdb.sql_connection.TRN.add("SELECT current_patch FROM settings")
+            current_patch = qdb.sql_connection.TRN.execute_fetchlast()
+            qdb.sql_connection.TRN.add(
+                "UPDATE settings SET current_patch = 'unpatched'")
+            qdb.sql_connection.TRN.execute()
+            qdb.util._lookup_cache_version[1] = 0
+            qdb.util.get_data_types()
+            self.assertEqual(qdb.util._lookup_cache_version[0], 'unpatched')
+            qdb.sql_connection.TRN.add(
+                "UPDATE settings SET current_patch = %s", [current_patch])
+            qdb.sql_connection.TRN.execute()
+        qdb.util.clear_lookup_cache()
+
+    def test_lookup_cache_skip(self):
+        qdb.util.clear_lookup_cache()
+        qdb.util.convert_to_id('QIITA', 'portal_type', 'portal')
+        qdb.util.get_table_cols('sample_1')
+        with qdb.sql_connection.TRN:
+            with qdb.sql_connection.TRN.query_budget(1):
+                qdb.util.convert_to_id('QIITA', 'portal_type', 'portal')
+            with qdb.sql_connection.TRN.query_budget(1):
+                qdb.util.get_table_cols('sample_1')
+
+    def test_get_status_values(self):
+        obs = qdb.util.get_status_values('analysis')
+        exp = ['in_construction', 'queued', 'running', 'completed', 'error',
+               'public']
+        self.assertItemsEqual(obs, exp)
+
     def test_get_artifact_types(self):
         obs = qdb.util.get_artifact_types()
         exp = {'SFF': 1, 'FASTA_Sanger': 2, 'FASTQ': 3, 'FASTA': 4,
@@ -90,6 +90,30 @@ class User(qdb.base.QiitaObject):
             qdb.sql_connection.TRN.add(sql, [id_])
             return qdb.sql_connection.TRN.execute_fetchlast()
 
+    @classmethod
+    def _check_ids(cls, ids):
+        r"""Returns which of the provided IDs actually exist in the database
+
+        Parameters
+        ----------
+        ids : list of str
+            The IDs to test
+
+        Returns
+        -------
+        set of str
+            The IDs in `ids` present in the database
+
+        Notes
+        -----
+        This function overwrites the base function, as sql layout doesn't
+        follow the same conventions done in the other classes.
+        """
+        with qdb.sql_connection.TRN:
+            sql = "SELECT email FROM qiita.qiita_user WHERE email = ANY(%s)"
+            qdb.sql_connection.TRN.add(sql, [ids])
+            return set(qdb.sql_connection.TRN.execute_fetchflatten())
+
     @classmethod
     def iter(cls):
         """Iterates over all users, sorted by their email addresses
@@ -423,9 +447,8 @@ class User(qdb.base.QiitaObject):
                         JOIN qiita.portal_type USING (portal_type_id)
                      WHERE email = %s AND portal = %s"""
             qdb.sql_connection.TRN.add(sql, [self._id, qiita_config.portal])
-            return set(
-                qdb.study.Study(sid)
-                for sid in qdb.sql_connection.TRN.execute_fetchflatten())
+            return set(qdb.study.Study.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten()))
 
     @property
     def shared_studies(self):
@@ -437,9 +460,8 @@ class User(qdb.base.QiitaObject):
                         JOIN qiita.portal_type USING (portal_type_id)
                      WHERE email = %s and portal = %s"""
             qdb.sql_connection.TRN.add(sql, [self._id, qiita_config.portal])
-            return set(
-                qdb.study.Study(sid)
-                for sid in qdb.sql_connection.TRN.execute_fetchflatten())
+            return set(qdb.study.Study.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten()))
 
     @property
     def private_analyses(self):
@@ -450,9 +472,8 @@ class User(qdb.base.QiitaObject):
                         JOIN qiita.portal_type USING (portal_type_id)
                      WHERE email = %s AND dflt = false AND portal = %s"""
             qdb.sql_connection.TRN.add(sql, [self._id, qiita_config.portal])
-            return set(
-                qdb.analysis.Analysis(aid)
-                for aid in qdb.sql_connection.TRN.execute_fetchflatten())
+            return set(qdb.analysis.Analysis.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten()))
 
     @property
     def shared_analyses(self):
@@ -463,9 +484,8 @@ class User(qdb.base.QiitaObject):
                         JOIN qiita.portal_type USING (portal_type_id)
                      WHERE email = %s AND portal = %s"""
             qdb.sql_connection.TRN.add(sql, [self._id, qiita_config.portal])
-            return set(
-                qdb.analysis.Analysis(aid)
-                for aid in qdb.sql_connection.TRN.execute_fetchflatten())
+            return set(qdb.analysis.Analysis.from_ids(
+                qdb.sql_connection.TRN.execute_fetchflatten()))
 
     @property
     def unread_messages(self):
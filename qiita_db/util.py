@@ -26,6 +26,8 @@ Methods
     convert_to_id
     get_environmental_packages
     get_visibilities
+    get_status_values
+    clear_lookup_cache
     purge_filepaths
     move_filepaths_to_upload_folder
     move_upload_files_to_trash
@@ -47,18 +49,88 @@ from random import choice
 from string import ascii_letters, digits, punctuation
 from binascii import crc32
 from bcrypt import hashpw, gensalt
-from functools import partial
+from functools import partial, wraps
 from os.path import join, basename, isdir, relpath, exists
 from os import walk, remove, listdir, makedirs, rename
 from shutil import move, rmtree, copy as shutil_copy
 from json import dumps
 from datetime import datetime
 from itertools import chain
+from copy import copy
+from re import compile as re_compile
+from time import time
 
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
 import qiita_db as qdb
 
 
+# Process cache of the lookups on the tables holding controlled vocabularies
+# (see _lookup_cache). These tables only change when the database is patched,
+# so the cached values are discarded when the current patch of the database
+# changes
+_lookup_cache_values = {}
+# [patch of the database of the cached values, last time it was checked]
+_lookup_cache_version = [None, 0]
+# Number of seconds between the checks of the current patch of the database
+_LOOKUP_CACHE_VERSION_TTL = 30
+# Controlled vocabulary tables that are modified outside of the patches
+_UNCACHED_LOOKUP_TABLES = frozenset(['portal_type'])
+# The metadata template tables, whose columns change at runtime
+_DYNAMIC_TABLE_RE = re_compile(r'^(sample|prep)_\d+$')
+
+
+def clear_lookup_cache():
+    """Removes all the values from the controlled vocabulary lookup cache
+
+    Notes
+    -----
+    This should be called if the controlled vocabulary tables are modified
+    (e.g. when the database is patched)
+    """
+    _lookup_cache_values.clear()
+    _lookup_cache_version[:] = [None, 0]
+
+
+def _lookup_cache(skip=None):
+    """Decorator caching the results of a controlled vocabulary lookup
+
+    Parameters
+    ----------
+    skip : callable, optional
+        Receives the arguments of the decorated function and returns whether
+        the result should not be cached
+
+    Notes
+    -----
+    Only the results of the successful calls are cached, so the errors are
+    raised every time. The cached lists and dicts are copied before being
+    returned, so callers can modify them.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if skip is not None and skip(*args, **kwargs):
+                return func(*args, **kwargs)
+
+            now = time()
+            if now - _lookup_cache_version[1] >= _LOOKUP_CACHE_VERSION_TTL:
+                with qdb.sql_connection.TRN:
+                    qdb.sql_connection.TRN.add(
+                        "SELECT current_patch FROM settings")
+                    current_patch = qdb.sql_connection.TRN.execute_fetchlast()
+                if current_patch != _lookup_cache_version[0]:
+                    _lookup_cache_values.clear()
+                _lookup_cache_version[:] = [current_patch, now]
+
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            if key not in _lookup_cache_values:
+                _lookup_cache_values[key] = func(*args, **kwargs)
+            value = _lookup_cache_values[key]
+            return copy(value) if isinstance(value, (list, dict)) else value
+        return wrapper
+    return decorator
+
+
 def params_dict_to_json(options):
     """Convert a dict of parameter key-value pairs to JSON string
 
@@ -131,6 +203,7 @@ def convert_type(obj):
     return item
 
 
+@_lookup_cache()
 def get_artifact_types(key_by_id=False):
     """Gets the list of possible artifact types
 
@@ -155,6 +228,7 @@ def get_artifact_types(key_by_id=False):
         return dict(qdb.sql_connection.TRN.execute_fetchindex())
 
 
+@_lookup_cache()
 def get_filepath_types(key='filepath_type'):
     """Gets the list of possible filepath types from the filetype table
 
@@ -186,6 +260,7 @@ def get_filepath_types(key='filepath_type'):
         return dict(qdb.sql_connection.TRN.execute_fetchindex())
 
 
+@_lookup_cache()
 def get_data_types(key='data_type'):
     """Gets the list of possible data types from the data_type table
 
@@ -315,21 +390,18 @@ def check_table_cols(keys, table):
     RuntimeError
         Unable to get columns from database
     """
-    with qdb.sql_connection.TRN:
-        sql = """SELECT column_name FROM information_schema.columns
-                 WHERE table_name = %s"""
-        qdb.sql_connection.TRN.add(sql, [table])
-        cols = qdb.sql_connection.TRN.execute_fetchflatten()
-        # Test needed because a user with certain permissions can query without
-        # error but be unable to get the column names
-        if len(cols) == 0:
-            raise RuntimeError("Unable to fetch column names for table %s"
-                               % table)
-        if len(set(keys).difference(cols)) > 0:
-            raise qdb.exceptions.QiitaDBColumnError(
-                "Non-database keys found: %s" % set(keys).difference(cols))
-
-
+    cols = get_table_cols(table)
+    # Test needed because a user with certain permissions can query without
+    # error but be unable to get the column names
+    if len(cols) == 0:
+        raise RuntimeError("Unable to fetch column names for table %s"
+                           % table)
+    if len(set(keys).difference(cols)) > 0:
+        raise qdb.exceptions.QiitaDBColumnError(
+            "Non-database keys found: %s" % set(keys).difference(cols))
+
+
+@_lookup_cache(skip=lambda table: _DYNAMIC_TABLE_RE.match(table))
 def get_table_cols(table):
     """Returns the column headers of table
 
@@ -746,9 +818,10 @@ def purge_filepaths():
             WHERE filepath_id NOT IN (%s)""" % union_str
         qdb.sql_connection.TRN.add(sql)
 
-        # We can now go over and remove all the filepaths
+        # We can now go over and remove all the filepaths. The results are
+        # streamed, as the filepath table can be really large
+        db_results = qdb.sql_connection.TRN.execute_fetch_iter()
         sql = "DELETE FROM qiita.filepath WHERE filepath_id=%s"
-        db_results = qdb.sql_connection.TRN.execute_fetchindex()
         for fp_id, fp, fp_type, dd_id in db_results:
             qdb.sql_connection.TRN.add(sql, [fp_id])
 
@@ -891,6 +964,8 @@ def filepath_ids_to_rel_paths(filepath_ids):
         return res
 
 
+@_lookup_cache(
+    skip=lambda value, table, text_col=None: table in _UNCACHED_LOOKUP_TABLES)
 def convert_to_id(value, table, text_col=None):
     """Converts a string value to its corresponding table identifier
 
@@ -927,6 +1002,8 @@ def convert_to_id(value, table, text_col=None):
         return _id[0][0]
 
 
+@_lookup_cache(
+    skip=lambda value, table: table in _UNCACHED_LOOKUP_TABLES)
 def convert_from_id(value, table):
     """Converts an id value to its corresponding string value
 
@@ -1010,6 +1087,7 @@ def get_environmental_packages():
         return qdb.sql_connection.TRN.execute_fetchindex()
 
 
+@_lookup_cache()
 def get_visibilities():
     """Get the list of available visibilities for artifacts
 
@@ -1023,6 +1101,27 @@ def get_visibilities():
         return qdb.sql_connection.TRN.execute_fetchflatten()
 
 
+@_lookup_cache()
+def get_status_values(table):
+    """Get the list of available status for the objects stored in `table`
+
+    Parameters
+    ----------
+    table : str
+        The table holding the objects. The status are stored in the table
+        "`table`_status"
+
+    Returns
+    -------
+    list of str
+        The available status
+    """
+    with qdb.sql_connection.TRN:
+        sql = "SELECT DISTINCT status FROM qiita.{0}_status".format(table)
+        qdb.sql_connection.TRN.add(sql)
+        return qdb.sql_connection.TRN.execute_fetchflatten()
+
+
 def get_timeseries_types():
     """Get the list of available timeseries types
 
@@ -29,6 +29,7 @@ from qiita_db.processing_job import ProcessingJob
 PREP_TEMPLATE_KEY_FORMAT = 'prep_template_%s'
 
 
+@execute_as_transaction
 def artifact_summary_get_request(user_id, artifact_id):
     """Returns the information for the artifact summary page
 
@@ -51,6 +52,9 @@ def artifact_summary_get_request(user_id, artifact_id):
     """
     artifact_id = int(artifact_id)
     artifact = Artifact(artifact_id)
+    # Most of the artifact properties are needed to build the summary, so we
+    # load them all at once
+    artifact.prefetch()
 
     access_error = check_access(artifact.study.id, user_id)
     if access_error:
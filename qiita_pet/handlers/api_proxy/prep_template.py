@@ -11,6 +11,7 @@ from os import remove
 from os.path import basename
 from json import loads, dumps
 
+from future.utils import viewitems
 from natsort import natsorted
 from moi import r_client
 
@@ -297,17 +298,18 @@ def prep_template_summary_get_req(prep_id, user_id):
     access_error = check_access(prep.study_id, user_id)
     if access_error:
         return access_error
-    df = prep.to_dataframe()
-    out = {'num_samples': df.shape[0],
+    # The statistics of the columns are precomputed, so the metadata is not
+    # loaded
+    stats = prep.column_stats()
+    out = {'num_samples': len(prep),
            'summary': {},
            'status': 'success',
            'message': ''}
 
-    cols = list(df.columns)
-    for column in cols:
-        counts = df[column].value_counts()
+    for column, counts in viewitems(stats):
         out['summary'][str(column)] = [(str(key), counts[key])
-                                       for key in natsorted(counts.index)]
+                                       for key in natsorted(
+                                           k for k in counts if k is not None)]
     return out
 
 
@@ -460,7 +462,11 @@ def prep_template_patch_req(user_id, req_op, req_path, req_value=None,
         if access_error:
             return access_error
 
-        # Offload the deletion of the column to the cluster
+        if attribute == 'samples':
+            # Several samples, separated by commas, are deleted at once
+            attr_id = attr_id.split(',')
+
+        # Offload the deletion of the sample or column to the cluster
         job_id = safe_submit(user_id, delete_sample_or_column, PrepTemplate,
                              prep_id, attribute, attr_id)
         # Store the job id attaching it to the sample template id
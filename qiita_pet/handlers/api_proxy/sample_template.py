@@ -8,6 +8,7 @@
 from __future__ import division
 from json import loads, dumps
 
+from future.utils import viewitems
 from natsort import natsorted
 from moi import r_client
 
@@ -271,27 +272,28 @@ def sample_template_summary_get_req(samp_id, user_id):
 
     template = SampleTemplate(int(samp_id))
 
-    df = template.to_dataframe()
+    # The statistics of the columns are precomputed, so the metadata is not
+    # loaded
+    stats = template.column_stats()
 
     editable = (Study(template.study_id).can_edit(User(user_id)) and not
                 processing)
 
     out = {'status': 'success',
            'message': '',
-           'num_samples': df.shape[0],
-           'num_columns': df.shape[1],
+           'num_samples': len(template),
+           'num_columns': len(template.categories()),
            'editable': editable,
            'alert_type': alert_type,
            'alert_message': alert_msg,
            'stats': {}}
 
     # drop the samp_id column if it exists
-    if 'study_id' in df.columns:
-        df.drop('study_id', axis=1, inplace=True)
-    for column in df.columns:
-        counts = df[column].value_counts()
+    stats.pop('study_id', None)
+    for column, counts in viewitems(stats):
         out['stats'][str(column)] = [(str(key), counts[key])
-                                     for key in natsorted(counts.index)]
+                                     for key in natsorted(
+                                         k for k in counts if k is not None)]
 
     return out
 
@@ -528,6 +530,10 @@ def sample_template_patch_request(user_id, req_op, req_path, req_value=None,
         if access_error:
             return access_error
 
+        if attribute == 'samples':
+            # Several samples, separated by commas, are deleted at once
+            attr_id = attr_id.split(',')
+
         # Offload the deletion of the sample or column to the cluster
         job_id = safe_submit(user_id, delete_sample_or_column, SampleTemplate,
                              int(st_id), attribute, attr_id)
@@ -170,7 +170,8 @@ class ShareStudyAJAX(BaseHandler):
 
 class SearchStudiesAJAX(BaseHandler):
     @authenticated
-    @execute_as_transaction
+    # Not read only because the search errors are stored in the log
+    @execute_as_transaction(read_only=False)
     def get(self, ignore):
         user = self.get_argument('user')
         query = self.get_argument('query')
@@ -5,6 +5,8 @@
 #
 # The full license is in the file LICENSE, distributed with this software.
 # -----------------------------------------------------------------------------
+from six import string_types
+
 from .analysis_pipeline import RunAnalysis
 from qiita_ware.commands import submit_EBI, submit_VAMPS
 from qiita_db.analysis import Analysis
@@ -306,8 +308,9 @@ def delete_sample_or_column(obj_class, obj_id, sample_or_col, name):
         The template id
     sample_or_col : {"samples", "columns"}
         Which resource are we deleting. Either "samples" or "columns"
-    name : str
-        The name of the resource to be deleted
+    name : str or list of str
+        The name of the resource to be deleted. Several samples can be
+        deleted at once by passing a list of sample names
 
     Returns
     -------
@@ -319,7 +322,9 @@ def delete_sample_or_column(obj_class, obj_id, sample_or_col, name):
     if sample_or_col == 'columns':
         del_func = st.delete_column
     elif sample_or_col == 'samples':
-        del_func = st.delete_sample
+        del_func = st.delete_samples
+        if isinstance(name, string_types):
+            name = [name]
     else:
         return {'status': 'danger',
                 'message': 'Unknown value "%s". Choose between "samples" '
@@ -16,6 +16,7 @@ from qiita_ware.exceptions import EBISubmissionError
 from qiita_ware.demux import to_per_sample_ascii
 from qiita_ware.util import open_file
 from qiita_db.logger import LogEntry
+from qiita_db.sql_connection import TRN
 from qiita_db.ontology import Ontology
 from qiita_db.util import convert_to_id, get_mountpoint
 from qiita_db.artifact import Artifact
@@ -183,31 +184,31 @@ class EBISubmission(object):
         get_output_fp = partial(join, self.full_ebi_dir)
         nvp = []
         nvim = []
-        for k, v in viewitems(self.sample_template):
-            if k not in self.prep_template:
-                continue
-            sample_prep = self.prep_template[k]
-
-            # validating required fields
-            if ('platform' not in sample_prep or
-                    sample_prep['platform'] is None):
-                nvp.append(k)
-            else:
-                platform = sample_prep['platform'].upper()
-                if platform not in self.valid_platforms:
+        # Retrieve the metadata of the samples present in both templates, with
+        # a single query per template
+        with TRN:
+            prep_rows = dict(self.prep_template.iter_rows())
+            for k, v in self.sample_template.iter_rows(samples=prep_rows):
+                sample_prep = prep_rows[k]
+
+                # validating required fields
+                if sample_prep.get('platform') is None:
                     nvp.append(k)
                 else:
-                    if ('instrument_model' not in sample_prep or
-                            sample_prep['instrument_model'] is None):
-                        nvim.append(k)
+                    platform = sample_prep['platform'].upper()
+                    if platform not in self.valid_platforms:
+                        nvp.append(k)
                     else:
-                        im = sample_prep['instrument_model'].upper()
-                        if im not in self.valid_platforms[platform]:
+                        if sample_prep.get('instrument_model') is None:
                             nvim.append(k)
-
-            self.samples[k] = v
-            self.samples_prep[k] = sample_prep
-            self.sample_demux_fps[k] = get_output_fp("%s.fastq.gz" % k)
+                        else:
+                            im = sample_prep['instrument_model'].upper()
+                            if im not in self.valid_platforms[platform]:
+                                nvim.append(k)
+
+                self.samples[k] = v
+                self.samples_prep[k] = sample_prep
+                self.sample_demux_fps[k] = get_output_fp("%s.fastq.gz" % k)
 
         if nvp:
             error_msgs.append("These samples do not have a valid platform "
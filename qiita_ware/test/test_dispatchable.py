@@ -166,6 +166,19 @@ class TestDispatchable(TestCase):
         self.assertEqual(obs, exp)
         self.assertNotIn('1.SKD8.640184', pt.categories())
 
+        # Delete several samples at once
+        npt.assert_warns(
+            QiitaDBWarning, st.extend,
+            pd.DataFrame.from_dict({'Sample1': {'taxon_id': '9606'},
+                                    'Sample2': {'taxon_id': '9606'}},
+                                   orient='index', dtype=str))
+        obs = delete_sample_or_column(SampleTemplate, 1, "samples",
+                                      ["1.Sample1", "1.Sample2"])
+        exp = {'status': "success", 'message': ""}
+        self.assertEqual(obs, exp)
+        self.assertNotIn('1.Sample1', st.keys())
+        self.assertNotIn('1.Sample2', st.keys())
+
         # Exception
         obs = delete_sample_or_column(PrepTemplate, 2, "samples",
                                       "1.SKM9.640192")
@@ -101,8 +101,10 @@ class TestEBISubmission(TestCase):
         self.assertIsNone(e.submission_xml_fp)
 
         for sample in e.sample_template:
-            self.assertEqual(e.sample_template[sample], e.samples[sample])
-            self.assertEqual(e.prep_template[sample], e.samples_prep[sample])
+            self.assertEqual(dict(e.sample_template[sample]),
+                             e.samples[sample])
+            self.assertEqual(dict(e.prep_template[sample]),
+                             e.samples_prep[sample])
             self.assertEqual(e.sample_demux_fps[sample],
                              get_output_fp('%s.fastq.gz' % sample))
 